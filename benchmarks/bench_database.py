@@ -0,0 +1,80 @@
+'''
+    Database population, merging and exports, run from the repository root:
+        python benchmarks/bench_database.py [count]
+'''
+import sys
+sys.path.append(".")
+import os
+import shutil
+from time import perf_counter
+import numpy as np
+from keever.database import Database
+from keever import TMPDIR
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 8}]}
+
+def build(count, backend):
+    db = Database("bench", variables, ["metric"], backend=backend)
+    x = np.random.rand(count, 8)
+    ids = db.add_entries({"x": x})
+    db.update_entries(ids, {"metric": x[:, 0]})
+    db.exporters = { f"{method}.all": ["x", "metric", "variables"] for method in ["npz", "npz-raw", "npy"] }
+    return db
+
+def bench_populate(count=1000, backend="dict", algo="LHS"):
+    db = Database("bench", variables, ["metric"], backend=backend)
+    start = perf_counter()
+    db.populate(algo, count, seed=0)
+    return perf_counter() - start
+bench_populate.params = {"count": [1000, 10000, 1000000], "backend": ["dict", "columnar"], "algo": ["LHS", "Sobol", "Halton", "uniform"]}
+
+def bench_merge(count=10000, backend="dict"):
+    lhs, rhs = build(count, backend), build(count, backend)
+    start = perf_counter()
+    lhs.merge(rhs)
+    elapsed = perf_counter() - start
+    assert len(lhs) == 2 * count
+    return elapsed
+bench_merge.params = {"count": [10000, 100000], "backend": ["dict", "columnar"]}
+
+def bench_top_k(count=100000, backend="dict", added=100):
+    ''' top_k after a loop added entries to an indexed database, against a scan of the column. '''
+    db = build(count, backend)
+    db.update_entries(db.entries, {"metric": np.random.rand(count)})
+    db.top_k("metric", 10)
+    for loop in range(2): # The first update of the index also numbers its entries
+        ids = db.add_entries({"x": np.random.rand(added, 8)})
+        db.update_entries(ids, {"metric": np.random.rand(added)})
+        start = perf_counter()
+        db.top_k("metric", 10)
+        indexed = perf_counter() - start
+    start = perf_counter()
+    np.argpartition(db.column("metric"), 10)[:10]
+    return {"indexed": indexed, "scan": perf_counter() - start}
+bench_top_k.params = {"count": [100000, 1000000], "backend": ["dict", "columnar"], "added": [100]}
+
+def bench_store_in_file(count=10000, backend="dict"):
+    db = build(count, backend)
+    path = os.path.join(TMPDIR, "bench_store")
+    start = perf_counter()
+    db.store_in_file(path, "npz", ["x", "metric"])
+    return perf_counter() - start
+bench_store_in_file.params = {"count": [10000, 100000], "backend": ["dict", "columnar"]}
+
+def bench_export(count=10000, backend="dict", method="npz"):
+    db = build(count, backend)
+    start = perf_counter()
+    filename = db.export(f"{method}.all")
+    elapsed = perf_counter() - start
+    if os.path.isdir(filename):
+        shutil.rmtree(filename)
+    else:
+        os.remove(filename)
+    return elapsed
+bench_export.params = {"count": [10000, 100000], "backend": ["dict", "columnar"], "method": ["npz", "npz-raw", "npy"]}
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    for backend in ["dict", "columnar"]:
+        print(f"{backend:>9} {count} entries: populate {bench_populate(count, backend):.3f}s merge {bench_merge(count, backend):.3f}s "
+              f"store_in_file {bench_store_in_file(count, backend):.3f}s export " + " ".join(f"{method} {bench_export(count, backend, method):.3f}s" for method in ["npz", "npz-raw", "npy"]))
@@ -0,0 +1,41 @@
+'''
+    Per-call overhead of Algorithm.action on a module with an empty __run__,
+    run from the repository root:
+        python benchmarks/bench_dispatch.py [calls]
+'''
+import sys
+sys.path.append(".")
+import logging
+from copy import deepcopy
+from time import perf_counter
+import numpy as np
+from keever.algorithm import Algorithm
+
+def build(config_size):
+    algo = Algorithm.from_json({"name": "bench", "workdir": ".", "actions": [
+        {"name": "run", "type": "module_runner", "path": "benchmarks.empty_mod", "workdir": "."}]})
+    algo.config = {"table": np.zeros(config_size), "fevals": 40000, "nagents": 40, "extra": "unused"}
+    return algo
+
+def bench_dispatch(calls=20000, config_size=1000):
+    algo = build(config_size)
+    x = np.zeros((40, 5))
+    start = perf_counter()
+    for i in range(calls):
+        algo.action("run", args={"x": x})
+    return (perf_counter() - start) / calls
+bench_dispatch.params = {"calls": [5000], "config_size": [10, 100000]}
+
+def bench_deepcopy(calls=2000, config_size=1000):
+    config = build(config_size).config
+    start = perf_counter()
+    for i in range(calls):
+        deepcopy(config)
+    return (perf_counter() - start) / calls
+bench_deepcopy.params = {"calls": [500], "config_size": [10, 100000]}
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for size in [10, 100000]:
+        print(f"config array of {size:>6}: action {1e6 * bench_dispatch(calls, size):8.2f}us/call, deepcopy of config alone {1e6 * bench_deepcopy(calls // 10, size):8.2f}us")
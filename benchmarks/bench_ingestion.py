@@ -0,0 +1,36 @@
+'''
+    Ingesting a batch of designs in a Database, run from the repository root:
+        python benchmarks/bench_ingestion.py [count]
+'''
+import sys
+sys.path.append(".")
+from time import perf_counter
+import numpy as np
+from keever.database import Database
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 8}]}
+
+def bench_add_entries(count=100000, backend="dict"):
+    db = Database("bench", variables, ["metric"], backend=backend)
+    x = np.random.rand(count, 8)
+    start = perf_counter()
+    ids = db.add_entries({"x": x})
+    db.update_entries(ids, {"metric": x[:, 0]})
+    return perf_counter() - start
+bench_add_entries.params = {"count": [10000, 100000], "backend": ["dict", "columnar"]}
+
+def bench_add_entry_loop(count=100000, backend="dict"):
+    db = Database("bench", variables, ["metric"], backend=backend)
+    x = np.random.rand(count, 8)
+    start = perf_counter()
+    for i in range(count):
+        db.add_entry(f"e{i}", {"x": x[i]})
+        db.update_entry(f"e{i}", {"metric": x[i, 0]})
+    return perf_counter() - start
+bench_add_entry_loop.params = {"count": [10000, 100000], "backend": ["dict", "columnar"]}
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for backend in ["dict", "columnar"]:
+        print(f"add_entry loop {backend:>9} {count} entries: {bench_add_entry_loop(count, backend):.3f}s")
+        print(f"add_entries    {backend:>9} {count} entries: {bench_add_entries(count, backend):.3f}s")
@@ -0,0 +1,42 @@
+'''
+    Iterating over a Database, run from the repository root:
+        python benchmarks/bench_iteration.py [count]
+'''
+import sys
+sys.path.append(".")
+from time import perf_counter
+import numpy as np
+from keever.database import Database
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 8}]}
+
+def build(count, backend):
+    db = Database("bench", variables, ["metric"], backend=backend)
+    x = np.random.rand(count, 8)
+    for i in range(count):
+        db.add_entry(f"e{i}", {"x": x[i], "metric": x[i, 0]})
+    return db
+
+def bench_iteration(count=100000, backend="dict"):
+    db = build(count, backend)
+    start = perf_counter()
+    n = 0
+    for entry, props in db:
+        n += 1
+    assert n == len(db) == count
+    return perf_counter() - start
+bench_iteration.params = {"count": [10000, 100000], "backend": ["dict", "columnar"]}
+
+def bench_entries(count=100000, backend="dict"):
+    db = build(count, backend)
+    start = perf_counter()
+    entries = db.entries
+    assert len(entries) == count
+    return perf_counter() - start
+bench_entries.params = {"count": [10000, 100000], "backend": ["dict", "columnar"]}
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for backend in ["dict", "columnar"]:
+        elapsed = bench_iteration(count, backend)
+        print(f"iteration {backend:>9} {count} entries: {elapsed:.3f}s ({1e6 * elapsed / count:.2f}us/entry)")
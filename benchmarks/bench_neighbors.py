@@ -0,0 +1,32 @@
+'''
+    Near-duplicate filtering of candidate designs against a Database, run from the repository root:
+        python benchmarks/bench_neighbors.py [entries]
+'''
+import sys
+sys.path.append(".")
+from time import perf_counter
+import numpy as np
+from keever.database import Database
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 8},
+                        {"name": "c", "type": "categ", "count": 3}]}
+
+def bench_near_duplicates(entries=100000, candidates=10000, backend="columnar"):
+    ''' Index build, then filtering after a loop appended designs. '''
+    db = Database("bench", variables, ["metric"], backend=backend)
+    db.populate("uniform", entries, seed=0)
+    batch = db.space.from_unit(np.random.default_rng(1).random((candidates, db.space.size)))
+    start = perf_counter()
+    db.near_duplicates(batch[:1])
+    build = perf_counter() - start
+    db.add_entries({"variables": batch[:100]})
+    start = perf_counter()
+    kept = db.filter_duplicates(batch, tolerance=1e-3)
+    assert len(kept) == candidates - 100
+    return {"build": build, "filter": perf_counter() - start}
+bench_near_duplicates.params = {"entries": [100000, 1000000], "candidates": [10000], "backend": ["columnar"]}
+
+if __name__ == "__main__":
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    result = bench_near_duplicates(entries)
+    print(f"{entries} entries: index {result['build']:.3f}s, filtering 10000 candidates {result['filter']:.3f}s")
@@ -0,0 +1,50 @@
+'''
+    Synthetic playbook loop through keever/play.py, startup included, run from the repository root:
+        python benchmarks/bench_play.py [loops]
+'''
+import sys
+sys.path.append(".")
+import os
+import subprocess
+from time import perf_counter
+import yaml
+from keever import TMPDIR, make_tmpdir
+
+def playbook(loops, runner, count):
+    if runner == "module":
+        action = {"name": "evaluate", "type": "module_runner", "path": "benchmarks.play_mod", "workdir": "."}
+    else:
+        action = {"name": "evaluate", "type": "script_runner", "shell": "bash", "parallel": False,
+                  "path": "benchmarks/resources/play.proto.sh", "workdir": "."}
+    return {
+        "workdir": os.path.join(TMPDIR, "bench_play"),
+        "items": [
+            {"name": "doe", "type": "Database", "storages": ["metric"],
+             "variables": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 4}],
+             "exporters": {"npz.all": ["x"]},
+             "populate-on-creation": {"algo": "LHS", "count": count}},
+            {"name": "fom", "type": "Algorithm", "actions": [action]},
+        ],
+        "playbook": {
+            "init": [{"type": "log-info", "msg": "Benchmark playbook", "args": []}],
+            "loop": [
+                {"type": "stop", "loops": loops},
+                {"type": "action", "item": "fom", "action": "evaluate", "args": {"db": "@doe"}, "output": "result"},
+                {"type": "log-info", "msg": "{}", "args": ["#result"]},
+            ],
+        },
+    }
+
+def bench_play(loops=10, runner="module", count=40):
+    path = os.path.join(make_tmpdir(), f"bench_play_{runner}.yml")
+    with open(path, "w") as f:
+        yaml.safe_dump(playbook(loops, runner, count), f)
+    start = perf_counter()
+    subprocess.run([sys.executable, "keever/play.py", "--project", path, "--logfile", os.path.join(TMPDIR, "bench_play.log")], check=True)
+    return perf_counter() - start
+bench_play.params = {"loops": [10, 100], "runner": ["module", "script"], "count": [40]}
+
+if __name__ == "__main__":
+    loops = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for runner in ["module", "script"]:
+        print(f"play.py {runner:>6} runner, {loops} loops: {bench_play(loops, runner):.3f}s")
@@ -0,0 +1,46 @@
+'''
+    Database checkpoint round-trip, JSON against binary (npy), run from the repository root:
+        python benchmarks/bench_serialize.py [count] [map size]
+'''
+import sys
+sys.path.append(".")
+import os
+from time import perf_counter
+import numpy as np
+from keever.database import Database
+from keever.tools import load_serialized
+from keever import TMPDIR
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 8}]}
+
+def build(count, size, backend):
+    db = Database("bench", variables, ["metric", "epsilon_map"], backend=backend)
+    ids = db.add_entries({"x": np.random.rand(count, 8)})
+    db.update_entries(ids, {"metric": np.random.rand(count), "epsilon_map": np.random.rand(count, size, size)})
+    return db
+
+def disk_size(path):
+    total = os.path.getsize(path + ".json")
+    for folder, _, files in os.walk(path + ".columns"):
+        total += sum(os.path.getsize(os.path.join(folder, f)) for f in files)
+    return total
+
+def bench_roundtrip(count=2000, size=32, backend="columnar", method="json"):
+    db = build(count, size, backend)
+    path = os.path.join(TMPDIR, f"bench_serialize_{method}")
+    start = perf_counter()
+    db.save(path, method)
+    saved = perf_counter()
+    db2 = Database.from_json(load_serialized(path, mmap_mode="c" if method == "npy" else None))
+    loaded = perf_counter()
+    assert len(db2) == count
+    return {"save": saved - start, "load": loaded - saved, "bytes": disk_size(path)}
+bench_roundtrip.params = {"count": [200, 2000], "size": [32], "backend": ["dict", "columnar"], "method": ["json", "npy"]}
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    for backend in ["dict", "columnar"]:
+        for method in ["json", "npy"]:
+            result = bench_roundtrip(count, size, backend, method)
+            print(f"{backend:>9} {method:>5}: save {result['save']:.3f}s load {result['load']:.3f}s size {result['bytes'] / 1e6:.1f}MB")
@@ -0,0 +1,35 @@
+'''
+    Passing a Database to pool workers, pickled against shared memory, run from the repository root:
+        python benchmarks/bench_shared.py [count]
+'''
+import sys
+sys.path.append(".")
+import logging
+from time import perf_counter
+import numpy as np
+from keever.algorithm import Algorithm
+from keever.database import Database
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 8}]}
+
+def bench_pool_database(count=100000, shared=False, calls=5):
+    db = Database("bench", variables, ["metric", "epsilon_map"], backend="columnar")
+    ids = db.add_entries({"x": np.random.rand(count, 8)})
+    db.update_entries(ids, {"metric": np.random.rand(count), "epsilon_map": np.random.rand(count, 8, 8)})
+    algo = Algorithm.from_json({"name": "bench", "workdir": ".", "actions": [
+        {"name": "run", "type": "module_runner", "path": "benchmarks.db_mod", "workdir": ".", "workers": 4, "batch": "x", "shared": shared}]})
+    x = np.zeros((8, 8))
+    algo.action("run", args={"x": x, "db": db}) # Starts the pool
+    start = perf_counter()
+    for i in range(calls):
+        algo.action("run", args={"x": x, "db": db})
+    elapsed = (perf_counter() - start) / calls
+    algo.shutdown()
+    return elapsed
+bench_pool_database.params = {"count": [10000, 100000], "shared": [False, True], "calls": [5]}
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for shared in [False, True]:
+        print(f"{count} entries, shared={shared}: {1e3 * bench_pool_database(count, shared):.1f}ms/action")
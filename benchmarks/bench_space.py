@@ -0,0 +1,36 @@
+'''
+    Variable space helpers and batch encoding/repair of candidates, run from the repository root:
+        python benchmarks/bench_space.py
+'''
+import sys
+sys.path.append(".")
+from time import perf_counter
+import numpy as np
+from keever.database import Database, countinuous_variables_boundaries
+
+def variables(count):
+    return {"params": [ {"name": f"x{i}", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 4} for i in range(count) ]
+                    + [ {"name": f"c{i}", "type": "categ", "count": 3} for i in range(count) ]}
+
+def bench_boundaries(calls=10000, count=20):
+    ''' Per-call cost of the description helpers. '''
+    db = Database("bench", variables(count), ["metric"])
+    start = perf_counter()
+    for _ in range(calls):
+        countinuous_variables_boundaries(db.variables_descr)
+    return (perf_counter() - start) / calls
+bench_boundaries.params = {"calls": [10000], "count": [20]}
+
+def bench_candidates(candidates=1000000, count=5):
+    ''' Repair, validation and decoding of a batch of candidates. '''
+    space = Database("bench", variables(count), ["metric"]).space
+    matrix = np.random.default_rng(0).normal(size=(candidates, space.size))
+    start = perf_counter()
+    repaired = space.repair(matrix, mode="reflect", out=matrix)
+    assert space.contains(repaired).all()
+    space.decode(repaired)
+    return perf_counter() - start
+bench_candidates.params = {"candidates": [1000000], "count": [5]}
+
+if __name__ == "__main__":
+    print(f"boundaries: {1e6 * bench_boundaries():.2f}us per call, 1e6 candidates: {bench_candidates():.3f}s")
@@ -0,0 +1,30 @@
+'''
+    Startup time of short-lived keever processes (array jobs, worker scripts, play.py),
+    run from the repository root:
+        python benchmarks/bench_startup.py
+'''
+import sys
+sys.path.append(".")
+import subprocess
+from time import perf_counter
+
+commands = {
+    "python": ["-c", "pass"],
+    "keever.database": ["-c", "import keever.database"],
+    "keever.algorithm": ["-c", "import keever.algorithm"],
+    "play.py --help": ["keever/play.py", "--help"],
+}
+
+def bench_startup(command="keever.database", runs=5):
+    ''' Best wall time of runs fresh interpreters, the bare python case is the floor. '''
+    best = float("inf")
+    for _ in range(runs):
+        start = perf_counter()
+        subprocess.run([sys.executable, *commands[command]], check=True, stdout=subprocess.DEVNULL)
+        best = min(best, perf_counter() - start)
+    return best
+bench_startup.params = {"command": list(commands.keys()), "runs": [5]}
+
+if __name__ == "__main__":
+    for command in commands:
+        print(f"{command:>16}: {1e3 * bench_startup(command):.1f}ms")
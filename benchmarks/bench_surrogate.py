@@ -0,0 +1,41 @@
+'''
+    In-process surrogate action: fit, incremental update after a loop and screening of candidates,
+    run from the repository root:
+        python benchmarks/bench_surrogate.py [candidates]
+'''
+import sys
+sys.path.append(".")
+from time import perf_counter
+import numpy as np
+from keever.database import Database
+from keever.surrogate import SurrogateRunner
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 8}]}
+
+def evaluate(db, ids):
+    db.update_entries(ids, {"metric": (db.column("variables")[-len(ids):] ** 2).sum(axis=1)})
+
+def bench_surrogate(entries=300, candidates=100000, std=True):
+    ''' Full fit, appending a loop of 20 evaluations, then predicting candidates. '''
+    db = Database("bench", variables, ["metric"], backend="columnar")
+    evaluate(db, db.populate("LHS", entries, seed=0))
+    runner = SurrogateRunner("surrogate")
+    start = perf_counter()
+    runner.update(db)
+    fit = perf_counter() - start
+    evaluate(db, db.populate("uniform", 20, seed=1))
+    start = perf_counter()
+    runner.update(db)
+    append = perf_counter() - start
+    batch = db.space.from_unit(np.random.default_rng(2).random((candidates, db.space.size)))
+    start = perf_counter()
+    runner.run_with_dict({"x": batch, "std": std})
+    return {"fit": fit, "append": append, "predict": perf_counter() - start}
+bench_surrogate.params = {"entries": [300, 1000], "candidates": [100000], "std": [True, False]}
+
+if __name__ == "__main__":
+    candidates = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for std in [True, False]:
+        result = bench_surrogate(300, candidates, std)
+        print(f"300 entries: fit {result['fit']:.3f}s, append 20 {result['append']:.4f}s, "
+              f"{candidates} candidates {'with' if std else 'without'} std {result['predict']:.3f}s")
@@ -0,0 +1,68 @@
+'''
+    Completion of job prototypes, run from the repository root:
+        python benchmarks/bench_templating.py [jobs] [array elements]
+'''
+import sys
+sys.path.append(".")
+import os
+from time import perf_counter
+from keever.runners import generate_job, write_job, ScriptRunner
+from keever import TMPDIR, make_tmpdir
+
+def prototype(keys):
+    lines = [ f"echo {{{{key{i}}}}} >> output.log" for i in range(keys) ]
+    return "\n".join(["#!/bin/bash"] + lines + ["touch {{touchfile}}"]) + "\n"
+
+def bench_generate_job(jobs=1000, keys=10):
+    proto = prototype(keys)
+    dictionnaries = [ {**{ f"key{i}": f"{j}.{i}" for i in range(keys) }, "touchfile": f"{j}.ended"} for j in range(jobs) ]
+    start = perf_counter()
+    for dictionnary in dictionnaries:
+        generate_job(proto, dictionnary)
+    return perf_counter() - start
+bench_generate_job.params = {"jobs": [1000, 10000], "keys": [10, 100]}
+
+def bench_write_job(jobs=1000, keys=10):
+    proto = prototype(keys)
+    dictionnaries = [ {**{ f"key{i}": f"{j}.{i}" for i in range(keys) }, "touchfile": f"{j}.ended"} for j in range(jobs) ]
+    start = perf_counter()
+    scripts = [ write_job(proto, dictionnary, name="bench.proto.sh") for dictionnary in dictionnaries ]
+    elapsed = perf_counter() - start
+    for script in scripts:
+        os.remove(script)
+    return elapsed
+bench_write_job.params = {"jobs": [1000], "keys": [10]}
+
+def array_runner(keys, pipe=False):
+    path = os.path.join(make_tmpdir(), f"bench_array_{keys}.proto.sh")
+    with open(path, "w") as f:
+        f.write(prototype(keys).replace("{{key0}}", "{{value[]}}"))
+    return ScriptRunner("bench", path, shell="bash", workdir=TMPDIR, pipe=pipe)
+
+def bench_array_render(elements=10000, keys=10):
+    ''' Preparation and rendering of every element of an array job, without launching them. '''
+    runner = array_runner(keys)
+    values = { f"key{i}": i for i in range(1, keys) }
+    start = perf_counter()
+    jobs, _, _ = runner._prepare({**values, "value": list(range(elements))})
+    scripts = [ runner.template.render(job) for job in jobs ]
+    elapsed = perf_counter() - start
+    assert len(scripts) == elements
+    return elapsed
+bench_array_render.params = {"elements": [10000], "keys": [10, 100]}
+
+def bench_array_run(elements=1000, pipe=False):
+    runner = ScriptRunner("bench", "benchmarks/resources/array.proto.sh", shell="bash", workdir=TMPDIR, pipe=pipe)
+    start = perf_counter()
+    runner.run_with_dict({"value": list(range(elements))})
+    return perf_counter() - start
+bench_array_run.params = {"elements": [1000, 10000], "pipe": [False, True]}
+
+if __name__ == "__main__":
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for keys in [10, 100]:
+        elapsed = bench_generate_job(jobs, keys)
+        print(f"generate_job {keys:>4} keys: {1e6 * elapsed / jobs:.2f}us/job")
+    elements = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    print(f"array of {elements} elements: render {bench_array_render(elements):.3f}s, "
+          f"run {bench_array_run(elements, False):.3f}s with script files, {bench_array_run(elements, True):.3f}s piped")
@@ -0,0 +1,5 @@
+def __requires__():
+    return {"variables": ["x", "db"]}
+
+def __run__(x, db):
+    return [ len(db) ] * len(x)
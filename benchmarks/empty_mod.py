@@ -0,0 +1,5 @@
+def __requires__():
+    return {"variables": ["x"]}
+
+def __run__(x, **kwargs):
+    return None
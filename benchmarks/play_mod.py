@@ -0,0 +1,7 @@
+import numpy as np
+
+def __requires__():
+    return {"variables": ["db"]}
+
+def __run__(db, **kwargs):
+    return {"best": float(np.min(db.column("x")))}
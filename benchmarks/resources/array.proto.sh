@@ -0,0 +1,2 @@
+echo "{{value[]}}" > /dev/null
+touch {{touchfile}}
@@ -0,0 +1,2 @@
+test -f {{db:npz.all}}
+touch {{touchfile}}
@@ -0,0 +1,139 @@
+'''
+    Runs the benchmark suite and writes machine readable results, run from the repository root:
+        python benchmarks/run.py [-k filter] [--quick] [--repeat 3] [--output results.json]
+        python benchmarks/run.py --compare before.json after.json [--threshold 0.1]
+
+    Benchmarks are the bench_* functions of the benchmarks/bench_*.py modules.
+    A benchmark may carry a params attribute mapping its arguments to the values to sweep,
+    every combination is a case. It returns its measurement in seconds, or a dict of named measurements.
+    --quick only runs the first value of each parameter.
+'''
+import sys
+sys.path.append(".")
+import os
+import json
+import glob
+import logging
+import platform
+import importlib
+import itertools
+import subprocess
+from datetime import datetime
+from argparse import ArgumentParser
+import numpy as np
+
+def discover(directory):
+    benchmarks = list()
+    sys.path.insert(0, directory)
+    for path in sorted(glob.glob(os.path.join(directory, "bench_*.py"))):
+        module = importlib.import_module(os.path.basename(path)[:-3])
+        for name in sorted(dir(module)):
+            function = getattr(module, name)
+            if name.startswith("bench_") and callable(function) and getattr(function, "__module__", None) == module.__name__:
+                benchmarks.append((f"{module.__name__}.{name}", function))
+    return benchmarks
+
+def cases(function, quick=False):
+    params = getattr(function, "params", {})
+    names = list(params.keys())
+    values = [ params[name][:1] if quick else params[name] for name in names ]
+    for combination in itertools.product(*values):
+        yield dict(zip(names, combination))
+
+def case_id(name, params):
+    return name + "(" + ",".join(f"{key}={value}" for key, value in params.items()) + ")"
+
+def run_case(function, params, repeat):
+    samples = dict()
+    for _ in range(repeat):
+        result = function(**params)
+        if not isinstance(result, dict):
+            result = {"time": result}
+        for metric, value in result.items():
+            samples.setdefault(metric, []).append(float(value))
+    return {
+        "params": params,
+        "samples": samples,
+        "min": { metric: min(values) for metric, values in samples.items() },
+        "median": { metric: float(np.median(values)) for metric, values in samples.items() },
+    }
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip() != ""
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def run(directory, pattern=None, quick=False, repeat=3):
+    commit, dirty = git_revision()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "repeat": repeat,
+        "results": {},
+    }
+    for name, function in discover(directory):
+        for params in cases(function, quick):
+            identifier = case_id(name, params)
+            if pattern and pattern not in identifier:
+                continue
+            result = report["results"][identifier] = run_case(function, params, repeat)
+            print(identifier, " ".join(f"{metric}={value:.4g}" for metric, value in result["min"].items()), flush=True)
+    return report
+
+def compare(before, after, threshold=0.1):
+    '''
+        Prints the ratio of the best measurements of the cases found in both reports.
+        Returns the number of measurements that got worse by more than threshold.
+    '''
+    regressions = 0
+    print(f"{before['commit']} -> {after['commit']}")
+    for identifier, result in after["results"].items():
+        if identifier not in before["results"]:
+            continue
+        for metric, value in result["min"].items():
+            reference = before["results"][identifier]["min"].get(metric)
+            if not reference:
+                continue
+            ratio = value / reference
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "slower"
+                regressions += 1
+            elif ratio < 1 - threshold:
+                flag = "faster"
+            print(f"{ratio:7.2f}x {flag:>6} {identifier} {metric}: {reference:.4g} -> {value:.4g}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("-k", dest="pattern", default=None, help="Only run cases containing this string")
+    parser.add_argument("--quick", action="store_true", help="Only run the first value of each parameter")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Defaults to benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        exit(1 if compare(before, after, args.threshold) else 0)
+
+    logging.disable(logging.WARNING)
+    report = run(os.path.dirname(os.path.abspath(__file__)), args.pattern, args.quick, args.repeat)
+    output = args.output
+    if output is None:
+        output = os.path.join("benchmarks", "results", f"{(report['commit'] or 'local')[:10]}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"Results written to {output}")
@@ -3,23 +3,19 @@ def __requires__():
 
 import numpy as np
 from hybris.optim import ParticleSwarm
-from keever.database import (
-        count_continuous_variables, 
-        countinuous_variables_boundaries, 
-        count_categorical_variables,
-        categorical_variables_num_values)
 
 
 def __run__(fevals, nagents, fom, doe):
-    ncat = count_continuous_variables(doe.variables_descr)
-    ncnt = count_categorical_variables(doe.variables_descr)
-    bounds = countinuous_variables_boundaries(doe.variables_descr)
-    cats = list(categorical_variables_num_values(doe.variables_descr))
+    space = doe.space
+    ncnt = space.continuous_size
+    ncat = space.categorical_size
+    bounds = space.bounds
+    cats = list(space.categories)
 
-    opt = ParticleSwarm(nagents, [ncat, ncnt], max_fevals=fevals)
+    opt = ParticleSwarm(nagents, [ncnt, ncat], max_fevals=fevals)
     opt.vmin = bounds[0]
     opt.vmax = bounds[1]
-    if ncnt > 0:
+    if ncat > 0:
         opt.num_categories(cats)
 
     print(f"Optimizing with hybris using {ncnt} cont vars and {ncat} cat vars.")
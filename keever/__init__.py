@@ -3,24 +3,22 @@ USER = os.getenv('USER')
 
 # Try to find a temporary directory
 if os.getenv("KEEVER_TMP"):
-    TMPDIR = os.getenv('TMP')
+    TMPDIR = os.getenv('KEEVER_TMP')
 elif os.getenv('TMP'):
     TMPDIR = os.getenv('TMP')
 else:
     TMPDIR = "./tmp/"
 
-os.makedirs(TMPDIR, exist_ok=True)
-
-import sys
-sys.path.append(".")
-sys.path.append("./user/")
+# Directories searched for the modules of ModuleRunners, see runners.load_module
+MODULE_PATHS = [".", "./user/"]
 
+# Importing keever has no side effect: the temporary directory is created by the first writer.
+def make_tmpdir():
+    os.makedirs(TMPDIR, exist_ok=True)
+    return TMPDIR
 
-import json
-import numpy as np
 
 def load(path):
+    import json
     with open(path, "r") as f:
         return json.load(f)
-
-
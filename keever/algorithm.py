@@ -2,18 +2,29 @@ import os
 from copy import deepcopy
 from .runners import load_action, load_action_list
 from .database import Database
-from .tools import serialize_json
+from .tools import serialize_json, serialize_npy, load_serialized, randid
+from .journal import Journal, replay_journal
+from .cache import ActionCache
+from .trace import traced
 from attrs import define, field, Factory
+from concurrent.futures import ProcessPoolExecutor
 import logging
 
+immutable_types = (int, float, complex, str, bytes, bool, type(None))
+
 
 @define
 class ModelManager:
     items:       dict = field(init=False, default=Factory(dict))
     _workdir:    str = field(init=False, default=".")
+    snapshot_every: int = field(init=False, default=10)
+    _journal:    Journal = field(init=False, default=None)
+    _journal_saves: int = field(init=False, default=0)
 
     def load_state_dict(self, state_dict):
         self._workdir = state_dict["workdir"] if "workdir" in state_dict.keys() else "."
+        if "_workdir" in state_dict.keys(): # Written by state_dict
+            self._workdir = state_dict["_workdir"]
         if "items" in state_dict:
             for e in state_dict["items"]:
                 if e["type"] == "Database":
@@ -37,19 +48,73 @@ class ModelManager:
     def state_dict(self):
         return {"items": [ item.state_dict for item in self.items.values()], "_workdir": self._workdir }
 
-    def save(self, filename):
-        serialize_json(self.state_dict, filename)
+    @property
+    def binary_state_dict(self):
+        items = [ item.binary_state_dict if hasattr(item, "binary_state_dict") else item.state_dict for item in self.items.values() ]
+        return {"items": items, "_workdir": self._workdir }
+
+    def save(self, filename, method="json"):
+        '''
+            Saves all items, method is "json", "npy" (JSON metadata and .npy columns) or "journal".
+            In journal mode, a full npy snapshot is written every snapshot_every saves,
+            other saves only flush the Database mutations logged to filename.journal since then.
+            Use load(filename) to read a checkpoint back, replaying the journal if any.
+        '''
+        if method == "json":
+            serialize_json(self.state_dict, filename)
+        elif method == "npy":
+            serialize_npy(self.binary_state_dict, filename)
+        elif method == "journal":
+            self._save_journaled(filename)
+        else:
+            logging.error(f"Unknown serializer {method}.")
+
+    def _save_journaled(self, filename):
+        filename = filename[:-5] if filename.endswith(".json") else filename
+        journal = self._journal
+        if journal is not None and journal.path == filename + ".journal" and self._journal_saves < self.snapshot_every:
+            journal.flush()
+            self._journal_saves += 1
+            return
+
+        generation = randid()
+        state = self.binary_state_dict
+        state["_journal"] = generation
+        serialize_npy(state, filename)
+        if journal is not None:
+            journal.close()
+        self._journal = Journal(filename + ".journal", generation)
+        self._journal.flush()
+        self._journal_saves = 1
+        for item in self.items.values():
+            if hasattr(item, "attach_journal"):
+                item.attach_journal(self._journal)
+
+    def load(self, filename, mmap_mode=None):
+        ''' Loads a checkpoint written by save, with any format. '''
+        filename = filename[:-5] if filename.endswith(".json") else filename
+        state = load_serialized(filename, mmap_mode=mmap_mode)
+        self.load_state_dict(state)
+        if "_journal" in state and os.path.isfile(filename + ".journal"):
+            count = replay_journal(filename + ".journal", state["_journal"], self.items)
+            logging.info(f"Replayed {count} journaled mutations.")
+        return self
 
 
 
 from os.path import join
 
+def action_label(algorithm, name, *args, **kwargs):
+    return f"{algorithm.name}.{name}"
+
 @define
 class Algorithm():
     actions: dict = field(init=False, default=Factory(dict))
     config:  dict = field(init=False, default=Factory(dict))
     _workdir: str = field(init=False, default=".")
     name:     str = field(init=True)
+    _executor: ProcessPoolExecutor = field(init=False, default=None)
+    caches:   dict = field(init=False, default=Factory(dict))
 
     def __repr__(self) -> str:
         return f"Algorithm {self.name} with {len(self.actions)} actions."
@@ -68,23 +133,81 @@ class Algorithm():
         for key, action in self.actions.items():
             self.actions[key] = load_action(action.state_dict)
         return self
+
+    @property
+    def executor(self):
+        '''
+            Process pool shared by the actions of this Algorithm that have workers,
+            started once and sized for the most demanding one.
+        '''
+        if self._executor is None:
+            workers = max([ getattr(action, "workers", 1) for action in self.actions.values() ] + [1])
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __getstate__(self):
+        return { "actions": self.actions, "config": self.config, "_workdir": self._workdir, "name": self.name, "caches": self.caches }
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            object.__setattr__(self, key, value)
+        self._executor = None
         
-    def action(self, name, args={}):
+    def _prepare_action(self, name, args):
+        '''
+            The action gets a new dict over config and args. Mutable config values are copied,
+            unless overwritten by args, so actions can not change self.config.
+        '''
         action = self.actions[name]
         action.workdir = self.workdir
-        conf = deepcopy(self.config)
+        if getattr(action, "workers", 1) > 1:
+            action.executor = self.executor
+        conf = { key: value if isinstance(value, immutable_types) else deepcopy(value)
+            for key, value in self.config.items() if key not in args }
         conf.update(args)
+        return action, conf
+
+    @traced("Algorithm.action", "action", label=action_label)
+    def action(self, name, args={}):
+        action, conf = self._prepare_action(name, args)
+        if name in self.caches:
+            return self.caches[name].call(name, conf, action.run_with_dict)
         return action.run_with_dict(conf)
+
+    @traced("Algorithm.action_async", "action", label=action_label)
+    async def action_async(self, name, args={}):
+        '''
+            Asynchronous action, independent actions can overlap in one event loop:
+            await asyncio.gather(a.action_async("train"), b.action_async("optimize"))
+        '''
+        action, conf = self._prepare_action(name, args)
+        if name in self.caches:
+            return await self.caches[name].call_async(name, conf, action.run_with_dict_async)
+        return await action.run_with_dict_async(conf)
     
     @property
     def state_dict(self):
-        return {"actions": [value.state_dict for value in self.actions.values() ], "config": self.config, "workdir": self.workdir, "name": self.name, "type": "Algorithm"}
+        actions = list()
+        for key, value in self.actions.items():
+            action = value.state_dict
+            if key in self.caches:
+                action["cache"] = self.caches[key].config
+            actions.append(action)
+        return {"actions": actions, "config": self.config, "workdir": self.workdir, "name": self.name, "type": "Algorithm"}
     
     @classmethod
     def from_json(cls, data):
         obj = cls(data["name"])
         obj._workdir = data["workdir"] if "workdir" in data.keys() else None
         obj.actions.update(load_action_list(data["actions"]))
+        for action in data["actions"]:
+            if "cache" in action and action["cache"] is not None:
+                obj.caches[action["name"]] = ActionCache.from_json(action["cache"])
         obj.config = data["config"] if "config" in data else {}
         return obj
 
@@ -93,6 +216,8 @@ class Algorithm():
             filepath = join(self.workdir, self.name + ".json")
         if method == "json":
             serialize_json(self.state_dict, filepath)
+        elif method == "npy":
+            serialize_npy(self.state_dict, filepath)
         else:
             logging.error(f"Unknown serializer {method}.")
             
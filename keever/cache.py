@@ -0,0 +1,207 @@
+'''
+    Memoization of Algorithm actions.
+    Calls are keyed on a stable hash of the action name and its merged config and arguments.
+    Results live in a LRU memory tier and optionally in a directory that survives restarts.
+    Objects with a cache_key attribute (such as Database) are hashed by their key.
+'''
+import os
+import pickle
+import hashlib
+import logging
+from collections import OrderedDict
+import numpy as np
+
+
+class Uncacheable(TypeError):
+    pass
+
+
+def _feed(h, obj):
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == "O":
+            return _feed(h, obj.tolist())
+        h.update(f"nd{obj.dtype.str}{obj.shape}".encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for key in sorted(obj.keys(), key=str):
+            _feed(h, key)
+            _feed(h, obj[key])
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[" if isinstance(obj, list) else b"(")
+        for value in obj:
+            _feed(h, value)
+        h.update(b"]")
+    elif isinstance(obj, np.generic):
+        _feed(h, obj.item())
+    elif isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        h.update(f"{type(obj).__name__}:{obj!r};".encode())
+    elif hasattr(obj, "cache_key"):
+        _feed(h, obj.cache_key)
+    else:
+        raise Uncacheable(f"Cannot hash argument of type {type(obj).__name__}.")
+
+def copy_arrays(value):
+    ''' Copies the arrays of a result, so that callers can not change the cached values. '''
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, dict):
+        return { key: copy_arrays(item) for key, item in value.items() }
+    if isinstance(value, (list, tuple)):
+        return type(value)(copy_arrays(item) for item in value)
+    return value
+
+def stable_hash(*objects):
+    ''' Hash that does not depend on the process (unlike hash()), arrays are hashed by dtype, shape and bytes. '''
+    h = hashlib.blake2b(digest_size=20)
+    for obj in objects:
+        _feed(h, obj)
+    return h.hexdigest()
+
+
+def split_rows(result, count):
+    if isinstance(result, dict):
+        columns = { key: split_rows(value, count) for key, value in result.items() }
+        return [ { key: columns[key][i] for key in columns } for i in range(count) ]
+    if isinstance(result, (np.ndarray, list, tuple)) and len(result) == count:
+        return list(result)
+    raise ValueError("Row caching requires results with one row per batched input.")
+
+def stack_rows(rows):
+    first = rows[0]
+    if isinstance(first, dict):
+        return { key: stack_rows([ row[key] for row in rows ]) for key in first.keys() }
+    if isinstance(first, (np.ndarray, np.generic, int, float)):
+        return np.stack(rows)
+    return list(rows)
+
+
+class ActionCache:
+    '''
+        size: number of results kept in memory (least recently used are evicted)
+        path: directory of the disk tier, None to keep results in memory only
+        rows: name of a batched argument, each of its rows is then cached separately
+              and only the missing rows are evaluated
+    '''
+    def __init__(self, size=1024, path=None, rows=None) -> None:
+        self.size = size
+        self.path = path
+        self.rows = rows
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    @property
+    def config(self):
+        return {"size": self.size, "path": self.path, "rows": self.rows}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(**data)
+
+    @property
+    def stats(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "size": len(self._memory)}
+
+    def get(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return True, copy_arrays(self._memory[key])
+        if self.path:
+            filename = os.path.join(self.path, key + ".pkl")
+            if os.path.isfile(filename):
+                with open(filename, "rb") as f:
+                    value = pickle.load(f)
+                self._remember(key, value)
+                self.hits += 1
+                self.disk_hits += 1
+                return True, copy_arrays(value)
+        self.misses += 1
+        return False, None
+
+    def put(self, key, value):
+        self._remember(key, copy_arrays(value))
+        if self.path:
+            filename = os.path.join(self.path, key + ".pkl")
+            with open(filename + ".tmp", "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(filename + ".tmp", filename)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        self._memory.clear()
+
+    def request(self, name, conf):
+        return CacheRequest(self, name, conf)
+
+    def call(self, name, conf, run):
+        request = self.request(name, conf)
+        if request.complete:
+            return request.result
+        return request.store(run(request.conf))
+
+    async def call_async(self, name, conf, run):
+        request = self.request(name, conf)
+        if request.complete:
+            return request.result
+        return request.store(await run(request.conf))
+
+
+class CacheRequest:
+    '''
+        Outcome of a cache lookup.
+        If not complete, conf holds what is left to evaluate (only the missing rows in row mode)
+        and store(result) caches the evaluation and returns the full result.
+    '''
+    def __init__(self, cache, name, conf) -> None:
+        self.cache = cache
+        self.conf = conf
+        self.complete = False
+        self.result = None
+        rows = cache.rows
+        try:
+            if rows is not None and rows in conf:
+                base = stable_hash(name, { key: value for key, value in conf.items() if key != rows })
+                self.batch = np.asarray(conf[rows])
+                self.keys = [ stable_hash(base, row) for row in self.batch ]
+            else:
+                self.batch = None
+                self.keys = [ stable_hash(name, conf) ]
+        except Uncacheable as e:
+            logging.debug(f"[ActionCache] {name} is not cached: {e}")
+            self.keys = None
+            return
+        if len(self.keys) == 0:
+            self.keys = None
+            return
+
+        found = [ cache.get(key) for key in self.keys ]
+        self.values = [ value for _, value in found ]
+        self.missing = [ i for i, (hit, _) in enumerate(found) if not hit ]
+        if not self.missing:
+            self.complete = True
+            self.result = self.values[0] if self.batch is None else stack_rows(self.values)
+        elif self.batch is not None:
+            self.conf = dict(conf)
+            self.conf[rows] = self.batch[self.missing]
+
+    def store(self, result):
+        if self.keys is None:
+            return result
+        if self.batch is None:
+            self.cache.put(self.keys[0], result)
+            return result
+        for i, value in zip(self.missing, split_rows(result, len(self.missing))):
+            self.values[i] = value
+            self.cache.put(self.keys[i], value)
+        return stack_rows(self.values)
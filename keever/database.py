@@ -1,123 +1,145 @@
-import uuid
 import numpy as np
-from scipy.stats.qmc import LatinHypercube
-from keever.tools import serialize_json
+from keever.tools import serialize_json, serialize_npy, randids, randid
+from keever.storage import make_storage
+from keever.sampling import sample
+from keever.space import variable_types, variable_is, variable_size, variable_space
+from keever.query import SortedIndex
+from keever.neighbors import NeighborIndex
+from keever.trace import traced, file_bytes
+from keever.cache import stable_hash
+from keever.export import export_formats, export_path, export_signature, remove_export
 from copy import copy
-from keever import TMPDIR 
+import weakref
+from keever import make_tmpdir
 from os.path import join
 from math import prod
 
 import logging
 
-variable_types = {
-    "real":   {"continuous": True,  "discrete": True, "ordered": True},
-    "vreal":  {"continuous": True,  "discrete": True, "ordered": True},
-    "categ":  {"continuous": False, "discrete": True, "ordered": False},
-    "vcateg": {"continuous": False, "discrete": True, "ordered": False},
-}
-
-def variable_is(var, target_property):
-    if var["type"] not in variable_types:
-        logging.error(f"[variable_is/database.py] Unknown variable type {var['type']}.")
-    return variable_types[var["type"]][target_property]
-
-def variable_size(variable):
-    size = variable["size"] if "size" in variable else 1
-    size = prod(size) if isinstance(size, list) else size
-    return size
 def count_continuous_variables(variables_description):
-    count = 0
-    for var in variables_description:
-        if variable_is(var, "continuous"):
-            count += variable_size(var)
-    return int(count)
+    return variable_space(variables_description).continuous_size
 
 def count_categorical_variables(variables_description):
-    count = 0
-    for var in variables_description:
-        if variable_is(var, "discrete") and not variable_is(var, "ordered"):
-            count += variable_size(var)
-    return int(count)
+    return variable_space(variables_description).categorical_size
+
 def countinuous_variables_boundaries(variables_description):
-    varcount = count_continuous_variables(variables_description)
-    bounds = np.zeros((2, varcount))
-    cur = 0
-    for i, var in enumerate(variables_description):
-        if variable_is(var, "continuous"):
-            lc = variable_size(var)
-            bounds[0, cur:cur+lc] = var["lower"]
-            bounds[1, cur:cur+lc] = var["upper"]
-            cur += lc
-    return bounds
+    return variable_space(variables_description).bounds.copy()
 
 def categorical_variables_num_values(variables_description):
-    varcount = count_categorical_variables(variables_description)
-    count = np.zeros((varcount), dtype=int)
-    cur = 0
-    for i, var in enumerate(variables_description):
-        if variable_is(var, "discrete") and not variable_is(var, "ordered"):
-            lc = variable_size(var)
-            count[cur:cur+lc] = var["count"]
-            cur += lc
-    return count
+    return variable_space(variables_description).categories.copy()
 
+def remove_exports(exports):
+    ''' Removes the shared export files of a Database, once it is collected or at exit. '''
+    for name in exports:
+        remove_export(name)
+    exports.clear()
 
 
 class Database:
-    def __init__(self, name="untitled", variables_descr={}, storages=[]) -> None:
-        if variables_descr:
-            self.variables_descr = variables_descr["params"]
+    def __init__(self, name="untitled", variables_descr={}, storages=[], backend="dict") -> None:
+        self.variables_descr = variables_descr["params"] if variables_descr else []
+        self._space = None
         self.storage_descr = storages
-        self._data = { key: {} for key in storages}
-        self._data.update({"variables": {}})
+        self.backend = backend
+        keys = [ variable['name'] for variable in self.variables_descr ] + list(storages) + ["variables"]
+        self._storage = make_storage(backend, keys, self.column_shapes)
         self.exporters = {}
         self.name = name
+        self._journal = None
+        self.version = 0 # Incremented by every mutation
+        self._exports = dict() # filename -> [(exporter, version, keys), references, signature], see export_shared
+        weakref.finalize(self, remove_exports, self._exports)
+        self._indexes = dict() # key -> SortedIndex, see index
+        self._neighbors = None # NeighborIndex of the designs, see neighbors
+        self._cache_key = None # (version, key), see cache_key
 
     def __iter__(self):
         class DatabaseIterator:
+            ''' Iterates in insertion order over the entries present when iteration started. '''
             def __init__(self, db) -> None:
-                self.current = 0
+                self.entries = iter(db.entries)
                 self.db = db
             def __next__(self):
-                if self.current < len(self.db.entries):
-                    entry = self.db.entries[self.current]
-                    self.current += 1
-                    return entry, self.db[entry]
-                else:
-                    raise StopIteration
+                entry = next(self.entries)
+                return entry, self.db[entry]
         
         return DatabaseIterator(self)
 
     @property
-    def state_dict(self, include_data=True):
+    def space(self):
         '''
-            Produces a dict serialization of the Database.
+            The compiled VariableSpace of variables_descr, rebuilt when variables_descr is replaced.
+        '''
+        if self._space is None or self._space_descr is not self.variables_descr:
+            self._space = variable_space(self.variables_descr)
+            self._space_descr = self.variables_descr
+        return self._space
+
+    @property
+    def column_shapes(self):
+        '''
+            Shapes and dtypes of the variables columns, as known from the description.
+            Storages are shaped by the first value stored.
+        '''
+        space = self.space
+        return { name: ((int(size),), float if continuous else int)
+                 for name, size, continuous in zip(space.names, space.sizes, space.continuous) }
+
+    def describe(self):
+        '''
+            Produces a dict description of the Database, without data.
         '''
-        ret = {
-            "storage":      self.storage_descr,
+        return {
+            "storages":     self.storage_descr,
             "exporters":    self.exporters,
             "name":         self.name,
             "type":         "Database",
+            "backend":      self.backend,
             "variables":    self.variables_descr # @TODO Should be moved outside soon
         }
-        if include_data:
-            ret.update({"_data": self._data})
+
+    @property
+    def state_dict(self):
+        '''
+            Produces a dict serialization of the Database.
+        '''
+        ret = self.describe()
+        ret.update({"_data": self._storage.to_dict()})
+        return ret
+
+    @property
+    def binary_state_dict(self):
+        '''
+            Same as state_dict, with data stored as one array per key (see serialize_npy).
+        '''
+        ret = self.describe()
+        ret.update({"_columns": self._storage.to_columns()})
         return ret
 
     def load_state_dict(self, state_dict):
         self.name = state_dict["name"]
         self.variables_descr = state_dict["variables"] if "variables" in state_dict else {}
         self.storage_descr   = state_dict["storages"]   if "storages"  in state_dict else []
+        if "storage" in state_dict: # Older checkpoints
+            self.storage_descr = state_dict["storage"]
         self.exporters = state_dict["exporters"] if "exporters" in state_dict else {}
-        self._data = { variable['name']: {} for variable in self.variables_descr  }
-        self._data.update({ key: {} for key in self.storage_descr })
+        self.backend   = state_dict["backend"]   if "backend"   in state_dict else "dict"
+        keys = [ variable['name'] for variable in self.variables_descr ] + list(self.storage_descr)
+        self._storage = make_storage(self.backend, keys, self.column_shapes)
+        self.version += 1
+        self._indexes.clear()
+        self._neighbors = None
 
         if "_data" in state_dict.keys():
-            self._data.update(state_dict["_data"])
+            self._storage.load_dict(state_dict["_data"])
+        elif "_columns" in state_dict.keys():
+            self._storage.load_columns(state_dict["_columns"])
 
         # @TODO This should go away with variables descr
-        if "populate-on-creation" in state_dict.keys() and state_dict["populate-on-creation"]:
-            self.populate(state_dict["populate-on-creation"]["algo"], state_dict["populate-on-creation"]["count"])
+        loaded = "_data" in state_dict.keys() or "_columns" in state_dict.keys()
+        if not loaded and "populate-on-creation" in state_dict.keys() and state_dict["populate-on-creation"]:
+            populate = state_dict["populate-on-creation"]
+            self.populate(populate["algo"], populate["count"], populate["seed"] if "seed" in populate else None)
 
         return self
 
@@ -128,134 +150,444 @@ class Database:
     @property
     def entries(self):
         '''
-            Returns the unique identifiers of all individuals
-            @TODO I want to remove the 'magic and always present' variables key by something more robust.
+            Returns the unique identifiers of all individuals, in insertion order.
+            The index is maintained by the storage on add/update/merge/clear.
         '''
-        entries = set()
-        for variable in self._data.keys():
-            for indiv in self._data[variable].keys():
-                entries.add(indiv)
+        return self._storage.entries
 
-        return list(entries)
+    def keys(self):
+        return self.entries
     
     
     def __len__(self):
         ''' Returns the number of individuals in the database '''
-        return len(self.entries)
+        return len(self._storage)
     
     def clear(self):
-        for key in self._data.keys():
-            self._data[key].clear()
+        self._storage.clear()
+        for index in self._indexes.values():
+            index.clear()
+        if self._neighbors is not None:
+            self._neighbors.clear()
+        self._mutation("clear")
     
     def add_entry(self, name, dictionnary):
-        for key in dictionnary.keys():
-            self._data[key][name] = dictionnary[key]
+        self._replacing([name], dictionnary)
+        self._storage.set(name, dictionnary)
+        self._reindex([name], { key: [value] for key, value in dictionnary.items() })
+        self._mutation("add_entry", name, dictionnary)
         
     def merge(self, lhs):
-        for key in self._data.keys():
-            self._data[key].update(lhs._data[key])
+        self._replacing(lhs.entries, ["variables"])
+        self._storage.update_from(lhs._storage)
+        for key, index in self._indexes.items():
+            entries = lhs._storage.column_entries(key)
+            if entries:
+                index.update(entries, lhs._storage.column(key))
+        if self._neighbors is not None and len(lhs) > 0:
+            self._neighbors.add(lhs.column("variables"))
+        self._mutation("merge_columns", lazy_args=lambda: (lhs._storage.to_columns(),))
+
+    def merge_columns(self, payload):
+        ''' Merges a column payload (see ColumnarStorage.to_columns), used to replay journals. '''
+        lhs = make_storage("columnar")
+        lhs.load_columns(payload)
+        self._storage.update_from(lhs)
+        self._indexes.clear()
+        self._neighbors = None
+        self._mutation("merge_columns", payload)
 
     def update_entry(self, name, dictionnary):
         for key in dictionnary.keys():
-            assert key in self.storage_descr, f"Key {key} is not allowed in storage."
-            self._data[key][name] = dictionnary[key]
+            assert key in self.storage_descr, f"Key {key} is not allowed in storage."
+        self._replacing([name], dictionnary)
+        self._storage.set(name, dictionnary)
+        self._reindex([name], { key: [value] for key, value in dictionnary.items() })
+        self._mutation("update_entry", name, dictionnary)
+
+    def add_entries(self, arrays, ids=None):
+        '''
+            Adds a batch of entries from a dict of arrays sharing their leading axis.
+            Identifiers are generated in bulk when ids is None.
+        '''
+        count = self._batch_size(arrays, ids)
+        if ids is None:
+            ids = randids(count)
+        else:
+            self._replacing(ids, arrays)
+        self._storage.set_many(list(ids), arrays)
+        self._reindex(ids, arrays)
+        self._mutation("add_entries", arrays, ids)
+        return ids
 
     def update_entries(self, entries, dictionnary):
-        for i, entry in enumerate(entries):
-            self.update_entry(entry, {key: dictionnary[key][i] for key in dictionnary.keys()})
+        for key in dictionnary.keys():
+            assert key in self.storage_descr, f"Key {key} is not allowed in storage."
+        self._batch_size(dictionnary, entries)
+        self._replacing(entries, dictionnary)
+        self._storage.set_many(list(entries), dictionnary)
+        self._reindex(entries, dictionnary)
+        self._mutation("update_entries", entries, dictionnary)
+
+    def _mutation(self, op, *args, lazy_args=None):
+        '''
+            Called after each mutation with the method name and arguments that replay it.
+            lazy_args builds the arguments instead, only when a journal records them.
+        '''
+        self.version += 1
+        for index in [ *self._indexes.values(), self._neighbors ]:
+            if index is not None and index.version == self.version - 1: # Kept up to date by the mutation
+                index.version = self.version
+        if self._journal is not None:
+            self._journal.append(self.name, op, args if lazy_args is None else lazy_args())
+
+    def _replacing(self, entries, keys):
+        ''' Called before entries are written, the neighbor index only adds designs: it is dropped when existing designs are replaced. '''
+        if self._neighbors is not None and any(key == "variables" or key in self.space.names for key in keys) \
+                and any(self._storage.contains(entry) for entry in entries):
+            self._neighbors = None
+
+    def _reindex(self, entries, columns):
+        ''' Queues the new values of indexed keys, columns holds one value per entry. '''
+        for key, index in self._indexes.items():
+            if key in columns:
+                index.update(entries, columns[key])
+        if self._neighbors is not None:
+            designs = self._designs(columns)
+            if designs is not None:
+                self._neighbors.add(designs)
+
+    def _designs(self, columns):
+        ''' Flat design matrix of a dict of columns holding 'variables' or every variable, None otherwise. '''
+        if "variables" in columns:
+            return np.asarray(columns["variables"])
+        if len(self.space) and all(name in columns for name in self.space.names):
+            return self.space.encode(columns)
+        return None
+
+    def attach_journal(self, journal):
+        self._journal = journal
+
+    def replay(self, op, args):
+        ''' Replays a journaled mutation without journaling it again. '''
+        journal, self._journal = self._journal, None
+        try:
+            getattr(self, op)(*args)
+        finally:
+            self._journal = journal
+
+    def _batch_size(self, arrays, ids=None):
+        sizes = set(len(value) for value in arrays.values())
+        if ids is not None:
+            sizes.add(len(ids))
+        assert len(sizes) <= 1, f"Batch arrays have mismatching lengths {sizes}."
+        return sizes.pop() if sizes else 0
 
 
     def __getitem__(self, key):
-        return { k: self._data[k][key] for k in self._data.keys() if key in self._data[k] }
+        return self._storage.get(key)
+
+    def column(self, key):
+        '''
+            Values of key stacked along the first axis, in entry order.
+            'variables' falls back to the concatenation of all variables if it was never stored.
+        '''
+        if key == "variables" and not self._storage.column_entries(key):
+            columns = self._variables_columns()
+            return np.hstack([ c.reshape(len(c), -1) for c in columns ]) if columns else np.empty((0,))
+        return self._storage.column(key)
+
+    def _variables_fallback(self, key):
+        return key == "variables" and not self._storage.column_entries(key) and len(self.variables_descr) > 0
+
+    def _variables_rows(self):
+        '''
+            Rows of each variable column holding the entries that have every variable, in a common order.
+            None if all variables are stored for the same entries, rows are then already aligned.
+        '''
+        entries = [ self._storage.column_entries(var["name"]) for var in self.variables_descr ]
+        if all(column_entries == entries[0] for column_entries in entries[1:]):
+            return None
+        common = set(entries[0]).intersection(*entries[1:])
+        order = [ entry for entry in entries[0] if entry in common ]
+        rows = list()
+        for column_entries in entries:
+            position = { entry: row for row, entry in enumerate(column_entries) }
+            rows.append(np.asarray([ position[entry] for entry in order ], dtype=int))
+        return rows
+
+    def _variables_columns(self):
+        ''' Variable columns, restricted to the entries that have every variable. '''
+        columns = [ self._storage.column(var["name"]) for var in self.variables_descr ]
+        rows = self._variables_rows() if len(columns) > 1 else None
+        return columns if rows is None else [ column[r] for column, r in zip(columns, rows) ]
+
+    def column_layout(self, key):
+        ''' (count, row shape, dtype) of column(key), None if it can not be streamed (see column_chunks). '''
+        if not self._variables_fallback(key):
+            return self._storage.column_layout(key)
+        layouts = [ self._storage.column_layout(var["name"]) for var in self.variables_descr ]
+        if any(layout is None for layout in layouts) or self._variables_rows() is not None:
+            return None
+        width = sum(prod(layout[1]) for layout in layouts)
+        return layouts[0][0], (width,), np.result_type(*[ layout[2] for layout in layouts ])
+
+    def column_chunks(self, key, rows, dtype=None):
+        ''' Yields column(key) by blocks of at most rows entries. '''
+        if not self._variables_fallback(key):
+            yield from self._storage.column_chunks(key, rows, dtype)
+            return
+        if self._variables_rows() is not None: # Entries are not aligned, see _variables_columns
+            column = self.column(key)
+            for start in range(0, len(column), rows):
+                yield column[start:start+rows] if dtype is None else column[start:start+rows].astype(dtype, copy=False)
+            return
+        chunks = [ self._storage.column_chunks(var["name"], rows, dtype) for var in self.variables_descr ]
+        for blocks in zip(*chunks):
+            yield np.hstack([ block.reshape(len(block), -1) for block in blocks ])
+
+    def as_arrays(self):
+        '''
+            Returns a dict of numpy columns, one per key.
+            With the columnar backend these are views on the storage, no copy is made.
+            Writing through them is not a mutation of the Database: indexes and exports are not updated.
+        '''
+        return self._storage.as_arrays()
     
+    @property
+    def cache_key(self):
+        '''
+            Key of the Database in action caches: a hash of its name, variables, entries and columns,
+            computed once per version (writing in place through as_arrays is not seen).
+        '''
+        if self._cache_key is None or self._cache_key[0] != self.version:
+            columns = { key: (self._storage.column_entries(key), self._storage.column(key)) for key in self._storage.keys() }
+            self._cache_key = (self.version, stable_hash(self.name, self.variables_descr, self.entries, columns))
+        return self._cache_key[1]
+
+    def index(self, key):
+        '''
+            The SortedIndex of a scalar storage, built at its first query
+            and then maintained incrementally by the mutations of the Database.
+        '''
+        index = self._indexes.get(key)
+        if index is None or index.version != self.version:
+            index = SortedIndex(key).build(self._storage.column_entries(key), self._storage.column(key))
+            index.version = self.version
+            self._indexes[key] = index
+        return index
+
+    def top_k(self, key, k, largest=False):
+        ''' Entries of the k smallest (or largest) values of the scalar storage key, best first. '''
+        return self.index(key).first(k, largest)
+
+    def where(self, key, lower=None, upper=None):
+        ''' Entries whose scalar storage key is within [lower, upper], by increasing value. '''
+        return self.index(key).between(lower, upper)
+
+    def mask(self, key, lower=None, upper=None):
+        '''
+            Boolean mask over entries (in entry order) of the rows where every element of key,
+            a storage or a variable, is within [lower, upper]. Bounds broadcast against the elements.
+            Entries without key are False. Masks combine with & and | and select entries in subset.
+        '''
+        values = self.column(key)
+        count = len(values)
+        values = np.asarray(values, dtype=float).reshape(count, -1)
+        inside = np.ones(values.shape, dtype=bool)
+        if lower is not None:
+            inside &= values >= lower
+        if upper is not None:
+            inside &= values <= upper
+        inside = inside.all(axis=1)
+        entries = self.entries
+        ids = entries if self._variables_fallback(key) else self._storage.column_entries(key)
+        if ids == entries:
+            return inside
+        mask = np.zeros(len(entries), dtype=bool)
+        position = { entry: row for row, entry in enumerate(entries) }
+        mask[[ position[entry] for entry in ids ]] = inside
+        return mask
+
+    def subset(self, ids, name=None):
+        '''
+            New Database with the same description, holding a copy of the entries ids
+            (a list of entries or a mask from Database.mask).
+        '''
+        if isinstance(ids, np.ndarray) and ids.dtype == bool:
+            ids = np.asarray(self.entries, dtype=object)[ids]
+        ids = list(ids)
+        db = Database.from_json(self.describe())
+        db.name = name if name is not None else f"{self.name}.subset"
+        db._storage = self._storage.take(ids)
+        return db
+
+    def neighbors(self):
+        '''
+            The NeighborIndex of the designs, built at its first query, then extended by
+            add_entry, add_entries (append_npz_keys) and merge.
+            Points are only added: the index is built again after designs of existing entries are replaced.
+        '''
+        if self._neighbors is None or self._neighbors.version != self.version:
+            self._neighbors = NeighborIndex(self.space).build(self._design_points())
+            self._neighbors.version = self.version
+        return self._neighbors
+
+    def _design_points(self):
+        ''' Designs stored as variables columns and as 'variables' rows, in no particular order. '''
+        parts = [np.empty((0, self.space.size))]
+        if self._storage.column_entries("variables"):
+            parts.append(self._storage.column("variables").reshape(-1, self.space.size))
+        columns = dict(zip(self.space.names, self._variables_columns()))
+        if len(columns) and len(columns[self.space.names[0]]):
+            parts.append(self.space.encode(columns))
+        return np.vstack(parts)
+
+    def near_duplicates(self, candidates, tolerance=1e-3, p=2):
+        '''
+            Mask of the candidates within tolerance of a design of the Database.
+            candidates: flat design matrix (like the 'variables' column) or dict of variable columns
+            tolerance: distance in normalized units, continuous variables are scaled to [0, 1] by their bounds
+            p: Minkowski norm of the distance, np.inf bounds the difference of every element
+        '''
+        candidates = self._designs(candidates) if isinstance(candidates, dict) else candidates
+        return self.neighbors().query(candidates, tolerance, p)
+
+    def filter_duplicates(self, candidates, tolerance=1e-3, p=2, within=True):
+        '''
+            The candidates (matrix rows or dict of columns) that are not near duplicates of the designs of the Database,
+            nor, if within, of an earlier candidate.
+        '''
+        designs = self._designs(candidates) if isinstance(candidates, dict) else np.asarray(candidates)
+        keep = ~self.near_duplicates(designs, tolerance, p)
+        if within:
+            keep &= self.neighbors().unique(designs, tolerance, p)
+        if isinstance(candidates, dict):
+            return { key: np.asarray(value)[keep] for key, value in candidates.items() }
+        return designs[keep]
+
     def store_in_file(self, path, method, keys):
-        payload = { key: np.asarray([ self._data[key][entity] for entity in self._data[key].keys() ]) for key in keys }
-        if method == "npz":
-            np.savez_compressed(path, **payload)
-        else:
-            logging.error("Unsupported export format")
+        '''
+            Writes keys in the format method (see keever.export.export_formats).
+            Returns the path written, with its extension.
+        '''
+        if method not in export_formats:
+            logging.error(f"Unsupported export format {method}.")
+            return None
+        path = export_path(path, method)
+        export_formats[method](path, self, keys)
+        return path
 
     def export(self, exporter):
-        ''' Used for exporting Database keys to any file format '''
-        print(exporter)
+        ''' Used for exporting Database keys to any file format, the caller owns the file written. '''
+        return self._write_export(exporter)
+
+    def export_shared(self, exporter):
+        '''
+            Like export, but the file is shared by all exports of the same version of the Database and
+            exported keys, as long as it is not modified or removed. Each call should be matched by a call
+            to release_export once the file is not used anymore, files are removed by the Database.
+            Writing in place through the views of as_arrays does not change the version:
+            call clear_exports afterwards so the next export is written again.
+        '''
+        key = (exporter, self.version, tuple(self.exporters[exporter]))
+        for name, export in self._exports.items():
+            if export[0] == key and export[2] == export_signature(name):
+                export[1] += 1
+                return name
+        name = self._write_export(exporter)
+        self._exports[name] = [key, 1, export_signature(name)]
+        return name
+
+    @traced("Database.export", "database", label=lambda db, exporter: f"{db.name}.{exporter}", measure=file_bytes)
+    def _write_export(self, exporter):
         assert exporter != 'object', f"Invalid database exporter: {exporter}."
         assert exporter.count('.') == 1, "Database exporter expected 1 argument."
         export_format, export_name = exporter.split(".")
-        export_filename = join(TMPDIR, f"{self.name}.dbexport.{str(uuid.uuid1())[:5]}.{export_format}")
-        self.store_in_file(export_filename, export_format, self.exporters[exporter])
-        return export_filename
+        assert export_format in export_formats, f"Unsupported export format {export_format}."
+        export_filename = join(make_tmpdir(), f"{self.name}.dbexport.{export_name}.{randid()}")
+        return self.store_in_file(export_filename, export_format, self.exporters[exporter])
+
+    def release_export(self, filename):
+        '''
+            Releases a file returned by export_shared. Files that can not be reused are removed once released,
+            the file of the current version is kept for the next export.
+        '''
+        if filename in self._exports and self._exports[filename][1] > 0:
+            self._exports[filename][1] -= 1
+        for name, ((exporter, version, keys), references, signature) in list(self._exports.items()):
+            current = version == self.version and exporter in self.exporters and keys == tuple(self.exporters[exporter])
+            if references == 0 and not (current and signature == export_signature(name)):
+                remove_export(name)
+                del self._exports[name]
+
+    def clear_exports(self):
+        ''' Removes the shared export files that are not in use. '''
+        for name, (key, references, signature) in list(self._exports.items()):
+            if references == 0:
+                remove_export(name)
+                del self._exports[name]
+
+    def __getstate__(self):
+        ''' Shared exports belong to this process, copies start without them. '''
+        state = copy(self.__dict__)
+        state["_exports"] = dict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        weakref.finalize(self, remove_exports, self._exports)
 
     @property
     def num_scalar_variables(self):
         ''' @TODO Remove '''
-        return count_continuous_variables(self.variables_descr)
+        return self.space.continuous_size
 
     @property
     def continuous_variables_names(self):
-        names = list()
-        for i in self.continuous_variables_indices:
-            names.append(self.variables_descr[i]["name"])
-        return names
+        return list(self.space.continuous_names)
 
     @property
     def continuous_variables_indices(self):
-        indices = list()
-        for i, variable in enumerate(self.variables_descr):
-            if variable["type"] in ["vreal", "real"]:
-                indices.append(i)
-        return indices
+        return list(self.space.continuous_indices)
 
     @property
     def continuous_variables_sizes(self):
-        sizes = list()
-        for i in self.continuous_variables_indices:
-            sizes.append(variable_size(self.variables_descr[i]))
-        return sizes
+        return list(self.space.continuous_sizes)
 
     def assert_empty(self):
-        for key in self._data.keys():
-            assert(len(self._data[key]) == 0)
+        assert(len(self._storage) == 0)
         return self
 
-    def populate(self, algorithm, count):
+    def populate(self, algorithm, count, seed=None):
+        '''
+            Adds count designs drawn by the sampler algorithm (see keever.sampling.samplers) in a single batch.
+            seed makes the designs reproducible.
+        '''
         logging.debug(f"populating with {algorithm} {count} individuals.")
-        sampler = LatinHypercube(d=self.num_scalar_variables)
-        configs = sampler.random(n=count)
-        bounds = countinuous_variables_boundaries(self.variables_descr)
-        configs *= (bounds[1] - bounds[0])
-        configs += bounds[0]
-
-        variables = self.continuous_variables_names
-        variables_sizes = self.continuous_variables_sizes
-        variables_positions = np.cumsum([0]+variables_sizes)
-
-        for conf in configs:
-            individual_name = str(uuid.uuid1())
-            logging.debug(f"Adding individual {individual_name}.")
-            entry = {}
-            for variable, offset, size in zip(variables, variables_positions, variables_sizes):
-                entry.update({variable: conf[offset:offset+size]})
-            self.add_entry(individual_name, entry)
+        ids = self.add_entries(sample(self.variables_descr, algorithm, count, seed))
         logging.info("Finished populating.")
+        return ids
 
-        
     def same_variables(self, lhs):
         self.variables_descr = copy(lhs.variables_descr)
 
     def append_npz_keys(self, file, keys):
         d = np.load(file)
-        num = d[keys[0]].shape[0]
-        for i in range(num):
-            individual_name = str(uuid.uuid1())
-            self.add_entry(individual_name, { key: d[key][i] for key in keys})
+        return self.add_entries({ key: d[key] for key in keys })
 
     def serialize(self, method, filepath=None):
         if filepath is None:
             filepath = join(self.workdir, self.name + ".json")
         if method == "json":
             serialize_json(self.state_dict, filepath)
+        elif method == "npy":
+            serialize_npy(self.binary_state_dict, filepath)
         else:
             logging.error(f"Unknown serializer {method}.")
         return filepath
 
+    def save(self, filename, method="json"):
+        return self.serialize(method, filename)
+
 
@@ -0,0 +1,75 @@
+'''
+    Database exporters, selected by the format part of an exporter name ("npz.all", "npy.train", ...).
+    npz:     zip archive of .npy files, compressed
+    npz-raw: same archive, stored without compression
+    npy:     directory of .npy files, np.load(..., mmap_mode="r") maps them without reading
+    Columns are written by chunks, a second full copy of a column is never held in memory.
+'''
+import os
+import shutil
+import zipfile
+import numpy as np
+
+chunk_bytes = 1 << 24
+
+
+def write_column(f, db, key):
+    ''' Writes column key of db as a .npy stream in the open binary file f. '''
+    layout = db.column_layout(key)
+    if layout is None: # Ragged or object columns are written at once
+        np.lib.format.write_array(f, db.column(key), allow_pickle=True)
+        return
+    count, shape, dtype = layout
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (count,) + tuple(shape)}
+    np.lib.format.write_array_header_1_0(f, header)
+    rows = max(1, chunk_bytes // max(1, dtype.itemsize * int(np.prod(shape, dtype=int))))
+    for chunk in db.column_chunks(key, rows, dtype):
+        f.write(np.ascontiguousarray(chunk).data)
+
+def write_npz(path, db, keys, compress=True):
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(path, "w", compression=compression, allowZip64=True) as archive:
+        for key in keys:
+            with archive.open(key + ".npy", "w", force_zip64=True) as f:
+                write_column(f, db, key)
+
+def write_npz_raw(path, db, keys):
+    write_npz(path, db, keys, compress=False)
+
+def write_npy(path, db, keys):
+    os.makedirs(path, exist_ok=True)
+    for key in keys:
+        with open(os.path.join(path, key + ".npy"), "wb") as f:
+            write_column(f, db, key)
+
+
+export_formats = {
+    "npz": write_npz,
+    "npz-raw": write_npz_raw,
+    "npy": write_npy,
+}
+
+export_extensions = {
+    "npz": ".npz",
+    "npz-raw": ".npz",
+    "npy": ".columns",
+}
+
+def export_path(path, method):
+    extension = export_extensions[method]
+    return path if path.endswith(extension) else path + extension
+
+def export_signature(path):
+    ''' Sizes and modification times of an export file (or directory), None once it was removed. '''
+    if os.path.isdir(path):
+        return tuple(sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns) for entry in os.scandir(path)))
+    elif os.path.isfile(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+    return None
+
+def remove_export(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.isfile(path):
+        os.remove(path)
@@ -0,0 +1,72 @@
+'''
+    Append-only journal of Database mutations.
+    A journal complements a full snapshot: it holds the mutations made since
+    that snapshot, so a checkpoint only writes what changed.
+'''
+import os
+import pickle
+import logging
+
+
+class Journal:
+    '''
+        Each record is a pickled (item, op, args) tuple.
+        The first record names the snapshot generation the journal applies to.
+    '''
+    def __init__(self, path, generation) -> None:
+        self.path = path
+        self.generation = generation
+        self._file = open(path, "wb")
+        self.append(None, "generation", (generation,))
+
+    def append(self, item, op, args):
+        pickle.dump((item, op, args), self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __del__(self):
+        self.close()
+
+    @property
+    def size(self):
+        return self._file.tell()
+
+
+def read_journal(path):
+    ''' Yields the records of a journal, a truncated last record (crash while writing) is ignored. '''
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+            except (pickle.UnpicklingError, ValueError):
+                logging.warning(f"[journal] Ignoring truncated record at the end of {path}.")
+                return
+
+
+def replay_journal(path, generation, items):
+    '''
+        Replays the journal at path on items (name -> object with a replay method).
+        Nothing is replayed if the journal belongs to another snapshot generation.
+    '''
+    records = read_journal(path)
+    first = next(records, None)
+    if first is None or first[1] != "generation" or first[2][0] != generation:
+        logging.info(f"[journal] {path} does not match snapshot {generation}, skipped.")
+        records.close()
+        return 0
+    count = 0
+    for item, op, args in records:
+        if item not in items:
+            logging.warning(f"[journal] Unknown item {item} in {path}.")
+            continue
+        items[item].replay(op, args)
+        count += 1
+    return count
@@ -0,0 +1,82 @@
+'''
+    Near-duplicate detection over the designs of a Database, before evaluating candidates.
+    Designs are compared in the normalized space of their continuous variables (see VariableSpace.to_unit),
+    categorical elements must match exactly. Points live in a KD-tree (scipy.spatial.cKDTree), points added
+    afterwards in a second, small tree rebuilt on the next query. The points of the small tree are merged in
+    the large one once they outnumber a fraction of it, so appending a batch of designs does not rebuild it.
+'''
+import numpy as np
+
+categorical_spacing = 1e3 # Distance between two categories, larger than any tolerance
+rebuild_ratio = 0.25
+
+
+class NeighborIndex:
+    def __init__(self, space) -> None:
+        self.space = space
+        self.version = None # Database version the index is up to date with
+        self._trees = [None, None]
+        self._points = [np.empty((0, self.dimension)), np.empty((0, self.dimension))] # Large and small tree
+        self._pending = list() # Blocks of points added since the small tree was built
+
+    @property
+    def dimension(self):
+        return self.space.continuous_size + len(self.space.discrete_columns)
+
+    def __len__(self):
+        return sum(len(points) for points in self._points) + sum(len(block) for block in self._pending)
+
+    def coordinates(self, matrix):
+        ''' Normalized continuous elements followed by the spaced categorical elements of a flat design matrix. '''
+        matrix = np.asarray(matrix, dtype=float).reshape(-1, self.space.size)
+        return np.hstack([self.space.to_unit(matrix), categorical_spacing * matrix[:, self.space.discrete_columns]])
+
+    def build(self, matrix):
+        self._points = [self.coordinates(matrix), np.empty((0, self.dimension))]
+        self._trees = [None, None]
+        self._pending.clear()
+        return self
+
+    def clear(self):
+        return self.build(np.empty((0, self.space.size)))
+
+    def add(self, matrix):
+        if len(matrix):
+            self._pending.append(self.coordinates(matrix))
+
+    def _update_trees(self):
+        from scipy.spatial import cKDTree
+        if self._pending:
+            self._points[1] = np.vstack([self._points[1]] + self._pending)
+            self._pending.clear()
+            self._trees[1] = None
+            if len(self._points[1]) > rebuild_ratio * len(self._points[0]):
+                self._points = [np.vstack(self._points), np.empty((0, self.dimension))]
+                self._trees = [None, None]
+        for i, points in enumerate(self._points):
+            if self._trees[i] is None and len(points):
+                self._trees[i] = cKDTree(points, balanced_tree=False, compact_nodes=False) # Faster to build, as fast to query
+
+    def query(self, candidates, tolerance, p=2):
+        '''
+            Mask of the candidates (flat design matrix) within tolerance of an indexed design,
+            in normalized units. p is the Minkowski norm, p=np.inf compares every element to tolerance.
+        '''
+        self._update_trees()
+        points = self.coordinates(candidates)
+        found = np.zeros(len(points), dtype=bool)
+        for tree in self._trees:
+            if tree is not None and len(points):
+                distances, _ = tree.query(points, k=1, p=p, distance_upper_bound=np.nextafter(tolerance, np.inf))
+                found |= distances <= tolerance
+        return found
+
+    def unique(self, candidates, tolerance, p=2):
+        ''' Mask keeping the first of the candidates that are within tolerance of each other. '''
+        from scipy.spatial import cKDTree
+        points = self.coordinates(candidates)
+        keep = np.ones(len(points), dtype=bool)
+        for i, j in sorted(cKDTree(points).query_pairs(tolerance, p=p)):
+            if keep[i]:
+                keep[j] = False
+        return keep
@@ -5,9 +5,15 @@ from argparse import ArgumentParser
 parser = ArgumentParser()
 parser.add_argument("--project", required=True)
 parser.add_argument("--logfile", default="keever.log")
+parser.add_argument("--trace", default=None, help="Writes a Chrome trace of the run to this file and prints a timing summary")
+parser.add_argument("--concurrency", type=int, default=None, help="Number of independent playbook steps run at once (playbook.concurrency, defaults to 1)")
+parser.add_argument("--resume", default=None, help="Checkpoint directory to resume the playbook from")
 args = parser.parse_args()
 
 from keever.algorithm import ModelManager
+from keever.trace import tracer, traced
+from keever.playbook import run_steps, save_checkpoint, load_checkpoint
+import atexit
 import yaml
 from types import SimpleNamespace
 import numpy as np
@@ -31,13 +37,34 @@ logging.basicConfig(
 )
 
 
-config = yaml.safe_load(open(args.project, "r"))
-mm = ModelManager()
-mm.load_state_dict(config)
+if args.trace:
+    def dump_trace():
+        tracer.dump(args.trace)
+        print(tracer.summary_table())
+        logging.info(f"Trace written to {args.trace}.")
+    tracer.enable()
+    atexit.register(dump_trace)
 
+config = yaml.safe_load(open(args.project, "r"))
 global_vars = SimpleNamespace()
 state = global_vars.state = SimpleNamespace(running=True, iterations=0)
 
+position = None
+if args.resume:
+    mm, variables, position = load_checkpoint(args.resume)
+    global_vars.__dict__.update(variables)
+    state.iterations = position["iterations"]
+    logging.info(f"Resuming from {args.resume} at {position}.")
+else:
+    mm = ModelManager()
+    mm.load_state_dict(config)
+
+def clear_exports():
+    ''' Export files are kept while their Database is unchanged, they are removed when the playbook ends. '''
+    for item in mm.items.values():
+        if hasattr(item, "clear_exports"):
+            item.clear_exports()
+atexit.register(clear_exports)
 
 logging.getLogger().setLevel(logging.INFO)
 
@@ -65,6 +92,7 @@ def var(x):
     else:
         return x
 
+@traced("play_action", "playbook", label=lambda action: action.type)
 def play_action(action):
     global state
     logging.debug(f"Playing {action=}")
@@ -86,6 +114,16 @@ def play_action(action):
     elif action.type == "merge":
         target = mm.get(action.target)
         mm.get(action.item).merge(target)
+    elif action.type == "top-k":
+        db = mm.get(action.item)
+        ret = db.subset(db.top_k(action.storage, var(action.k), largest=action.largest if hasattr(action, "largest") else False))
+
+    elif action.type == "checkpoint":
+        phase, index = action._step
+        path = action.directory if hasattr(action, "directory") else os.path.join(mm._workdir, "checkpoints", action.name)
+        variables = { key: value for key, value in global_vars.__dict__.items() if key != "state" }
+        ret = save_checkpoint(path, mm, variables, {"phase": phase, "index": index, "iterations": state.iterations},
+                              method=action.method if hasattr(action, "method") else "npy")
 
     elif action.type == "stop":
         if "loops" in action.__dict__:
@@ -114,20 +152,29 @@ def play_action(action):
         else:
             global_vars.__dict__[action.output] = ret
 
-for i, action in enumerate(config["playbook"]["init"]):
-    if not state.running:
-        logging.info("Playbook is over.")
-        break
-    action = SimpleNamespace(**action)
-    play_action(action)
+# Steps that do not share variables or items may run concurrently, see keever.playbook
+concurrency = args.concurrency or (config["playbook"]["concurrency"] if "concurrency" in config["playbook"] else 1)
+play = lambda action: play_action(SimpleNamespace(**action))
+
+def steps(phase):
+    ''' Steps of a playbook phase, tagged with their position for checkpoints. '''
+    return [ {**action, "_step": (phase, i)} for i, action in enumerate(config["playbook"][phase]) ]
+
+# On resume, steps up to the checkpoint were completed
+if position is None:
+    run_steps(steps("init"), play, concurrency, running=lambda: state.running)
+elif position["phase"] == "init":
+    run_steps(steps("init")[position["index"]+1:], play, concurrency, running=lambda: state.running)
+if not state.running:
+    logging.info("Playbook is over.")
 
 if not "loop" in config["playbook"]:
     exit()
 
+start = position["index"] + 1 if position is not None and position["phase"] == "loop" else 0
 while state.running:
-    for i, action in enumerate(config["playbook"]["loop"]):
-        action = SimpleNamespace(**action)
-        play_action(action)
+    run_steps(steps("loop")[start:], play, concurrency)
+    start = 0
     state.iterations += 1
 
 
@@ -0,0 +1,151 @@
+'''
+    Dependency aware scheduling of playbook steps.
+    A step reads the global variables (#var) and items (@item) it refers to, writes its
+    output names, and mutates the item of mutating step types.
+    Items passed to an action (or as update-entries values) may be mutated by it, they count as writes.
+    Two steps depend on each other when one writes what the other reads or writes,
+    so steps touching the same data keep their playbook order, the others may overlap.
+    Checkpoints save what is needed to resume a playbook after a given step.
+'''
+import os
+import pickle
+import logging
+from os.path import join
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+mutating_types = ["action", "update-entries", "clear", "merge"]
+mutating_arguments = {"action": "args", "update-entries": "values"}
+barrier_types = ["checkpoint"]
+
+
+def references(value):
+    ''' Yields the #var (first path component) and @item references found in value. '''
+    if isinstance(value, str):
+        if value.startswith("#"):
+            yield "#" + value[1:].split(".")[0]
+        elif value.startswith("@"):
+            yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from references(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            yield from references(v)
+
+
+class PlaybookStep:
+    def __init__(self, index, action) -> None:
+        self.index = index
+        self.action = action
+        self.type = action["type"] if "type" in action else None
+        self.reads = set()
+        self.writes = set()
+        self.barrier = self.type in barrier_types
+
+        for key, value in action.items():
+            if key not in ["type", "output", "msg"]:
+                self.reads.update(references(value))
+        if "item" in action:
+            if self.type in mutating_types:
+                self.writes.add("@" + action["item"])
+            else:
+                self.reads.add("@" + action["item"])
+        if self.type in mutating_arguments and mutating_arguments[self.type] in action:
+            self.writes.update(ref for ref in references(action[mutating_arguments[self.type]]) if ref.startswith("@"))
+        if self.type == "merge" and "target" in action:
+            self.reads.add("@" + action["target"])
+        if self.type == "dump_npz" and "args" in action:
+            self.reads.update("#" + name for name in action["args"])
+        if self.type == "stop":
+            self.reads.add("#state")
+            self.writes.add("#state")
+
+        output = action["output"] if "output" in action else None
+        if isinstance(output, dict):
+            self.barrier = True # copydict writes names only known at run time
+        elif isinstance(output, list):
+            self.writes.update("#" + name for name in output)
+        elif output is not None:
+            self.writes.add("#" + output)
+
+    def conflicts(self, other):
+        return self.barrier or other.barrier or bool(
+            self.writes & (other.reads | other.writes) or other.writes & self.reads)
+
+
+def dependencies(steps):
+    ''' For each step, the indices of the earlier steps it must wait for. '''
+    return [ set(j for j in range(i) if steps[i].conflicts(steps[j])) for i in range(len(steps)) ]
+
+
+def run_steps(actions, play, concurrency=1, running=None):
+    '''
+        Plays actions, a list of playbook steps, with play(action).
+        With concurrency > 1, steps run on a thread pool as soon as the steps they depend on are done.
+        running: if given, no step is started once it returns False.
+    '''
+    if concurrency <= 1:
+        for action in actions:
+            if running is not None and not running():
+                return
+            play(action)
+        return
+
+    steps = [ PlaybookStep(i, action) for i, action in enumerate(actions) ]
+    waiting = dependencies(steps)
+    pending = set(range(len(steps)))
+    done = set()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = dict()
+        while pending or futures:
+            if running is None or running():
+                ready = sorted(i for i in pending if waiting[i] <= done)
+                for i in ready:
+                    pending.discard(i)
+                    logging.debug(f"[run_steps] Starting step {i} ({steps[i].type}).")
+                    futures[executor.submit(play, actions[i])] = i
+            elif not futures:
+                return
+            if not futures:
+                raise RuntimeError(f"Playbook steps {sorted(pending)} can not be scheduled.")
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = futures.pop(future)
+                try:
+                    future.result()
+                except BaseException:
+                    for other in futures:
+                        other.cancel()
+                    raise
+                done.add(i)
+
+
+def save_checkpoint(path, mm, variables, position, method="npy"):
+    '''
+        Persists, in directory path, the items of mm (see ModelManager.save),
+        the playbook global variables and the position of the checkpoint step:
+        {"phase": "init" or "loop", "index": step index, "iterations": completed loops}.
+        Variables that do not pickle are left out with a warning.
+    '''
+    os.makedirs(path, exist_ok=True)
+    mm.save(join(path, "items"), method)
+    saved = dict()
+    for name, value in variables.items():
+        try:
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            saved[name] = value
+        except Exception as e:
+            logging.warning(f"[checkpoint] Variable {name} is not saved: {e}")
+    with open(join(path, "playbook.pkl.tmp"), "wb") as f:
+        pickle.dump({"variables": saved, "position": position}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(join(path, "playbook.pkl.tmp"), join(path, "playbook.pkl"))
+    logging.info(f"[checkpoint] Saved {path} at {position}.")
+    return path
+
+def load_checkpoint(path):
+    ''' Returns the ModelManager, the global variables and the position saved by save_checkpoint. '''
+    from keever.algorithm import ModelManager
+    with open(join(path, "playbook.pkl"), "rb") as f:
+        data = pickle.load(f)
+    mm = ModelManager().load(join(path, "items"))
+    return mm, data["variables"], data["position"]
@@ -0,0 +1,106 @@
+'''
+    Sorted indexes on the scalar storages of a Database, behind its query methods
+    (top_k, where, mask, subset).
+    An index keeps the entries sorted by value. Mutations of the Database queue their new values,
+    which are merged in the sorted arrays at the next query, so queries after a loop only pay
+    for the entries that changed. Missing and nan values are not indexed.
+'''
+import numpy as np
+
+
+class SortedIndex:
+    '''
+        Entries are numbered by a code in the order the index first saw them,
+        the sorted arrays hold values and codes so merging updates only moves numbers.
+    '''
+    def __init__(self, key) -> None:
+        self.key = key
+        self.version = None # Database version the index is up to date with, pending updates included
+        self.values = np.empty(0)                # Indexed values, sorted
+        self.codes = np.empty(0, dtype=np.int64) # Codes of the entries of values
+        self._names = list()   # code -> entry
+        self._codes = None     # entry -> code, built at the first update
+        self._value = np.empty(0) # code -> indexed value, nan if not indexed
+        self._pending = dict() # entry -> value, not merged yet
+
+    def __len__(self):
+        self._flush()
+        return len(self.values)
+
+    @staticmethod
+    def _scalars(key, values):
+        values = np.asarray(values)
+        if values.dtype.kind not in "biuf" or (values.ndim > 1 and values[0].size != 1):
+            raise ValueError(f"Only scalar numeric storages can be indexed, {key} holds {values.dtype} values of shape {values.shape[1:]}.")
+        return values.reshape(len(values)).astype(float)
+
+    def build(self, entries, values):
+        self._names = list(entries)
+        self._codes = None
+        self._value = self._scalars(self.key, values) if len(self._names) else np.empty(0)
+        codes = np.flatnonzero(~np.isnan(self._value))
+        order = np.argsort(self._value[codes], kind="stable")
+        self.codes = codes[order]
+        self.values = self._value[self.codes]
+        self._pending.clear()
+        return self
+
+    def clear(self):
+        return self.build([], [])
+
+    def update(self, entries, values):
+        ''' Queues new values of entries, merged at the next query. '''
+        self._pending.update(zip(entries, self._scalars(self.key, values).tolist()))
+
+    def _code(self, entry):
+        code = self._codes.get(entry)
+        if code is None:
+            code = self._codes[entry] = len(self._names)
+            self._names.append(entry)
+        return code
+
+    def _flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, dict()
+        if self._codes is None:
+            self._codes = { entry: code for code, entry in enumerate(self._names) }
+        codes = np.fromiter((self._code(entry) for entry in pending), dtype=np.int64, count=len(pending))
+        new = np.fromiter(pending.values(), dtype=float, count=len(pending))
+        if len(self._names) > len(self._value):
+            self._value = np.concatenate([self._value, np.full(max(len(self._names) - len(self._value), len(self._value)), np.nan)])
+        old = self._value[codes]
+        self._value[codes] = new
+        if len(pending) > len(self.values) // 4: # Sorting everything again is cheaper
+            codes = np.flatnonzero(~np.isnan(self._value[:len(self._names)]))
+            self.codes = codes[np.argsort(self._value[codes], kind="stable")]
+            self.values = self._value[self.codes]
+            return
+
+        indexed = ~np.isnan(old)
+        removed = np.searchsorted(self.values, old[indexed], side="left")
+        for i, code in enumerate(codes[indexed]):
+            while self.codes[removed[i]] != code: # Entries with equal values
+                removed[i] += 1
+        values = np.delete(self.values, removed) if len(removed) else self.values
+        sorted_codes = np.delete(self.codes, removed) if len(removed) else self.codes
+
+        added = ~np.isnan(new)
+        order = np.argsort(new[added], kind="stable")
+        new_values, new_codes = new[added][order], codes[added][order]
+        positions = np.searchsorted(values, new_values, side="right")
+        self.values = np.insert(values, positions, new_values)
+        self.codes = np.insert(sorted_codes, positions, new_codes)
+
+    def first(self, k, largest=False):
+        ''' Entries of the k smallest (or largest) values, best first. '''
+        self._flush()
+        codes = self.codes[::-1][:k] if largest else self.codes[:k]
+        return [ self._names[code] for code in codes.tolist() ]
+
+    def between(self, lower=None, upper=None):
+        ''' Entries with lower <= value <= upper, by increasing value. '''
+        self._flush()
+        start = 0 if lower is None else np.searchsorted(self.values, lower, side="left")
+        stop = len(self.values) if upper is None else np.searchsorted(self.values, upper, side="right")
+        return [ self._names[code] for code in self.codes[start:stop].tolist() ]
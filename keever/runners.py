@@ -1,16 +1,23 @@
 import subprocess
-import re
+import asyncio
+from functools import partial
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import os
 import sys
 from os.path import isfile, join
 from os import remove
-from time import sleep
+from .watch import CompletionWatcher, JobFailedError, failure_marker
 from keever.tools import randid
+from keever.trace import tracer, traced, file_bytes
 import logging
 from copy import copy
-from .tools import str_rm_substrings
+from .template import Template, compile_template
+from .shared import share_databases, close_shared
+from .surrogate import SurrogateRunner
 
-from keever import TMPDIR
+from keever import MODULE_PATHS, make_tmpdir
 
 def module_checks(module):
     if not hasattr(module, "__run__"):
@@ -37,7 +44,7 @@ def ensure_arguments_match(required, provided):
             logging.warning(f" - {e}")
 
 
-action_types = ["module_runner", "script_runner", "sequence_runner"]
+action_types = ["module_runner", "script_runner", "sequence_runner", "surrogate"]
 def load_action(data):
     at = data["type"]
     assert(at in action_types)
@@ -47,6 +54,8 @@ def load_action(data):
         return ScriptRunner.from_json(data)
     elif at == "sequence_runner":
         return SequenceRunner.from_json(data)
+    elif at == "surrogate":
+        return SurrogateRunner.from_json(data)
     else:
         print(f"Unknown runner type: {at}.")
         exit()
@@ -54,21 +63,34 @@ def load_action(data):
 def load_action_list(data):
     return dict([(action["name"], load_action(action)) for action in data])
 
-def wait_files(files, sleep_time=60):
+def wait_files(files, sleep_time=60, timeout=None):
+    '''
+        Returns as soon as all touchfiles exist, and removes them.
+        sleep_time bounds the polling interval, see keever.watch.CompletionWatcher.
+        Raises JobFailedError if a job created its failure marker, TimeoutError after timeout seconds.
+    '''
+    logging.info(f"[wait_files] There are {len(files)} touchfiles.")
+    with tracer.span("wait_files", "runner", files=len(files)):
+        CompletionWatcher(files, timeout=timeout, max_interval=sleep_time).wait()
+    logging.debug("[wait_files] All touchfiles exist")
+    for file in files:
+        remove(file) 
+
+async def wait_files_async(files, sleep_time=60, timeout=None):
+    ''' Asynchronous wait_files. '''
     logging.info(f"[wait_files] There are {len(files)} touchfiles.")
-    file_present = [ False for file in files ]
-    while True:
-        for i, file in enumerate(files):
-            if not file_present[i]:
-                logging.debug(f"[wait_files] Looking for {file}")
-                file_present[i] = isfile(file)
-        if all(file_present):
-            logging.debug("[wait_files] All touchfiles exist")
-            for file in files:
-                remove(file) 
-            break
-
-        sleep(sleep_time)
+    with tracer.span("wait_files", "runner", files=len(files)):
+        await CompletionWatcher(files, timeout=timeout, max_interval=sleep_time).wait_async()
+    logging.debug("[wait_files] All touchfiles exist")
+    for file in files:
+        remove(file) 
+
+def runner_label(runner, *args, **kwargs):
+    return runner.name
+
+def job_bytes(job):
+    ''' generate_job returns the script, or its path once launched. '''
+    return file_bytes(job) if isfile(job) else {"bytes": len(job)}
 
 class RunnerVariable:
     def __init__(self, src) -> None:
@@ -100,6 +122,9 @@ def load_module(module):
     if module_path in sys.modules:
         return sys.modules[module_path]
 
+    for path in MODULE_PATHS:
+        if path not in sys.path:
+            sys.path.append(path)
     return __import__(module_path, fromlist=[module])
 
 class SequenceRunner:
@@ -116,6 +141,7 @@ class SequenceRunner:
     def from_json(cls, data):
         return cls(data["name"], load_action_list(data["actions"]))
 
+    @traced("run_with_dict", "runner", label=runner_label)
     def run_with_dict(self, dictionnary: dict):
         conf = copy(dictionnary)
 
@@ -126,14 +152,75 @@ class SequenceRunner:
                 conf.update(returns) 
         return conf
 
+    @traced("run_with_dict_async", "runner", label=runner_label)
+    async def run_with_dict_async(self, dictionnary: dict):
+        conf = copy(dictionnary)
+
+        for action in self.actions.values():
+            vars = {key: conf[key] for key in action.requirements["variables"] if key in conf}
+            returns = await action.run_with_dict_async(vars)
+            if returns:
+                conf.update(returns) 
+        return conf
+
+def run_module(path, dictionnary):
+    ''' Entry point of pool workers, the module is imported once per worker. '''
+    try:
+        return load_module(path).__run__(**dictionnary)
+    finally:
+        close_shared(dictionnary)
+
+def split_batch(value, count):
+    if isinstance(value, np.ndarray):
+        return np.array_split(value, count)
+    bounds = np.linspace(0, len(value), count + 1).astype(int)
+    return [ value[start:end] for start, end in zip(bounds[:-1], bounds[1:]) ]
+
+def concatenate_results(results):
+    '''
+        Merges the results of the chunks of a batch, in order.
+        Arrays are concatenated along their leading axis and lists are joined (one item per row),
+        dicts and tuples are merged key by key and component by component.
+    '''
+    first = results[0]
+    if not all(type(r) is type(first) for r in results):
+        raise TypeError(f"Chunks of a batch returned different types: {sorted(set(type(r).__name__ for r in results))}.")
+    if isinstance(first, dict):
+        if not all(r.keys() == first.keys() for r in results):
+            raise ValueError("Chunks of a batch returned dicts with different keys.")
+        return { key: concatenate_results([ r[key] for r in results ]) for key in first.keys() }
+    elif isinstance(first, tuple):
+        if not all(len(r) == len(first) for r in results):
+            raise ValueError("Chunks of a batch returned tuples of different lengths.")
+        return tuple(concatenate_results(list(components)) for components in zip(*results))
+    elif isinstance(first, list):
+        return [ item for r in results for item in r ]
+    elif isinstance(first, np.ndarray) and first.ndim > 0:
+        return np.concatenate(results)
+    raise TypeError(f"Results of type {type(first).__name__} can not be merged by rows, "
+                    "batched modules should return arrays, lists, or tuples and dicts of them.")
+
 class ModuleRunner():
-    def __init__(self, name, path, workdir=".") -> None:
+    '''
+        Runs the __run__ function of a python module.
+        With workers > 1 and batch naming an argument, that argument is split along its
+        leading axis across a process pool and results are concatenated back in order.
+        With shared, Database arguments reach the pool as SharedDatabase handles
+        (see keever.shared) instead of being pickled for each chunk.
+    '''
+    def __init__(self, name, path, workdir=".", workers=1, batch=None, shared=False) -> None:
         self.m = load_module(path)
         module_checks(self.m)
         self.name = name
         self.path = path
         self._required_variables = dict()
         self._workdir = workdir
+        self._workdir_created = False
+        self._checked_keys = set()
+        self.workers = workers
+        self.batch = batch
+        self.shared = shared
+        self.executor = None
         
         variables = []
         if hasattr(self.m, "__requires__"):
@@ -148,17 +235,50 @@ class ModuleRunner():
         return self._workdir
     @workdir.setter
     def workdir(self, value):
+        if value != self._workdir or not self._workdir_created:
+            os.makedirs(value, exist_ok=True)
+            self._workdir_created = True
         self._workdir = value
-        os.makedirs(value, exist_ok=True)
         
         
 
+    @traced("run_with_dict", "runner", label=runner_label)
     def run_with_dict(self, dictionnary: dict):
-        for key in dictionnary.keys():
-            if key not in self._required_variables:
-                logging.warning(f"[ModuleRunner/{self.name}] variable '{key}' was not in requirements.")
+        keys = frozenset(dictionnary.keys())
+        if keys not in self._checked_keys:
+            for key in keys:
+                if key not in self._required_variables:
+                    logging.warning(f"[ModuleRunner/{self.name}] variable '{key}' was not in requirements.")
+            self._checked_keys.add(keys)
+
+        if self.workers > 1 and self.batch in dictionnary and len(dictionnary[self.batch]) > 1:
+            return self._run_batched(dictionnary)
 
         return self.m.__run__(**dictionnary)
+
+    def _run_batched(self, dictionnary: dict):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        chunks = split_batch(dictionnary[self.batch], min(self.workers, len(dictionnary[self.batch])))
+        with share_databases(dictionnary) if self.shared else nullcontext(dictionnary) as dictionnary:
+            futures = [ self.executor.submit(run_module, self.path, {**dictionnary, self.batch: chunk}) for chunk in chunks ]
+            return concatenate_results([ future.result() for future in futures ])
+
+    def __getstate__(self):
+        ''' Modules and pools do not pickle, the module is imported back on unpickling. '''
+        state = copy(self.__dict__)
+        state.update({"m": None, "executor": None})
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.m = load_module(self.path)
+
+    @traced("run_with_dict_async", "runner", label=runner_label)
+    async def run_with_dict_async(self, dictionnary: dict):
+        ''' Runs the module in the default executor, so the event loop stays free. '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.run_with_dict, dictionnary))
     
     @property
     def requirements(self):
@@ -170,25 +290,33 @@ class ModuleRunner():
 
     @property
     def state_dict(self):
-        return {"name": self.name, "path": self.path, "type": "module_runner", "workdir": "./wd/" }
+        return {"name": self.name, "path": self.path, "type": "module_runner", "workdir": "./wd/", "workers": self.workers, "batch": self.batch, "shared": self.shared }
 
     @classmethod
     def from_json(cls, data):
-        return cls(data["name"], data["path"], workdir=data["workdir"])
+        workers = data["workers"] if "workers" in data else 1
+        batch   = data["batch"]   if "batch"   in data else None
+        shared  = data["shared"]  if "shared"  in data else False
+        return cls(data["name"], data["path"], workdir=data["workdir"], workers=workers, batch=batch, shared=shared)
 
     @property
     def variables(self):
         return list(self._required_variables.keys())
 
 class ScriptRunner:
-    def __init__(self, name, path, shell="bash", parallel=False, workdir=".") -> None:
+    def __init__(self, name, path, shell="bash", parallel=False, workdir=".", timeout=None, max_parallel=None, pipe=False) -> None:
         self.path = path
         self.shell = shell
+        self.timeout = timeout
+        self.max_parallel = max_parallel
+        self.pipe = pipe
         self.content = ""
         self._required_variables = dict()
         self.build_from_script(path)
         self.parallel = parallel
         self._workdir = workdir
+        self._workdir_created = False
+        self._checked_keys = set()
         self.name = name
 
     @property
@@ -197,8 +325,10 @@ class ScriptRunner:
 
     @workdir.setter
     def workdir(self, value):
+        if value != self._workdir or not self._workdir_created:
+            os.makedirs(value, exist_ok=True)
+            self._workdir_created = True
         self._workdir = value
-        os.makedirs(value, exist_ok=True)
 
     @property
     def variables(self):
@@ -213,11 +343,10 @@ class ScriptRunner:
                 f"Prototype {path} required does not exist."
         with open(path, "r") as f:
             self.content = f.read()
-            statements = [ str_rm_substrings(r, ["{{","}}"]) for r in  re.findall(r'\{\{.*?\}\}', self.content)]
-            statements = list(set(statements))
-            for statement in statements:
-                variable = RunnerVariable(statement)
-                self._required_variables[variable.name] = variable
+        self.template = compile_template(self.content)
+        for statement in self.template.statements:
+            variable = RunnerVariable(statement)
+            self._required_variables[variable.name] = variable
         
         self.array = False
         self.array_var = None
@@ -226,9 +355,15 @@ class ScriptRunner:
             if var.array:
                 self.array_var = name
 
-    def run_with_dict(self, dictionnary: dict):
+    def _prepare(self, dictionnary: dict):
+        '''
+            Completes the variables of the prototype, exporting databases on the way.
+            Returns the variables of each job to launch, the declared returns and the exported (database, file) pairs.
+        '''
         assert "touchfile" in self._required_variables, f"Set touchfile in {self.path}"
         dictionnary.update({"touchfile": f"{self.workdir}/{randid()}.ended"})
+        if "failfile" in self._required_variables:
+            dictionnary.update({"failfile": failure_marker(dictionnary["touchfile"])})
         for name in self.generated_files:
             metavar = self._required_variables[name]
             file = f"{self.workdir}/{name}.{randid()}.npz"
@@ -242,48 +377,102 @@ class ScriptRunner:
                 continue
             metavar = self._required_variables[name]
             if hasattr(value,"export"):
-                src_dictionnary[metavar.src] = value.export(metavar.type)
-                exported_filenames.append(src_dictionnary[metavar.src])
+                src_dictionnary[metavar.src] = value.export_shared(metavar.type)
+                exported_filenames.append((value, src_dictionnary[metavar.src]))
             elif isinstance(value,list) and not metavar.array:
                 src_dictionnary[metavar.src] = " ".join(map(str, value))
             else:
                 src_dictionnary[metavar.src] = value
         
-        script_files = list()
+        keys = frozenset(dictionnary.keys())
+        if keys not in self._checked_keys:
+            ensure_arguments_match(self.variables, keys)
+            self._checked_keys.add(keys)
+
+        jobs = list()
         if self.array:
             logging.debug("Running array job.")
-            touchfiles = list()
             returns = { var: [] for var in self.declares }
             for i, value in enumerate(dictionnary[self.array_var]):
                 logging.debug(f" - {value}")
-                src_dictionnary.update({"touchfile": dictionnary["touchfile"].replace(".ended", f".{i}.ended")})
-                src_dictionnary.update({self._required_variables[self.array_var].src: value})
+                job = copy(src_dictionnary)
+                job.update({"touchfile": dictionnary["touchfile"].replace(".ended", f".{i}.ended")})
+                if "failfile" in self._required_variables:
+                    job.update({"failfile": failure_marker(job["touchfile"])})
+                job.update({self._required_variables[self.array_var].src: value})
 
                 for name in self.generated_files:
                     metavar = self._required_variables[name]
-                    src_dictionnary[metavar.src] = dictionnary[metavar.name].replace(name, f"{name}.{i}.")
-                ensure_arguments_match(self.variables, dictionnary.keys())
-                script_files.append(generate_job(self.content, src_dictionnary, launch=True, shell=self.shell, name=self.path))
-                touchfiles.append(src_dictionnary["touchfile"])
-                [ returns[name].append(src_dictionnary[self._required_variables[name].src]) for name in self.declares]
-            wait_files(touchfiles, sleep_time=10)
-
+                    job[metavar.src] = dictionnary[metavar.name].replace(name, f"{name}.{i}.")
+                jobs.append(job)
+                [ returns[name].append(job[self._required_variables[name].src]) for name in self.declares]
         else:
-            ensure_arguments_match(self.variables, dictionnary.keys())
-            script_files.append(generate_job(self.content, src_dictionnary, launch=True, shell=self.shell, name=self.path))
-            wait_files([src_dictionnary["touchfile"]],sleep_time=10)
+            jobs.append(src_dictionnary)
             returns = { var: dictionnary[var] for var in self.declares }
-        
+
+        return jobs, returns, exported_filenames
+
+    def _cleanup(self, script_files, exported_filenames, jobs=[]):
         for file in script_files:
             os.remove(file)
 
-        # Removing files created for export
-        for name in exported_filenames:
-            os.remove(name)
+        # Touchfiles and failure markers left behind by failed jobs
+        for job in jobs:
+            for file in [job["touchfile"], failure_marker(job["touchfile"])]:
+                if isfile(file):
+                    os.remove(file)
+
+        # Releasing files created for export, the Database removes them once unused
+        for database, name in exported_filenames:
+            database.release_export(name)
+
+    @traced("run_with_dict", "runner", label=runner_label)
+    def run_with_dict(self, dictionnary: dict):
+        jobs, returns, exported_filenames = self._prepare(dictionnary)
+        script_files = list()
+        launcher = JobLauncher(self.shell, self.max_parallel)
+        try:
+            for job in jobs:
+                if self.pipe:
+                    launcher.launch(job["touchfile"], script=self.template.render(job))
+                else:
+                    script_files.append(write_job(self.template, job, name=self.path))
+                    launcher.launch(script_files[-1])
+            launcher.wait()
+            wait_files([ job["touchfile"] for job in jobs ], sleep_time=10, timeout=self.timeout)
+        finally:
+            self._cleanup(script_files, exported_filenames, jobs)
 
         return returns
 
+    @traced("run_with_dict_async", "runner", label=runner_label)
+    async def run_with_dict_async(self, dictionnary: dict):
+        ''' Same as run_with_dict, with asyncio subprocesses and completion waiting. '''
+        jobs, returns, exported_filenames = self._prepare(dictionnary)
+        script_files = list()
+        semaphore = asyncio.Semaphore(self.max_parallel or os.cpu_count() or 1)
+
+        async def launch(job):
+            async with semaphore:
+                if self.pipe:
+                    process = await asyncio.create_subprocess_exec(self.shell, stdin=subprocess.PIPE)
+                    await process.communicate(self.template.render(job).encode())
+                    return job["touchfile"], process.returncode
+                script_name = write_job(self.template, job, name=self.path)
+                script_files.append(script_name)
+                process = await asyncio.create_subprocess_exec(self.shell, script_name)
+                return script_name, await process.wait()
+
+        try:
+            returncodes = await asyncio.gather(*[ launch(job) for job in jobs ])
+            failed = [ f"{script} ({code})" for script, code in returncodes if code != 0 ]
+            if failed:
+                raise JobFailedError(f"Jobs exited with errors: {', '.join(failed)}.")
+            await wait_files_async([ job["touchfile"] for job in jobs ], sleep_time=10, timeout=self.timeout)
+        finally:
+            self._cleanup(script_files, exported_filenames, jobs)
 
+        return returns
 
     @property
     def requirements(self):
@@ -299,36 +488,99 @@ class ScriptRunner:
     
     @property
     def state_dict(self):
-        return {"name": self.name, "type": "script_runner", "path": self.path, "content": self.content, "workdir":self.workdir, "shell":self.shell, "_required_variables": {key: val.state_dict for key,val in self._required_variables.items()}, "parallel":self.parallel  }
+        return {"name": self.name, "type": "script_runner", "path": self.path, "content": self.content, "workdir":self.workdir, "shell":self.shell, "_required_variables": {key: val.state_dict for key,val in self._required_variables.items()}, "parallel":self.parallel, "timeout": self.timeout, "max_parallel": self.max_parallel, "pipe": self.pipe }
 
 
     @classmethod
     def from_json(cls, data):
-        return cls(data["name"], data["path"], data["shell"], data["parallel"], workdir=data["workdir"])
+        timeout = data["timeout"] if "timeout" in data else None
+        max_parallel = data["max_parallel"] if "max_parallel" in data else None
+        pipe = data["pipe"] if "pipe" in data else False
+        return cls(data["name"], data["path"], data["shell"], data["parallel"], workdir=data["workdir"], timeout=timeout, max_parallel=max_parallel, pipe=pipe)
+
 
+class JobLauncher:
+    '''
+        Launches job scripts without blocking, keeping at most max_parallel of them running.
+        With batch shells (sbatch) a job only runs for the time of its submission,
+        completion is still detected through touchfiles.
+    '''
+    def __init__(self, shell="bash", max_parallel=None) -> None:
+        self.shell = shell
+        self.max_parallel = max_parallel or os.cpu_count() or 1
+        self.running = list()
+        self.returncodes = dict()
 
+    def launch(self, script_name, script=None):
+        '''
+            Runs the script file script_name, or if script is given, pipes it to the shell's
+            standard input (script_name then only names the job in error messages).
+        '''
+        while len(self.running) >= self.max_parallel:
+            self._reap()
+        logging.debug(f"Launching job {script_name}")
+        if script is None:
+            self.running.append((script_name, subprocess.Popen([self.shell, script_name], shell=False)))
+            return
+        process = subprocess.Popen([self.shell], stdin=subprocess.PIPE, shell=False)
+        try:
+            process.stdin.write(script.encode())
+            process.stdin.close()
+        except BrokenPipeError: # The shell exited early, its return code tells why
+            pass
+        self.running.append((script_name, process))
+
+    def _reap(self):
+        ''' Collects finished processes, waiting a little on the oldest one if none is done. '''
+        finished = [ (script, process) for script, process in self.running if process.poll() is not None ]
+        if not finished:
+            try:
+                self.running[0][1].wait(timeout=0.05)
+            except subprocess.TimeoutExpired:
+                pass
+            return
+        for script, process in finished:
+            self.returncodes[script] = process.returncode
+            self.running.remove((script, process))
+
+    def wait(self):
+        ''' Waits for all launched processes and raises JobFailedError if any exited with an error. '''
+        for script, process in self.running:
+            self.returncodes[script] = process.wait()
+        self.running.clear()
+        failed = [ f"{script} ({code})" for script, code in self.returncodes.items() if code != 0 ]
+        if failed:
+            raise JobFailedError(f"Jobs exited with errors: {', '.join(failed)}.")
+        return self.returncodes
+
+
+def complete_job(prototype, dictionnary):
+    ''' prototype is the script content or its compiled Template. '''
+    template = prototype if isinstance(prototype, Template) else compile_template(prototype)
+    return template.render(dictionnary)
+
+@traced("write_job", "runner", measure=file_bytes)
+def write_job(prototype, dictionnary, name="./submit.sh"):
+    ''' Writes a completed instance of the prototype in TMPDIR and returns its path. '''
+    script_name = os.path.basename(name).replace(".proto.", f".{randid()}.")
+    script_name = join(make_tmpdir(), script_name)
+    with open(script_name, "w") as f2:
+        f2.write(complete_job(prototype, dictionnary))
+    return script_name
+
+@traced("generate_job", "runner", measure=job_bytes)
 def generate_job(prototype, dictionnary, launch=False, shell="bash", name="./submit.sh"):
     '''
         Generates a runnable instance of a prototype shell script.
         prototype: The shell script to be completed
         dictionnary: Variables required to complete the script
-        launch: whether to write and launch the script on completion
+        launch: whether to write and launch the script on completion (blocking)
         shell: The shell to run the script with
     '''
-    completed_script = copy(prototype)
-    for key, value in dictionnary.items():
-        completed_script = completed_script.replace(f'{{{{{key}}}}}', str(value))
-
-    
     if launch:
         logging.debug("Launching job")
-        os.makedirs("./tmp/", exist_ok=True)
-
-        script_name = os.path.basename(name).replace(".proto.", f".{randid(5)}.")
-        script_name = join(TMPDIR, script_name)
-        with open(script_name, "w") as f2:
-            f2.write(completed_script)
+        script_name = write_job(prototype, dictionnary, name=name)
         subprocess.call([shell, script_name], shell=False)
         return script_name
     else:
-        return completed_script  
+        return complete_job(prototype, dictionnary)
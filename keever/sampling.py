@@ -0,0 +1,51 @@
+'''
+    Design of experiments samplers, selected by populate-on-creation.algo.
+    A sampler draws count points of the unit hypercube [0, 1)^dimension as a single (count, dimension) array,
+    sample() then maps one dimension per variable element to its bounds (continuous) or categories (categorical).
+    scipy is only imported by the samplers that need it.
+'''
+import warnings
+import numpy as np
+from keever.space import variable_space
+
+
+def lhs(dimension, count, seed=None):
+    from scipy.stats.qmc import LatinHypercube
+    return LatinHypercube(d=dimension, seed=seed).random(n=count)
+
+def optimized_lhs(dimension, count, seed=None):
+    ''' LHS improved by random coordinate swaps on its centered discrepancy, meant for small designs. '''
+    from scipy.stats.qmc import LatinHypercube
+    return LatinHypercube(d=dimension, optimization="random-cd", seed=seed).random(n=count)
+
+def sobol(dimension, count, seed=None):
+    ''' Scrambled Sobol sequence, balanced when count is a power of 2. '''
+    from scipy.stats.qmc import Sobol
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return Sobol(d=dimension, scramble=True, seed=seed).random(n=count)
+
+def halton(dimension, count, seed=None):
+    from scipy.stats.qmc import Halton
+    return Halton(d=dimension, scramble=True, seed=seed).random(n=count)
+
+def uniform(dimension, count, seed=None):
+    return np.random.default_rng(seed).random((count, dimension))
+
+samplers = {
+    "LHS": lhs,
+    "OLHS": optimized_lhs,
+    "Sobol": sobol,
+    "Halton": halton,
+    "uniform": uniform,
+}
+
+
+def sample(variables_description, algorithm, count, seed=None):
+    '''
+        Draws count designs of the variables with the sampler algorithm (see samplers), as a dict of variable columns.
+        Continuous elements are scaled to [lower, upper], categorical elements to a category in [0, count).
+    '''
+    assert algorithm in samplers, f"Unknown sampler {algorithm}, expected one of {list(samplers.keys())}."
+    space = variable_space(variables_description)
+    return space.decode(space.from_unit(samplers[algorithm](space.size, count, seed)))
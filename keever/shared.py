@@ -0,0 +1,171 @@
+'''
+    Shared memory transport of Database columns to worker processes.
+    The owner publishes each column in a multiprocessing.shared_memory block,
+    workers receive a handle that only names the blocks: it pickles in constant size
+    and maps the columns as read-only arrays, without copy.
+'''
+import logging
+import weakref
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from keever.space import variable_space
+
+
+def _publish(array):
+    array = np.ascontiguousarray(array)
+    block = SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+class SharedDatabase:
+    '''
+        Read-only view of a Database published in shared memory.
+        Offers the reading side of the Database interface: entries, len, column, as_arrays,
+        iteration and item access.
+        The publishing process owns the blocks and unlinks them on close.
+    '''
+    def __init__(self, name, variables_descr, storage_descr, layout) -> None:
+        self.name = name
+        self.variables_descr = variables_descr
+        self.storage_descr = storage_descr
+        self._layout = layout # key -> (block name, shape, dtype), "entries" and "rows/key" included
+        self._blocks = dict()
+        self._arrays = dict()
+        self._owner = False
+        self._index = None
+
+    @classmethod
+    def publish(cls, db, keys=None):
+        '''
+            Publishes the numeric columns of db (or only keys), object columns are skipped.
+        '''
+        keys = keys if keys is not None else db._storage.keys()
+        entries = db.entries
+        position = { entry: row for row, entry in enumerate(entries) }
+        blocks, layout = dict(), dict()
+        try:
+            blocks["entries"], layout["entries"] = _publish(np.asarray(entries, dtype=str))
+            for key in keys:
+                column = db._storage.column(key)
+                if len(column) == 0 or column.dtype.kind in "OUS":
+                    continue
+                blocks[key], layout[key] = _publish(column)
+                if len(column) < len(entries):
+                    rows = np.asarray([ position[entry] for entry in db._storage.column_entries(key) ], dtype=int)
+                    blocks["rows/" + key], layout["rows/" + key] = _publish(rows)
+        except BaseException:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+            raise
+        handle = cls(db.name, db.variables_descr, db.storage_descr, layout)
+        handle._blocks = blocks
+        handle._owner = True
+        return handle
+
+    def __getstate__(self):
+        return {"name": self.name, "variables_descr": self.variables_descr,
+                "storage_descr": self.storage_descr, "_layout": self._layout}
+
+    def __setstate__(self, state):
+        self.__init__(**{ key.lstrip("_"): value for key, value in state.items() })
+
+    def _array(self, key):
+        if key not in self._arrays:
+            block_name, shape, dtype = self._layout[key]
+            if key not in self._blocks:
+                self._blocks[key] = SharedMemory(name=block_name)
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=self._blocks[key].buf)
+            array.flags.writeable = False
+            self._arrays[key] = array
+        return self._arrays[key]
+
+    @property
+    def space(self):
+        return variable_space(self.variables_descr)
+
+    def keys(self):
+        return [ key for key in self._layout if key != "entries" and not key.startswith("rows/") ]
+
+    @property
+    def entries(self):
+        return self._array("entries").tolist()
+
+    def __len__(self):
+        return self._layout["entries"][1][0]
+
+    def column(self, key):
+        if key == "variables" and key not in self._layout:
+            columns = [ self._array(var["name"]) for var in self.variables_descr if var["name"] in self._layout ]
+            return np.hstack([ c.reshape(len(c), -1) for c in columns ]) if columns else np.empty((0,))
+        if key not in self._layout:
+            return np.empty((0,))
+        return self._array(key)
+
+    def as_arrays(self):
+        return { key: self._array(key) for key in self.keys() }
+
+    def __getitem__(self, entry):
+        if self._index is None:
+            self._index = { entry: row for row, entry in enumerate(self.entries) }
+            self._positions = dict()
+            for key in self.keys():
+                rows = self._array("rows/" + key) if "rows/" + key in self._layout else np.arange(len(self))
+                self._positions[key] = { row: i for i, row in enumerate(rows.tolist()) }
+        row = self._index[entry]
+        return { key: self._array(key)[positions[row]] for key, positions in self._positions.items() if row in positions }
+
+    def __iter__(self):
+        return ((entry, self[entry]) for entry in self.entries)
+
+    def close(self):
+        '''
+            Unmaps the blocks, the owner also unlinks them.
+            Blocks still used by arrays that escaped (returned or stored) stay mapped until those arrays are collected.
+        '''
+        arrays = { key: weakref.ref(array) for key, array in self._arrays.items() }
+        self._arrays.clear()
+        self._index = None
+        for key, block in self._blocks.items():
+            escaped = arrays[key]() if key in arrays else None
+            if escaped is None:
+                block.close()
+            else:
+                weakref.finalize(escaped, block.close)
+            if self._owner:
+                block.unlink()
+        self._blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+@contextmanager
+def share_databases(dictionnary):
+    '''
+        Yields a copy of dictionnary where Database values are replaced by SharedDatabase handles,
+        the shared memory blocks are released on exit.
+    '''
+    from keever.database import Database
+    handles = dict()
+    try:
+        for key, value in dictionnary.items():
+            if isinstance(value, Database):
+                handles[key] = SharedDatabase.publish(value)
+                logging.debug(f"[share_databases] {key} published in {len(handles[key]._layout)} blocks.")
+        yield {**dictionnary, **handles}
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+def close_shared(dictionnary):
+    ''' Closes the SharedDatabase handles found in dictionnary, called by workers after each call. '''
+    for value in dictionnary.values():
+        if isinstance(value, SharedDatabase):
+            value.close()
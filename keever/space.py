@@ -0,0 +1,172 @@
+'''
+    Variables descriptions compiled into a VariableSpace.
+    The flat layout of a design concatenates the elements of every variable in description order,
+    like the 'variables' column: continuous elements hold their value, categorical elements their category index.
+    Bounds, offsets, sizes and categories are computed once per description, see variable_space.
+'''
+from functools import lru_cache
+from collections import OrderedDict
+from math import prod
+import logging
+import numpy as np
+
+variable_types = {
+    "real":   {"continuous": True,  "discrete": True, "ordered": True},
+    "vreal":  {"continuous": True,  "discrete": True, "ordered": True},
+    "categ":  {"continuous": False, "discrete": True, "ordered": False},
+    "vcateg": {"continuous": False, "discrete": True, "ordered": False},
+}
+
+def variable_is(var, target_property):
+    if var["type"] not in variable_types:
+        logging.error(f"[variable_is/space.py] Unknown variable type {var['type']}.")
+    return variable_types[var["type"]][target_property]
+
+def variable_size(variable):
+    size = variable["size"] if "size" in variable else 1
+    size = prod(size) if isinstance(size, (list, tuple)) else size
+    return size
+
+
+class VariableSpace:
+    def __init__(self, variables_description) -> None:
+        self.variables = list(variables_description)
+        self.names = [ var["name"] for var in self.variables ]
+        self.sizes = np.asarray([ variable_size(var) for var in self.variables ], dtype=int)
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)]).astype(int)
+        self.continuous = np.asarray([ variable_is(var, "continuous") for var in self.variables ], dtype=bool)
+        self.categorical = np.asarray([ variable_is(var, "discrete") and not variable_is(var, "ordered") for var in self.variables ], dtype=bool)
+        self.size = int(self.offsets[-1])
+
+        # Per element of the flat layout
+        self.lower = np.zeros(self.size)
+        self.upper = np.zeros(self.size)
+        self.counts = np.zeros(self.size, dtype=int) # Number of categories, 0 for continuous elements
+        for var, start, stop, continuous in zip(self.variables, self.offsets[:-1], self.offsets[1:], self.continuous):
+            if continuous:
+                self.lower[start:stop] = var["lower"]
+                self.upper[start:stop] = var["upper"]
+            else:
+                self.counts[start:stop] = var["count"]
+                self.upper[start:stop] = self.counts[start:stop] - 1
+        element_continuous = np.repeat(self.continuous, self.sizes)
+        self.continuous_columns = np.flatnonzero(element_continuous)
+        self.categorical_columns = np.flatnonzero(np.repeat(self.categorical, self.sizes))
+        self.discrete_columns = np.flatnonzero(~element_continuous)
+
+        self.continuous_indices = np.flatnonzero(self.continuous).tolist()
+        self.continuous_names = [ self.names[i] for i in self.continuous_indices ]
+        self.continuous_sizes = self.sizes[self.continuous_indices].tolist()
+        self.continuous_size = len(self.continuous_columns)
+        self.categorical_size = len(self.categorical_columns)
+        self.bounds = np.stack([self.lower[self.continuous_columns], self.upper[self.continuous_columns]])
+        self.categories = self.counts[self.categorical_columns]
+
+        for array in [self.sizes, self.offsets, self.lower, self.upper, self.counts, self.bounds, self.categories]:
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.variables)
+
+    def slice(self, name):
+        i = self.names.index(name)
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def encode(self, dictionnary):
+        '''
+            Stacks the variables columns of dictionnary (name -> (n, size) or (n,) array) in a flat (n, size) matrix.
+        '''
+        columns = [ np.asarray(dictionnary[name]) for name in self.names ]
+        count = len(columns[0]) if columns else 0
+        matrix = np.empty((count, self.size), dtype=np.result_type(float, *columns))
+        for column, start, stop in zip(columns, self.offsets[:-1], self.offsets[1:]):
+            matrix[:, start:stop] = column.reshape(count, -1)
+        return matrix
+
+    def decode(self, matrix):
+        '''
+            Splits a flat (n, size) matrix in variables columns (n, size), categorical ones rounded to int.
+            Continuous columns are views on matrix.
+        '''
+        matrix = np.asarray(matrix).reshape(-1, self.size)
+        columns = dict()
+        for name, start, stop, continuous in zip(self.names, self.offsets[:-1], self.offsets[1:], self.continuous):
+            block = matrix[:, start:stop]
+            columns[name] = block if continuous else np.rint(block).astype(int)
+        return columns
+
+    def from_unit(self, unit):
+        '''
+            Maps samples of the unit hypercube (n, size) to the flat layout:
+            continuous elements to [lower, upper], categorical elements to a category in [0, count).
+        '''
+        matrix = self.lower + unit * (self.upper - self.lower)
+        discrete = self.discrete_columns
+        matrix[:, discrete] = np.minimum(np.floor(unit[:, discrete] * self.counts[discrete]), self.counts[discrete] - 1)
+        return matrix
+
+    def to_unit(self, matrix):
+        ''' Continuous elements normalized to [0, 1] by their bounds (zero width bounds map to 0). '''
+        matrix = np.asarray(matrix, dtype=float).reshape(-1, self.size)
+        columns = self.continuous_columns
+        width = self.upper[columns] - self.lower[columns]
+        return (matrix[:, columns] - self.lower[columns]) / np.where(width > 0, width, 1.0)
+
+    def contains(self, matrix):
+        ''' Mask of the rows within bounds, with integral categories. '''
+        matrix = np.asarray(matrix).reshape(-1, self.size)
+        inside = np.all((matrix >= self.lower) & (matrix <= self.upper), axis=1)
+        discrete = matrix[:, self.discrete_columns]
+        return inside & np.all(discrete == np.rint(discrete), axis=1)
+
+    def repair(self, matrix, mode="clip", out=None):
+        '''
+            Brings out of bounds candidates back in the space and rounds categories, by batch.
+            mode: "clip" to the nearest bound, or "reflect" on the bounds
+            out: matrix to write to, matrix itself for an in place repair
+        '''
+        matrix = np.asarray(matrix, dtype=float).reshape(-1, self.size)
+        out = np.empty_like(matrix) if out is None else out
+        if mode == "reflect":
+            width = self.upper - self.lower
+            period = np.where(width > 0, 2 * width, 1.0)
+            shifted = np.mod(matrix - self.lower, period)
+            np.add(self.lower, np.where(shifted > width, period - shifted, shifted), out=out)
+        elif mode == "clip":
+            out[...] = matrix
+        else:
+            raise ValueError(f"Unknown repair mode {mode}.")
+        discrete = self.discrete_columns
+        out[:, discrete] = np.rint(out[:, discrete])
+        np.clip(out, self.lower, self.upper, out=out)
+        return out
+
+
+def _key(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_key(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((k, _key(v)) for k, v in value.items())
+    return value
+
+@lru_cache(maxsize=64)
+def _compile(key):
+    return VariableSpace([ dict(var) for var in key ])
+
+_compiled = OrderedDict() # id(description) -> (description, space), the most recent descriptions
+
+def variable_space(variables_description):
+    '''
+        The VariableSpace of a description, compiled once per distinct description.
+        The result is shared, its arrays are read-only.
+        Descriptions are looked up by identity first: replace a description rather than editing it in place.
+    '''
+    identity = id(variables_description)
+    cached = _compiled.get(identity)
+    if cached is not None and cached[0] is variables_description:
+        return cached[1]
+    space = _compile(tuple(_key(var) for var in variables_description))
+    _compiled[identity] = (variables_description, space)
+    if len(_compiled) > 64:
+        _compiled.popitem(last=False)
+    return space
@@ -0,0 +1,417 @@
+'''
+    Storage backends for the Database.
+    A backend maps (entry, key) pairs to values, the Database only talks to it
+    through the small interface shared by the classes below.
+'''
+import numpy as np
+
+
+def _fill_value(dtype):
+    if dtype.kind in "fc":
+        return np.nan
+    return None if dtype.kind == "O" else 0
+
+class DictStorage:
+    '''
+        Default backend: one python dict per key, mapping entry ids to values.
+        Accepts anything, including ragged or non numeric values.
+    '''
+    backend = "dict"
+
+    def __init__(self, keys=[], shapes={}) -> None:
+        self._data = { key: {} for key in keys }
+        self._index = dict() # Insertion ordered entry ids
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def ensure_key(self, key):
+        if key not in self._data:
+            self._data[key] = {}
+
+    @property
+    def entries(self):
+        return list(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def contains(self, entry):
+        return entry in self._index
+
+    def set(self, entry, values):
+        for key, value in values.items():
+            self._data[key][entry] = value
+        self._index[entry] = None
+
+    def set_many(self, entries, values):
+        ''' Sets values[key][i] for entries[i], values hold one sequence per key. '''
+        for key, value in values.items():
+            self._data[key].update(zip(entries, value))
+        self._index.update(dict.fromkeys(entries))
+
+    def get(self, entry):
+        return { k: self._data[k][entry] for k in self._data.keys() if entry in self._data[k] }
+
+    def column(self, key):
+        values = list(self._data[key].values())
+        try:
+            return np.asarray(values)
+        except ValueError: # Ragged values are kept as an object array
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+            return column
+
+    def column_entries(self, key):
+        return list(self._data[key].keys()) if key in self._data else []
+
+    def column_layout(self, key):
+        '''
+            (count, row shape, dtype) of column(key) without building it,
+            None if values are ragged or not numeric.
+        '''
+        values = self._data[key].values() if key in self._data else []
+        if len(values) == 0:
+            return 0, (), np.dtype(float)
+        types = set(map(type, values))
+        if types == {np.ndarray}:
+            shapes = set(value.shape for value in values)
+            types = set(value.dtype for value in values)
+        elif all(issubclass(t, (int, float, bool, np.number, np.bool_)) for t in types):
+            shapes = {()}
+        else:
+            return None
+        dtype = np.result_type(*types)
+        return (len(values), shapes.pop(), dtype) if len(shapes) == 1 and dtype.kind not in "USO" else None
+
+    def column_chunks(self, key, rows, dtype=None):
+        ''' Yields column(key) by blocks of rows. '''
+        values = list(self._data[key].values()) if key in self._data else []
+        for start in range(0, len(values), rows):
+            yield np.asarray(values[start:start+rows], dtype=dtype)
+
+    def as_arrays(self):
+        ''' Not zero-copy for this backend, columns are stacked on each call. '''
+        return { key: self.column(key) for key in self._data.keys() if len(self._data[key]) > 0 }
+
+    def clear(self):
+        for key in self._data.keys():
+            self._data[key].clear()
+        self._index.clear()
+
+    def update_from(self, other):
+        data = other.to_dict()
+        for key in self._data.keys():
+            if key in data:
+                self._data[key].update(data[key])
+        self._index.update(dict.fromkeys(other.entries))
+
+    def take(self, entries):
+        ''' New storage holding entries only, in the given order. '''
+        other = DictStorage(self.keys())
+        for key, column in self._data.items():
+            other._data[key] = { entry: column[entry] for entry in entries if entry in column }
+        other._index = dict.fromkeys(entries)
+        return other
+
+    def to_dict(self):
+        return self._data
+
+    def load_dict(self, data):
+        for key, column in data.items():
+            self.ensure_key(key)
+            self._data[key].update(column)
+            self._index.update(dict.fromkeys(column))
+
+    def to_columns(self):
+        return _columns_payload(self.entries, { key: (list(column.keys()), list(column.values())) for key, column in self._data.items() })
+
+    def load_columns(self, payload):
+        entries = [ str(entry) for entry in payload["entries"] ]
+        self._index.update(dict.fromkeys(entries))
+        for key, column in payload["columns"].items():
+            self.ensure_key(key)
+            ids = entries if "rows" not in column else [ entries[row] for row in column["rows"] ]
+            self._data[key].update(zip(ids, column["values"]))
+
+
+class ColumnarStorage:
+    '''
+        Array backed storage: each key is a contiguous, growable numpy column
+        and a row index maps entry ids to rows.
+        Column shapes come from the declared shapes or from the first value stored.
+    '''
+    backend = "columnar"
+
+    def __init__(self, keys=[], shapes={}, capacity=16) -> None:
+        self._ids = list()     # row -> entry id
+        self._rows = dict()    # entry id -> row
+        self._keys = list()
+        self._columns = dict()
+        self._present = dict()
+        self._shapes = dict(shapes)
+        self._capacity = capacity
+        for key in keys:
+            self.ensure_key(key)
+
+    def keys(self):
+        return list(self._keys)
+
+    def ensure_key(self, key):
+        if key not in self._keys:
+            self._keys.append(key)
+            if key in self._shapes:
+                shape, dtype = self._shapes[key]
+                self._allocate(key, tuple(shape), np.dtype(dtype))
+
+    @property
+    def entries(self):
+        return list(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def contains(self, entry):
+        return entry in self._rows
+
+    def _allocate(self, key, shape, dtype):
+        self._columns[key] = np.full((self._capacity,) + shape, _fill_value(dtype), dtype=dtype)
+        self._present[key] = np.zeros(self._capacity, dtype=bool)
+
+    def _grow(self, size):
+        capacity = max(2 * self._capacity, size)
+        for key, column in self._columns.items():
+            grown = np.full((capacity,) + column.shape[1:], _fill_value(column.dtype), dtype=column.dtype)
+            grown[:self._capacity] = column
+            self._columns[key] = grown
+            present = np.zeros(capacity, dtype=bool)
+            present[:self._capacity] = self._present[key]
+            self._present[key] = present
+        self._capacity = capacity
+
+    def _row(self, entry):
+        if entry in self._rows:
+            return self._rows[entry]
+        row = len(self._ids)
+        if row >= self._capacity:
+            self._grow(row + 1)
+        self._ids.append(entry)
+        self._rows[entry] = row
+        return row
+
+    def _rows_for(self, entries):
+        if len(self._ids) + len(entries) > self._capacity:
+            self._grow(len(self._ids) + len(entries))
+        return np.asarray([ self._row(entry) for entry in entries ], dtype=int)
+
+    def _column_for(self, key, sample):
+        ''' Returns the column of key, allocating or promoting it to fit sample. '''
+        if key not in self._keys:
+            raise KeyError(key)
+        sample = np.asarray(sample)
+        if key not in self._columns:
+            dtype = np.dtype(object) if sample.dtype.kind in "USO" else sample.dtype
+            self._allocate(key, sample.shape, dtype)
+        column = self._columns[key]
+        if sample.dtype.kind not in "USO" and column.dtype.kind != "O":
+            dtype = np.result_type(column.dtype, sample.dtype)
+            if dtype != column.dtype:
+                column = self._columns[key] = column.astype(dtype)
+        if not column.flags.writeable: # Adopted read-only (memory-mapped) column, copied at its first write
+            column = self._columns[key] = np.array(column)
+        return column
+
+    def _check_shape(self, key, column, value, rows=None):
+        value = np.asarray(value)
+        shape = column.shape[1:] if rows is None else (len(rows),) + column.shape[1:]
+        if value.shape != shape:
+            if value.size != np.prod(shape, dtype=int):
+                raise ValueError(f"Value of shape {value.shape} does not fit column '{key}' of shape {column.shape[1:]}.")
+            value = value.reshape(shape)
+        return value
+
+    def set(self, entry, values):
+        row = self._row(entry)
+        for key, value in values.items():
+            column = self._column_for(key, value)
+            column[row] = self._check_shape(key, column, value)
+            self._present[key][row] = True
+
+    def set_many(self, entries, values):
+        ''' Sets values[key][i] for entries[i], one slice assignment per key. '''
+        if len(entries) == 0:
+            return
+        rows = self._rows_for(entries)
+        for key, value in values.items():
+            value = np.asarray(value)
+            column = self._column_for(key, value[0])
+            column[rows] = self._check_shape(key, column, value, rows)
+            self._present[key][rows] = True
+
+    def get(self, entry):
+        row = self._rows[entry]
+        return { key: column[row] for key, column in self._columns.items() if self._present[key][row] }
+
+    def column(self, key):
+        if key not in self._columns:
+            return np.empty((0,))
+        n = len(self._ids)
+        mask = self._present[key][:n]
+        if mask.all():
+            return self._columns[key][:n]
+        return self._columns[key][:n][mask]
+
+    def column_entries(self, key):
+        if key not in self._columns:
+            return []
+        present = self._present[key][:len(self._ids)]
+        if present.all():
+            return list(self._ids)
+        return [ self._ids[row] for row in np.flatnonzero(present) ]
+
+    def column_layout(self, key):
+        if key not in self._columns:
+            return 0, (), np.dtype(float)
+        column = self._columns[key]
+        if column.dtype.kind == "O":
+            return None
+        return int(np.count_nonzero(self._present[key][:len(self._ids)])), column.shape[1:], column.dtype
+
+    def column_chunks(self, key, rows, dtype=None):
+        ''' Yields column(key) by blocks of rows, as views when every row of the block holds key. '''
+        if key not in self._columns:
+            return
+        column, present = self._columns[key], self._present[key]
+        for start in range(0, len(self._ids), rows):
+            stop = min(start + rows, len(self._ids))
+            mask = present[start:stop]
+            block = column[start:stop] if mask.all() else column[start:stop][mask]
+            yield block if dtype is None else block.astype(dtype, copy=False)
+
+    def as_arrays(self):
+        '''
+            Zero-copy views on the filled part of every column.
+            Rows where a key was never set hold the fill value (nan, 0 or None).
+        '''
+        n = len(self._ids)
+        return { key: column[:n] for key, column in self._columns.items() }
+
+    def clear(self):
+        self._ids.clear()
+        self._rows.clear()
+        for key, column in self._columns.items():
+            if not column.flags.writeable:
+                column = self._columns[key] = np.empty_like(column)
+            column[:] = _fill_value(column.dtype)
+            self._present[key][:] = False
+
+    def update_from(self, other):
+        if not isinstance(other, ColumnarStorage):
+            for entry in other.entries:
+                self.set(entry, { k: v for k, v in other.get(entry).items() if k in self._keys })
+            return
+        rows = self._rows_for(other._ids)
+        m = len(other._ids)
+        for key, column in other._columns.items():
+            if key not in self._keys:
+                continue
+            mask = other._present[key][:m]
+            if not mask.any():
+                continue
+            target = self._column_for(key, column[0])
+            target[rows[mask]] = self._check_shape(key, target, column[:m][mask], rows[mask])
+            self._present[key][rows[mask]] = True
+
+    def take(self, entries):
+        ''' New storage holding entries only, in the given order. '''
+        rows = np.asarray([ self._rows[entry] for entry in entries ], dtype=int)
+        other = ColumnarStorage(self._keys, self._shapes, capacity=max(1, len(rows)))
+        other._ids = list(entries)
+        other._rows = { entry: row for row, entry in enumerate(other._ids) }
+        for key, column in self._columns.items():
+            other._allocate(key, column.shape[1:], column.dtype)
+            other._columns[key][:len(rows)] = column[rows]
+            other._present[key][:len(rows)] = self._present[key][rows]
+        return other
+
+    def to_dict(self):
+        data = { key: {} for key in self._keys }
+        n = len(self._ids)
+        for key, column in self._columns.items():
+            for row in np.flatnonzero(self._present[key][:n]):
+                data[key][self._ids[row]] = column[row]
+        return data
+
+    def load_dict(self, data):
+        for key, column in data.items():
+            self.ensure_key(key)
+            for entry, value in column.items():
+                self.set(entry, {key: value})
+
+    def to_columns(self):
+        n = len(self._ids)
+        columns = dict()
+        for key, column in self._columns.items():
+            rows = np.flatnonzero(self._present[key][:n])
+            columns[key] = (rows, column[:n][rows] if len(rows) < n else column[:n])
+        return _columns_payload(self._ids, columns)
+
+    def load_columns(self, payload):
+        '''
+            Loads a column payload into an empty storage.
+            Complete columns are adopted as is, so memory-mapped arrays are not copied
+            until they are written to.
+        '''
+        assert len(self._ids) == 0, "Columns can only be loaded in an empty storage."
+        self._ids = [ str(entry) for entry in payload["entries"] ]
+        self._rows = { entry: row for row, entry in enumerate(self._ids) }
+        n = self._capacity = len(self._ids)
+        self._columns, self._present = dict(), dict()
+        for key, column in payload["columns"].items():
+            self.ensure_key(key)
+            values = np.asarray(column["values"])
+            if "rows" not in column:
+                self._columns[key] = values
+                self._present[key] = np.ones(n, dtype=bool)
+            else:
+                self._allocate(key, values.shape[1:], values.dtype)
+                self._columns[key][column["rows"]] = values
+                self._present[key][column["rows"]] = True
+        for key in self._keys:
+            if key not in self._columns and key in self._shapes:
+                shape, dtype = self._shapes[key]
+                self._allocate(key, tuple(shape), np.dtype(dtype))
+
+
+def _columns_payload(entries, columns):
+    '''
+        Column payload shared by all backends: the entry ids and, for each key,
+        the stacked values with the rows they belong to when some entries lack the key.
+    '''
+    position = { entry: row for row, entry in enumerate(entries) }
+    payload = {"entries": np.asarray(entries, dtype=str), "columns": {}}
+    for key, (rows, values) in columns.items():
+        if len(values) == 0:
+            continue
+        if isinstance(rows, list):
+            rows = np.asarray([ position[entry] for entry in rows ], dtype=int)
+        try:
+            values = np.asarray(values)
+        except ValueError: # Ragged values are kept as an object array
+            values, ragged = np.empty(len(values), dtype=object), values
+            values[:] = ragged
+        column = {"values": values}
+        if len(rows) < len(entries) or np.any(rows != np.arange(len(rows))):
+            column["rows"] = rows
+        payload["columns"][key] = column
+    return payload
+
+
+storage_backends = {
+    "dict": DictStorage,
+    "columnar": ColumnarStorage,
+}
+
+def make_storage(backend, keys=[], shapes={}):
+    assert backend in storage_backends, f"Unknown storage backend {backend}."
+    return storage_backends[backend](keys, shapes)
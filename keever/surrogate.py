@@ -0,0 +1,293 @@
+'''
+    In-process surrogate models of a Database storage, run as the "surrogate" action type.
+    The model follows the Database across loops: entries added since the last call are appended to the
+    Cholesky factor of the kernel matrix (O(n^2 m) for m new entries) instead of refitting from scratch,
+    and the fitted state stays in the action between loops (and in its state_dict, for checkpoints).
+    Predictions are computed by batches of candidates, with their standard deviation.
+'''
+import asyncio
+import logging
+from functools import partial
+import numpy as np
+from keever.trace import traced
+from keever.space import variable_space
+
+chunk_rows = 4096
+jitters = [0.0, 1e-10, 1e-8, 1e-6] # Added to the diagonal in turn when the kernel matrix is not numerically positive definite
+
+
+def squared_exponential(distances2):
+    return np.exp(-0.5 * distances2)
+
+def matern52(distances2):
+    r = np.sqrt(5.0 * distances2)
+    return (1.0 + r + r * r / 3.0) * np.exp(-r)
+
+kernels = {
+    "squared_exponential": squared_exponential,
+    "matern52": matern52,
+}
+
+
+class GaussianProcess:
+    '''
+        Gaussian process regression with a stationary kernel on normalized inputs and standardized outputs.
+        A RBF interpolant is the mean of this model with a small noise.
+        length_scale: "auto" selects it by marginal likelihood on a grid, at each full fit
+        noise: variance of the observation noise, relative to the output variance
+    '''
+    def __init__(self, kernel="squared_exponential", length_scale="auto", noise=1e-6) -> None:
+        assert kernel in kernels, f"Unknown kernel {kernel}, expected one of {list(kernels.keys())}."
+        self.kernel = kernel
+        self.length_scale = length_scale
+        self.noise = noise
+        self.scale = None # Fitted length scale
+        self.X = None
+        self.y = None
+        self.L = None
+        self.alpha = None
+        self._L_inverse = None # L^-1, computed at the first prediction with std
+        self.y_mean = 0.0
+        self.y_std = 1.0
+
+    def __len__(self):
+        return 0 if self.X is None else len(self.X)
+
+    def _k(self, A, B, scale):
+        distances2 = (A * A).sum(axis=1)[:, None] + (B * B).sum(axis=1)[None, :] - 2.0 * A @ B.T
+        return kernels[self.kernel](np.maximum(distances2, 0.0) / scale ** 2)
+
+    def _factor(self, X, scale):
+        from scipy.linalg import cholesky
+        K = self._k(X, X, scale)
+        diagonal = np.diag_indices_from(K)
+        K[diagonal] += self.noise
+        for jitter in jitters:
+            K[diagonal] += jitter
+            try:
+                return cholesky(K, lower=True)
+            except np.linalg.LinAlgError:
+                logging.debug(f"[GaussianProcess] Kernel matrix is not positive definite with jitter {jitter}.")
+        raise np.linalg.LinAlgError(f"Kernel matrix is not positive definite, even with jitter {jitters[-1]}.")
+
+    def _solve(self):
+        from scipy.linalg import cho_solve
+        self.alpha = cho_solve((self.L, True), (self.y - self.y_mean) / self.y_std)
+        self._L_inverse = None
+
+    def _log_likelihood(self, X, z, scale):
+        from scipy.linalg import cho_solve
+        try:
+            L = self._factor(X, scale)
+        except np.linalg.LinAlgError:
+            return -np.inf
+        return -0.5 * z @ cho_solve((L, True), z) - np.log(np.diag(L)).sum()
+
+    def fit(self, X, y):
+        self.X, self.y = np.array(X, dtype=float), np.array(y, dtype=float)
+        self.y_mean = float(self.y.mean())
+        self.y_std = float(self.y.std()) or 1.0
+        if self.length_scale == "auto":
+            z = (self.y - self.y_mean) / self.y_std
+            scales = np.sqrt(self.X.shape[1]) * np.geomspace(0.02, 2.0, 12)
+            self.scale = float(max(scales, key=lambda scale: self._log_likelihood(self.X, z, scale)))
+        else:
+            self.scale = float(self.length_scale)
+        self.L = self._factor(self.X, self.scale)
+        self._solve()
+        return self
+
+    def append(self, X, y):
+        '''
+            Adds observations with a block update of the Cholesky factor:
+            L = [[L, 0], [B, C]] with B = K21 L^-T and C C^T = K22 - B B^T.
+            Hyperparameters and output standardization are kept.
+            Falls back to a full fit when the update is not numerically positive definite (near duplicates).
+        '''
+        from scipy.linalg import cholesky, solve_triangular
+        X, y = np.asarray(X, dtype=float), np.asarray(y, dtype=float)
+        if self.X is None or len(self.X) == 0:
+            return self.fit(X, y)
+        B = solve_triangular(self.L, self._k(self.X, X, self.scale), lower=True).T
+        K22 = self._k(X, X, self.scale)
+        K22[np.diag_indices_from(K22)] += self.noise
+        try:
+            C = cholesky(K22 - B @ B.T, lower=True)
+        except np.linalg.LinAlgError:
+            return self.fit(np.vstack([self.X, X]), np.concatenate([self.y, y]))
+        n, m = len(self.X), len(X)
+        L = np.zeros((n + m, n + m))
+        L[:n, :n], L[n:, :n], L[n:, n:] = self.L, B, C
+        self.L = L
+        self.X, self.y = np.vstack([self.X, X]), np.concatenate([self.y, y])
+        self._solve()
+        return self
+
+    def predict(self, X, return_std=True):
+        ''' Mean (and standard deviation) of the outputs at X, by batches of chunk_rows. '''
+        from scipy.linalg import solve_triangular
+        X = np.asarray(X, dtype=float)
+        mean = np.empty(len(X))
+        std = np.empty(len(X)) if return_std else None
+        if return_std and self._L_inverse is None: # Products with L^-1 are faster than triangular solves by batch
+            self._L_inverse = solve_triangular(self.L, np.eye(len(self.L)), lower=True).T
+        for start in range(0, len(X), chunk_rows):
+            Ks = self._k(X[start:start+chunk_rows], self.X, self.scale)
+            mean[start:start+chunk_rows] = self.y_mean + self.y_std * (Ks @ self.alpha)
+            if return_std:
+                v = Ks @ self._L_inverse
+                variance = np.maximum(1.0 + self.noise - (v * v).sum(axis=1), 0.0)
+                std[start:start+chunk_rows] = self.y_std * np.sqrt(variance)
+        return (mean, std) if return_std else mean
+
+    @property
+    def state_dict(self):
+        return {"X": self.X, "y": self.y, "L": self.L, "scale": self.scale, "y_mean": self.y_mean, "y_std": self.y_std}
+
+    def load_state_dict(self, state):
+        self.X, self.y, self.L = [ np.asarray(state[key], dtype=float) for key in ["X", "y", "L"] ]
+        self.scale, self.y_mean, self.y_std = state["scale"], state["y_mean"], state["y_std"]
+        self._solve()
+        return self
+
+surrogate_models = {
+    "gp": GaussianProcess,
+}
+
+
+def surrogate_label(runner, *args, **kwargs):
+    return runner.name
+
+class SurrogateRunner:
+    '''
+        Action fitting a surrogate of the storage target of a Database, and predicting it on candidates.
+        Arguments: dataset, the Database to follow (optional once fitted), and x, the candidates
+        as a flat design matrix (like the 'variables' column) or a dict of variable columns.
+        Returns {"count": training entries} and, with x, {"mean": ..., "std": ...}, the std argument set to false skips std.
+        Entries of dataset that hold target are used for training, new ones are appended to the model.
+        The model is fitted again from scratch when entries disappeared or their target changed, when the training set grew
+        by refit_growth since the last full fit, or when the refit argument is true.
+    '''
+    def __init__(self, name, model="gp", target="metric", kernel="squared_exponential", length_scale="auto",
+                 noise=1e-6, refit_growth=2.0, workdir=".") -> None:
+        assert model in surrogate_models, f"Unknown surrogate model {model}, expected one of {list(surrogate_models.keys())}."
+        self.name = name
+        self.model_type = model
+        self.target = target
+        self.kernel = kernel
+        self.length_scale = length_scale
+        self.noise = noise
+        self.refit_growth = refit_growth
+        self.workdir = workdir
+        self.model = surrogate_models[model](kernel=kernel, length_scale=length_scale, noise=noise)
+        self.variables_descr = None
+        self._entries = dict() # Training entries, in model order
+        self._fitted_count = 0 # Training entries at the last full fit
+        self._synced = None # (id, version) of the Database last followed
+        self._checked_keys = set()
+
+    @property
+    def space(self):
+        return variable_space(self.variables_descr)
+
+    def inputs(self, designs):
+        ''' Model inputs of a flat design matrix: normalized continuous elements, then categories scaled to [0, 1]. '''
+        space = self.space
+        designs = np.asarray(designs, dtype=float).reshape(-1, space.size)
+        categories = designs[:, space.discrete_columns] / np.maximum(space.counts[space.discrete_columns] - 1, 1)
+        return np.hstack([space.to_unit(designs), categories])
+
+    def _training_rows(self, dataset, entries):
+        rows = [ dataset[entry] for entry in entries ]
+        designs = np.vstack([ dataset._designs({ key: [value] for key, value in row.items() }) for row in rows ]) if rows else np.empty((0, dataset.space.size))
+        targets = np.asarray([ row[self.target] for row in rows ], dtype=float).reshape(len(rows))
+        keep = ~np.isnan(targets)
+        return [ entry for entry, k in zip(entries, keep) if k ], self.inputs(designs)[keep], targets[keep]
+
+    def update(self, dataset, refit=False):
+        ''' Brings the model up to date with dataset, appending the entries it does not know yet. '''
+        if self._synced == (id(dataset), dataset.version) and not refit:
+            return
+        self.variables_descr = dataset.variables_descr
+        entries = dataset._storage.column_entries(self.target)
+        targets = np.asarray(dataset._storage.column(self.target), dtype=float).reshape(len(entries))
+        rows = dict(zip(entries, range(len(entries))))
+        known = np.fromiter((rows.get(entry, -1) for entry in self._entries), dtype=np.int64, count=len(self._entries))
+        changed = len(known) > 0 and (np.any(known < 0) or not np.array_equal(targets[known], self.model.y))
+        new = [ entry for entry, target in zip(entries, targets.tolist()) if entry not in self._entries and target == target ] # Skips nan targets
+        growth = len(self._entries) + len(new) > self.refit_growth * max(self._fitted_count, 1)
+        if refit or changed or growth or len(self.model) == 0:
+            entries, X, y = self._training_rows(dataset, entries)
+            if len(entries):
+                self.model.fit(X, y)
+            else:
+                self.model = surrogate_models[self.model_type](kernel=self.kernel, length_scale=self.length_scale, noise=self.noise)
+            self._entries = dict.fromkeys(entries)
+            self._fitted_count = len(entries)
+            logging.info(f"[SurrogateRunner/{self.name}] Fitted on {len(entries)} entries.")
+        elif new:
+            new, X, y = self._training_rows(dataset, new)
+            if len(new):
+                self.model.append(X, y)
+                self._entries.update(dict.fromkeys(new))
+            logging.debug(f"[SurrogateRunner/{self.name}] Appended {len(new)} entries.")
+        self._synced = (id(dataset), dataset.version)
+
+    def predict(self, candidates, return_std=True):
+        assert len(self.model) > 0, f"Surrogate {self.name} was never fitted, pass a dataset."
+        if isinstance(candidates, dict):
+            candidates = self.space.encode(candidates)
+        return self.model.predict(self.inputs(candidates), return_std)
+
+    @traced("run_with_dict", "runner", label=surrogate_label)
+    def run_with_dict(self, dictionnary: dict):
+        keys = frozenset(dictionnary.keys())
+        if keys not in self._checked_keys:
+            for key in keys:
+                if key not in self.variables:
+                    logging.warning(f"[SurrogateRunner/{self.name}] variable '{key}' was not in requirements.")
+            self._checked_keys.add(keys)
+
+        if "dataset" in dictionnary and dictionnary["dataset"] is not None:
+            self.update(dictionnary["dataset"], refit=dictionnary["refit"] if "refit" in dictionnary else False)
+        result = {"count": len(self._entries)}
+        if "x" in dictionnary and dictionnary["x"] is not None:
+            if "std" in dictionnary and not dictionnary["std"]:
+                result["mean"] = self.predict(dictionnary["x"], return_std=False)
+            else:
+                result["mean"], result["std"] = self.predict(dictionnary["x"])
+        return result
+
+    @traced("run_with_dict_async", "runner", label=surrogate_label)
+    async def run_with_dict_async(self, dictionnary: dict):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.run_with_dict, dictionnary))
+
+    @property
+    def variables(self):
+        return ["dataset", "x", "refit", "std"]
+
+    @property
+    def requirements(self):
+        return {"variables": self.variables}
+
+    @property
+    def state_dict(self):
+        state = {"name": self.name, "type": "surrogate", "model": self.model_type, "target": self.target, "kernel": self.kernel,
+                 "length_scale": self.length_scale, "noise": self.noise, "refit_growth": self.refit_growth, "workdir": self.workdir}
+        if len(self.model) > 0:
+            state["fitted"] = {**self.model.state_dict, "entries": list(self._entries), "fitted_count": self._fitted_count,
+                               "variables": self.variables_descr}
+        return state
+
+    @classmethod
+    def from_json(cls, data):
+        options = { key: data[key] for key in ["model", "target", "kernel", "length_scale", "noise", "refit_growth", "workdir"] if key in data }
+        runner = cls(data["name"], **options)
+        if "fitted" in data and data["fitted"] is not None:
+            fitted = data["fitted"]
+            runner.model.load_state_dict(fitted)
+            runner._entries = dict.fromkeys(str(entry) for entry in fitted["entries"])
+            runner._fitted_count = fitted["fitted_count"]
+            runner.variables_descr = fitted["variables"]
+        return runner
@@ -0,0 +1,41 @@
+'''
+    Prototype scripts compiled once into literal segments and {{statement}} slots.
+    Rendering fills every slot in a single pass, whatever the number of variables.
+'''
+import re
+from functools import lru_cache
+
+statement_pattern = re.compile(r'\{\{(.*?)\}\}')
+
+
+class Template:
+    def __init__(self, content) -> None:
+        self.content = content
+        self.statements = list() # Unique statements in order of appearance
+        index = dict()
+        segments = list()
+        position = 0
+        for match in statement_pattern.finditer(content):
+            statement = match.group(1)
+            if statement not in index:
+                index[statement] = len(self.statements)
+                self.statements.append(statement)
+            segments.append(self._escape(content[position:match.start()]))
+            segments.append(f"{{{index[statement]}}}")
+            position = match.end()
+        segments.append(self._escape(content[position:]))
+        self._format = "".join(segments)
+        self._placeholders = [ f"{{{{{statement}}}}}" for statement in self.statements ]
+
+    @staticmethod
+    def _escape(literal):
+        return literal.replace("{", "{{").replace("}", "}}")
+
+    def render(self, dictionnary):
+        ''' Statements missing from dictionnary are left as is, like str.replace would. '''
+        return self._format.format(*[ str(dictionnary[statement]) if statement in dictionnary else placeholder
+                                      for statement, placeholder in zip(self.statements, self._placeholders) ])
+
+@lru_cache(maxsize=128)
+def compile_template(content):
+    return Template(content)
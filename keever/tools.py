@@ -1,11 +1,13 @@
 from typing import Any, AnyStr
 import os
 import json
+import shutil
 from json import JSONEncoder
 
 import uuid
 
 import numpy as np 
+from keever.trace import tracer
 
 def ensure_file_directory_exists(file):
     folder_path = os.path.split(file)[0]
@@ -28,8 +30,74 @@ def JSON(path):
 
 def serialize_json(object: Any, path: AnyStr):
     path = path if path.endswith('.json') else path + ".json"
-    with open(path, "w") as f:
-        return json.dump(object, f, cls=NumpyArrayEncoder)
+    with tracer.span("serialize_json", "serialize") as span, open(path, "w") as f:
+        json.dump(object, f, cls=NumpyArrayEncoder)
+        span.add(bytes=f.tell())
+
+def serialize_npy(object: Any, path: AnyStr):
+    '''
+        Binary counterpart of serialize_json.
+        Numpy arrays found in object are written as .npy files in a new generation directory
+        path.columns/<generation>/ and replaced by {"__npy__": "<generation>/<file>"} in the JSON
+        metadata written to path.json. The JSON, replaced last with os.replace, always names a complete
+        generation: a crash while saving leaves the previous checkpoint readable.
+        Previous generations are removed once the JSON is replaced, a process still memory-mapping
+        their files keeps reading valid data (POSIX).
+    '''
+    path = path[:-5] if path.endswith('.json') else path
+    folder = path + ".columns"
+    generation = randid()
+    os.makedirs(os.path.join(folder, generation))
+    count = 0
+
+    def extract(obj):
+        nonlocal count
+        if isinstance(obj, np.ndarray) and obj.dtype.kind != "O":
+            filename = f"{generation}/{count}.npy"
+            count += 1
+            with open(os.path.join(folder, filename), "wb") as f:
+                np.save(f, obj)
+                span.add(bytes=f.tell())
+            return {"__npy__": filename}
+        elif isinstance(obj, dict):
+            return { key: extract(value) for key, value in obj.items() }
+        elif isinstance(obj, (list, tuple)):
+            return [ extract(value) for value in obj ]
+        return obj
+
+    with tracer.span("serialize_npy", "serialize") as span:
+        metadata = extract(object)
+        serialize_json(metadata, path + ".tmp.json")
+        os.replace(path + ".tmp.json", path + ".json")
+    for name in os.listdir(folder):
+        previous = os.path.join(folder, name)
+        if name == generation:
+            continue
+        elif os.path.isdir(previous):
+            shutil.rmtree(previous)
+        else: # Files of checkpoints written before generations
+            os.remove(previous)
+
+def load_serialized(path: AnyStr, mmap_mode=None):
+    '''
+        Loads a file written by serialize_json or serialize_npy.
+        Arrays of binary checkpoints are loaded with np.load(..., mmap_mode=mmap_mode),
+        use mmap_mode="c" to keep them writable without touching the files.
+    '''
+    path = path[:-5] if path.endswith('.json') else path
+    folder = path + ".columns"
+
+    def resolve(obj):
+        if isinstance(obj, dict):
+            if "__npy__" in obj:
+                return np.load(os.path.join(folder, obj["__npy__"]), mmap_mode=mmap_mode)
+            return { key: resolve(value) for key, value in obj.items() }
+        elif isinstance(obj, list):
+            return [ resolve(value) for value in obj ]
+        return obj
+
+    with tracer.span("load_serialized", "serialize"):
+        return resolve(JSON(path + ".json"))
 
 def randid(length=None):
     if length:
@@ -37,6 +105,11 @@ def randid(length=None):
     else:
         return str(uuid.uuid1())
 
+def randids(count):
+    ''' Generates count unique identifiers at once, sharing a random uuid prefix. '''
+    prefix = str(uuid.uuid4())[:24]
+    return [ f"{prefix}{i:012x}" for i in range(count) ]
+
 def str_rm_substrings(string, substrings):
     for ss in substrings:
         string = string.replace(ss, "")
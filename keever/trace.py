@@ -0,0 +1,173 @@
+'''
+    Instrumentation of keever calls.
+    Spans record the wall time of a call, along with counters such as bytes written.
+    Traces are dumped in the Chrome trace format (chrome://tracing, ui.perfetto.dev)
+    and summarized per span name.
+    While disabled, a traced call only costs a check of tracer.enabled.
+'''
+import os
+import json
+import asyncio
+import inspect
+import threading
+import functools
+from time import perf_counter_ns
+
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, **counters):
+        pass
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self, perf_counter_ns())
+        return False
+
+    def add(self, **counters):
+        ''' Accumulates counters (bytes=..., files=...) in the span arguments. '''
+        for key, value in counters.items():
+            self.args[key] = self.args.get(key, 0) + value
+
+
+def _track():
+    ''' Chrome traces need nested spans per track: one track per thread, or per task in an event loop. '''
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) if task is not None else threading.get_ident()
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.events = list()
+        self._origin = perf_counter_ns()
+        self._tracks = dict()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self.events.clear()
+        self._tracks.clear()
+
+    def span(self, name, category="keever", **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def record(self, span, end):
+        track = self._tracks.setdefault(_track(), len(self._tracks))
+        self.events.append({
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            "ts": (span.start - self._origin) / 1e3,
+            "dur": (end - span.start) / 1e3,
+            "pid": os.getpid(),
+            "tid": track,
+            "args": span.args,
+        })
+
+    @property
+    def chrome_trace(self):
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace, f, default=str)
+        return path
+
+    def summary(self):
+        ''' Calls, total/mean/max wall time (seconds) and bytes per span name, the slowest first. '''
+        rows = dict()
+        for event in self.events:
+            row = rows.setdefault(event["name"], {"name": event["name"], "calls": 0, "total": 0.0, "max": 0.0, "bytes": 0})
+            duration = event["dur"] / 1e6
+            row["calls"] += 1
+            row["total"] += duration
+            row["max"] = max(row["max"], duration)
+            row["bytes"] += event["args"].get("bytes", 0)
+        for row in rows.values():
+            row["mean"] = row["total"] / row["calls"]
+        return sorted(rows.values(), key=lambda row: row["total"], reverse=True)
+
+    def summary_table(self):
+        rows = self.summary()
+        width = max([ len(row["name"]) for row in rows ] + [4])
+        lines = [f"{'span':<{width}} {'calls':>7} {'total(s)':>10} {'mean(ms)':>10} {'max(ms)':>10} {'bytes':>12}"]
+        for row in rows:
+            lines.append(f"{row['name']:<{width}} {row['calls']:>7} {row['total']:>10.3f} {1e3 * row['mean']:>10.3f} {1e3 * row['max']:>10.3f} {row['bytes']:>12}")
+        return "\n".join(lines)
+
+tracer = Tracer()
+
+
+def traced(name, category="keever", label=None, measure=None):
+    '''
+        Decorates a function (or coroutine function) with a span.
+        label: called with the arguments of the call, its result is appended to the span name
+        measure: called with the return value, returns counters to add to the span
+    '''
+    def decorator(function):
+        def open_span(args, kwargs):
+            span_name = name if label is None else f"{name} {label(*args, **kwargs)}"
+            return tracer.span(span_name, category)
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await function(*args, **kwargs)
+                with open_span(args, kwargs) as span:
+                    result = await function(*args, **kwargs)
+                    if measure is not None:
+                        span.add(**measure(result))
+                    return result
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return function(*args, **kwargs)
+                with open_span(args, kwargs) as span:
+                    result = function(*args, **kwargs)
+                    if measure is not None:
+                        span.add(**measure(result))
+                    return result
+        return wrapper
+    return decorator
+
+def file_bytes(path):
+    ''' measure helper for functions returning the path of the file (or directory) they wrote. '''
+    if not isinstance(path, str):
+        return {"bytes": 0}
+    if os.path.isdir(path):
+        return {"bytes": sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())}
+    return {"bytes": os.path.getsize(path) if os.path.isfile(path) else 0}
@@ -0,0 +1,146 @@
+'''
+    Job completion detection through touchfiles.
+    Jobs create their touchfile on success, or its failure marker (.ended replaced by .failed) on error.
+    On Linux, inotify wakes us up as soon as a file appears in a watched directory.
+    Polling with exponential backoff always runs along, as inotify does not see files
+    created by other hosts on network filesystems.
+'''
+import os
+import sys
+import select
+import asyncio
+import logging
+from os.path import isfile, dirname, abspath
+from time import monotonic, sleep
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+
+
+class JobFailedError(RuntimeError):
+    pass
+
+
+def failure_marker(touchfile):
+    if touchfile.endswith(".ended"):
+        return touchfile[:-len(".ended")] + ".failed"
+    return touchfile + ".failed"
+
+
+class Inotify:
+    ''' Minimal ctypes binding to inotify, raises OSError when unavailable. '''
+    def __init__(self, directories) -> None:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, directory.encode(), IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE) < 0:
+                self.close()
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed on {directory}")
+
+    def wait(self, timeout):
+        ''' Returns True if events arrived within timeout seconds. '''
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        self.drain()
+        return True
+
+    def drain(self):
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class CompletionWatcher:
+    '''
+        Waits until every file exists.
+        timeout: seconds before raising TimeoutError (None waits forever)
+        min_interval, max_interval: polling backoff bounds in seconds
+    '''
+    def __init__(self, files, timeout=None, min_interval=0.05, max_interval=60, use_inotify=True) -> None:
+        self.files = list(files)
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+
+    def _open_inotify(self):
+        if not self.use_inotify:
+            return None
+        directories = set(dirname(abspath(file)) for file in self.files)
+        try:
+            return Inotify([ d for d in directories if os.path.isdir(d) ])
+        except (OSError, AttributeError) as e:
+            logging.debug(f"[CompletionWatcher] inotify unavailable ({e}), polling only.")
+            return None
+
+    def _check(self, pending):
+        failed = [ file for file in pending if isfile(failure_marker(file)) ]
+        if failed:
+            for file in failed:
+                os.remove(failure_marker(file))
+            raise JobFailedError(f"Jobs failed: {', '.join(failed)}.")
+        return [ file for file in pending if not isfile(file) ]
+
+    def _next_timeout(self, start, interval, pending):
+        if self.timeout is None:
+            return interval
+        remaining = self.timeout - (monotonic() - start)
+        if remaining <= 0:
+            raise TimeoutError(f"Timed out waiting for {', '.join(pending)}.")
+        return min(interval, remaining)
+
+    def wait(self):
+        start = monotonic()
+        interval = self.min_interval
+        notifier = self._open_inotify() # Opened before the first check, so no creation is missed
+        try:
+            pending = self._check(self.files)
+            while pending:
+                timeout = self._next_timeout(start, interval, pending)
+                if notifier is not None:
+                    notifier.wait(timeout)
+                else:
+                    sleep(timeout)
+                pending = self._check(pending)
+                interval = min(2 * interval, self.max_interval)
+        finally:
+            if notifier is not None:
+                notifier.close()
+        logging.debug(f"[CompletionWatcher] {len(self.files)} files present after {monotonic() - start:.2f}s.")
+
+    async def wait_async(self):
+        ''' Same as wait, the inotify descriptor is watched by the running event loop. '''
+        loop = asyncio.get_running_loop()
+        start = monotonic()
+        interval = self.min_interval
+        event = asyncio.Event()
+        notifier = self._open_inotify()
+        if notifier is not None:
+            loop.add_reader(notifier.fd, lambda: (notifier.drain(), event.set()))
+        try:
+            pending = self._check(self.files)
+            while pending:
+                timeout = self._next_timeout(start, interval, pending)
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                pending = self._check(pending)
+                interval = min(2 * interval, self.max_interval)
+        finally:
+            if notifier is not None:
+                loop.remove_reader(notifier.fd)
+                notifier.close()
@@ -0,0 +1,7 @@
+def __requires__():
+    return {"variables": ["db"]}
+
+import numpy as np
+def __run__(db):
+    db.add_entries({"x": np.random.rand(1, 2)})
+    return len(db)
@@ -0,0 +1,3 @@
+sleep 0.3
+echo "{{value[]}}" > /dev/null
+touch {{touchfile}}
@@ -0,0 +1,7 @@
+def __requires__():
+    return {"variables": ["x", "power"]}
+
+import os
+import numpy as np
+def __run__(x, power=2):
+    return {"y": np.sum(np.power(x, power), axis=-1), "pid": [os.getpid()] * len(x)}
@@ -0,0 +1,3 @@
+trap 'touch {{failfile}}; exit 1' ERR
+false
+touch {{touchfile}}
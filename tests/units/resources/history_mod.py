@@ -0,0 +1,6 @@
+def __requires__():
+    return {"variables": ["history", "value"]}
+
+def __run__(history, value):
+    history["values"].append(value)
+    return len(history["values"])
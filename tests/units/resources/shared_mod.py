@@ -0,0 +1,8 @@
+def __requires__():
+    return {"variables": ["x", "db"]}
+
+import numpy as np
+def __run__(x, db):
+    data = db.column("variables")
+    nearest = np.min(np.linalg.norm(x[:, None, :] - data[None], axis=-1), axis=1)
+    return {"nearest": nearest, "handle": [type(db).__name__] * len(x)}
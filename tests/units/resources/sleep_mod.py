@@ -0,0 +1,7 @@
+def __requires__():
+    return {"variables": ["duration"]}
+
+from time import sleep
+def __run__(duration):
+    sleep(duration)
+    return duration
@@ -0,0 +1,26 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+import asyncio
+from time import monotonic
+from keever.algorithm import Algorithm
+from keever.runners import ScriptRunner, ModuleRunner
+
+class AsyncActions(unittest.TestCase):
+    def test_overlap(self):
+        script = Algorithm("script")
+        script.actions["run"] = ScriptRunner("array", "tests/units/resources/array.proto.sh", shell="bash", workdir=".", max_parallel=2)
+        module = Algorithm("module")
+        module.actions["run"] = ModuleRunner("sleep_mod", "resources.sleep_mod", workdir=".")
+
+        async def both():
+            return await asyncio.gather(
+                script.action_async("run", args={"value": [1, 2]}),
+                module.action_async("run", args={"duration": 0.3}))
+
+        # The two script jobs (sleep 0.3 in array.proto.sh) run side by side with max_parallel=2,
+        # so the actions take 0.3 s each and 0.6 s when run one after the other.
+        start = monotonic()
+        results = asyncio.run(both())
+        assert(results[1] == 0.3)
+        assert(monotonic() - start < 0.45)
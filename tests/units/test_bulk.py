@@ -0,0 +1,31 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from keever.database import Database
+from os.path import join
+from tempfile import TemporaryDirectory
+import numpy as np
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 3}]}
+
+class BulkIngestion(unittest.TestCase):
+    def test_add_update(self):
+        for backend in ["dict", "columnar"]:
+            db = Database("bulk", variables, ["metric"], backend=backend)
+            x = np.random.rand(100, 3)
+            ids = db.add_entries({"x": x})
+            assert(len(db) == 100 and len(set(ids)) == 100)
+            db.update_entries(ids[::2], {"metric": np.arange(50.0)})
+            assert(db[ids[4]]["metric"] == 2.0)
+            assert(np.allclose(db[ids[7]]["x"], x[7]))
+            with self.assertRaises(AssertionError):
+                db.update_entries(ids[:2], {"metric": np.arange(3.0)})
+
+    def test_append_npz(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = join(tmp.name, "bulk.npz")
+        np.savez(path, variables=np.random.rand(20, 3))
+        db = Database("bulk", variables, ["metric"], backend="columnar")
+        db.append_npz_keys(path, ["variables"])
+        assert(db.column("variables").shape == (20, 3))
@@ -0,0 +1,71 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+import numpy as np
+from os.path import join
+from tempfile import TemporaryDirectory
+from keever.algorithm import Algorithm
+from keever.cache import stable_hash
+import resources.count_mod as count_mod
+
+def make_algorithm(cache):
+    return Algorithm.from_json({"name": "fom", "workdir": ".", "actions": [
+        {"name": "evaluate", "type": "module_runner", "path": "resources.count_mod", "workdir": ".", "cache": cache}]})
+
+class ActionCaching(unittest.TestCase):
+    def test_hash(self):
+        x = np.arange(6.0).reshape(2, 3)
+        assert(stable_hash({"x": x, "a": 1}) == stable_hash({"a": 1, "x": x.copy()}))
+        assert(stable_hash(x) != stable_hash(x.astype(np.float32)))
+        assert(stable_hash(x) != stable_hash(x.reshape(3, 2)))
+
+    def test_database(self):
+        from keever.database import Database
+        variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 2}]}
+        for backend in ["dict", "columnar"]:
+            db, same = [ Database("pop", variables, ["metric"], backend=backend) for i in range(2) ]
+            for d in [db, same]:
+                d.add_entries({"x": np.ones((3, 2))}, ids=["a", "b", "c"])
+            assert(stable_hash(db) == stable_hash(same))
+            db.update_entry("a", {"metric": 1.0})
+            assert(stable_hash(db) != stable_hash(same))
+
+    def test_copies(self):
+        algo = make_algorithm({"size": 10})
+        x = np.random.rand(4, 3)
+        y = algo.action("evaluate", args={"x": x})
+        expected = y.copy()
+        y[:] = 0.0
+        cached = algo.action("evaluate", args={"x": x})
+        assert(np.allclose(cached, expected))
+        cached[:] = 0.0
+        assert(np.allclose(algo.action("evaluate", args={"x": x}), expected))
+
+    def test_rows(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        algo = make_algorithm({"size": 100, "path": join(tmp.name, "cache_test"), "rows": "x"})
+        count_mod.evaluated.clear()
+        x = np.random.rand(8, 3)
+        y = algo.action("evaluate", args={"x": x})
+        y2 = algo.action("evaluate", args={"x": np.vstack([x[2:6], np.random.rand(2, 3)])})
+        assert(count_mod.evaluated == [8, 2])
+        assert(np.allclose(y2[:4], y[2:6]))
+        assert(algo.caches["evaluate"].stats["hits"] == 4)
+
+        # A new Algorithm reads the disk tier
+        algo = make_algorithm({"size": 100, "path": join(tmp.name, "cache_test"), "rows": "x"})
+        assert(np.allclose(algo.action("evaluate", args={"x": x}), y))
+        assert(count_mod.evaluated == [8, 2])
+        algo.action("evaluate", args={"x": x, "scale": 2.0})
+        assert(count_mod.evaluated == [8, 2, 8])
+
+    def test_whole_call(self):
+        algo = make_algorithm({"size": 1})
+        count_mod.evaluated.clear()
+        algo.action("evaluate", args={"x": [[1.0, 2.0]]})
+        algo.action("evaluate", args={"x": [[1.0, 2.0]]})
+        algo.action("evaluate", args={"x": [[1.0, 3.0]]})
+        algo.action("evaluate", args={"x": [[1.0, 2.0]]})
+        assert(count_mod.evaluated == [1, 1, 1])
+        assert("cache" in algo.state_dict["actions"][0])
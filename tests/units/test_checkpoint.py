@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+from unittest import mock
+sys.path.append("./tests/units/")
+from keever.algorithm import ModelManager
+from keever.database import Database
+from keever.tools import load_serialized, serialize_npy
+import yaml
+from os.path import join
+from tempfile import TemporaryDirectory
+import numpy as np
+
+class BinaryCheckpoint(unittest.TestCase):
+    def setUp(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    def test_database(self):
+        variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 3}]}
+        for backend in ["dict", "columnar"]:
+            db = Database("ckpt", variables, ["metric", "map"], backend=backend)
+            ids = db.add_entries({"x": np.random.rand(30, 3)})
+            db.update_entries(ids[:10], {"map": np.ones((10, 4, 4), dtype=np.float32)})
+            db.save(join(self.tmp, f"ckpt_{backend}"), "npy")
+
+            db2 = Database.from_json(load_serialized(join(self.tmp, f"ckpt_{backend}.json"), mmap_mode="c"))
+            assert(db2.entries == db.entries and db2.backend == backend)
+            assert(db2[ids[3]]["map"].dtype == np.float32 and db2[ids[3]]["map"].shape == (4, 4))
+            assert("map" not in db2[ids[20]])
+            assert(np.allclose(db2.column("x"), db.column("x")))
+            db2.update_entries(ids[:1], {"metric": [1.0]})
+
+            db.update_entries(ids, {"metric": np.zeros(30)})
+            db.save(join(self.tmp, f"ckpt_{backend}"), "npy")
+            db3 = Database.from_json(load_serialized(join(self.tmp, f"ckpt_{backend}.json"), mmap_mode="r"))
+            db3.update_entry(ids[0], {"metric": 1.0})
+            db3.update_entries(ids[1:3], {"metric": [2.0, 3.0]})
+            assert(np.allclose(db3.column("metric")[:4], [1.0, 2.0, 3.0, 0.0]))
+            db4 = Database.from_json(load_serialized(join(self.tmp, f"ckpt_{backend}.json"), mmap_mode="r"))
+            assert(np.allclose(db4.column("metric"), 0.0)) # Files are not modified
+
+    def test_model_manager(self):
+        with open("tests/units/resources/exporttest.yml", "r") as file:
+            config = yaml.safe_load(file)
+        mm = ModelManager()
+        mm.load_state_dict(config)
+        mm.save(join(self.tmp, "ckpt_mm"), "npy")
+        mm2 = ModelManager()
+        mm2.load_state_dict(load_serialized(join(self.tmp, "ckpt_mm.json")))
+        assert(np.allclose(mm2.get("pop").column("x"), mm.get("pop").column("x")))
+
+    def test_generations(self):
+        path = join(self.tmp, "generations")
+        serialize_npy({"a": np.arange(3.0), "b": np.ones(4)}, path)
+        serialize_npy({"a": np.arange(5.0)}, path)
+        generations = os.listdir(path + ".columns")
+        assert(len(generations) == 1 and os.listdir(join(path + ".columns", generations[0])) == ["0.npy"])
+
+        with mock.patch("numpy.save", side_effect=OSError("disk full")): # Crash while saving
+            self.assertRaises(OSError, serialize_npy, {"a": np.zeros(2)}, path)
+        assert(np.array_equal(load_serialized(path)["a"], np.arange(5.0)))
+        serialize_npy({"a": np.zeros(2)}, path)
+        assert(np.array_equal(load_serialized(path)["a"], np.zeros(2)) and len(os.listdir(path + ".columns")) == 1)
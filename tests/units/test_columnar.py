@@ -0,0 +1,40 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from keever.database import Database
+from os.path import join
+from tempfile import TemporaryDirectory
+import numpy as np
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 4}]}
+
+class ColumnarBasic(unittest.TestCase):
+    def test_entries(self):
+        db = Database("col", variables, ["metric"], backend="columnar")
+        db.populate("LHS", 40)
+        assert(len(db) == 40)
+        assert(db.as_arrays()["x"].shape == (40, 4))
+        db.update_entries(db.entries[:10], {"metric": np.arange(10.0)})
+        assert(db[db.entries[3]]["metric"] == 3.0)
+        assert("metric" not in db[db.entries[20]])
+
+        arrays = db.as_arrays()
+        assert(np.shares_memory(arrays["x"], db.as_arrays()["x"]))
+
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db.store_in_file(join(tmp.name, "columnar"), "npz", ["x", "metric", "variables"])
+        d = np.load(join(tmp.name, "columnar.npz"))
+        assert(d["metric"].shape == (10,))
+        assert(d["variables"].shape == (40, 4))
+
+    def test_merge(self):
+        a = Database("a", variables, ["metric"], backend="columnar")
+        b = Database("b", variables, ["metric"])
+        a.populate("LHS", 5)
+        b.populate("LHS", 7)
+        a.merge(b)
+        assert(len(a) == 12)
+        b.merge(a)
+        assert(len(b) == 12)
+        assert(np.allclose(np.sort(a.column("x"), axis=0), np.sort(b.column("x"), axis=0)))
@@ -0,0 +1,25 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from keever.database import Database
+import numpy as np
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 2}]}
+
+class EntriesIndex(unittest.TestCase):
+    def test_order(self):
+        for backend in ["dict", "columnar"]:
+            db = Database("idx", variables, ["metric"], backend=backend)
+            names = [ f"e{i}" for i in range(50) ]
+            for name in names:
+                db.add_entry(name, {"x": np.zeros(2)})
+            db.update_entry("e3", {"metric": 1.0})
+            assert(db.entries == names and len(db) == 50)
+            assert([ entry for entry, props in db ] == names)
+
+            other = Database("other", variables, ["metric"], backend=backend)
+            other.add_entry("f0", {"x": np.ones(2)})
+            db.merge(other)
+            assert(db.entries == names + ["f0"])
+            db.clear()
+            assert(len(db) == 0 and db.entries == [])
@@ -1,5 +1,6 @@
 import unittest
 import sys
+import gc
 sys.path.append("./tests/units/")
 from keever.algorithm import ModelManager
 import yaml
@@ -20,3 +21,103 @@ class ExportBasic(unittest.TestCase):
         assert(np.all(~np.isnan(d["variables"])))
 
 
+
+    def test_formats(self):
+        import keever.export
+        from os.path import join
+        from keever.database import Database
+        variables = {"params": [
+            {"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 3},
+            {"name": "y", "type": "real", "lower": 0.0, "upper": 1.0}]}
+        chunk_bytes, keever.export.chunk_bytes = keever.export.chunk_bytes, 64 # Several chunks per column
+        try:
+            for backend in ["dict", "columnar"]:
+                db = Database("formats", variables, ["metric", "tags"], backend=backend)
+                db.populate("LHS", 30)
+                db.update_entries(db.entries[5:25], {"metric": np.arange(20.0)})
+                db.update_entry(db.entries[0], {"tags": "first"})
+                db.update_entry(db.entries[1], {"tags": "second"})
+                keys = ["variables", "x", "metric", "tags"]
+                db.exporters = { f"{method}.all": keys for method in ["npz", "npz-raw", "npy"] }
+                for method in ["npz", "npz-raw", "npy"]:
+                    filename = db.export(f"{method}.all")
+                    if method == "npy":
+                        d = { key: np.load(join(filename, key + ".npy"), mmap_mode=None if key == "tags" else "r", allow_pickle=True) for key in keys }
+                        assert(isinstance(d["x"], np.memmap))
+                    else:
+                        d = np.load(filename, allow_pickle=True)
+                    assert(d["variables"].shape == (30, 4))
+                    assert(np.array_equal(d["variables"], db.column("variables")))
+                    assert(np.array_equal(d["x"], db.column("x")))
+                    assert(np.array_equal(d["metric"], np.arange(20.0)))
+                    assert(list(d["tags"]) == ["first", "second"])
+        finally:
+            keever.export.chunk_bytes = chunk_bytes
+
+    def test_reuse(self):
+        from os.path import exists
+        from keever.database import Database
+        from keever.runners import ScriptRunner
+        from keever.export import remove_export
+        db = Database("reuse", {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 2}]}, ["metric"])
+        db.populate("LHS", 10)
+        db.exporters = {"npz.all": ["x"]}
+        owned = [ db.export("npz.all") for i in range(2) ] # Not shared, owned by the caller
+        assert(owned[0] != owned[1] and len(db._exports) == 0)
+        for name in owned:
+            remove_export(name)
+
+        first = db.export_shared("npz.all")
+        assert(db.export_shared("npz.all") == first)
+        db.release_export(first)
+        db.update_entry(db.entries[0], {"metric": 1.0})
+        second = db.export_shared("npz.all")
+        assert(second != first and exists(first)) # first is still referenced once
+        db.release_export(first)
+        assert(not exists(first))
+        db.release_export(second)
+        assert(exists(second)) # Kept for the next export of this version
+
+        runner = ScriptRunner("export", "tests/units/resources/export.proto.sh", shell="bash", workdir=".")
+        runner.run_with_dict({"db": db})
+        runner.run_with_dict({"db": db})
+        assert(exists(second) and list(db._exports) == [second] and db._exports[second][1] == 0)
+        db.clear_exports()
+        assert(not exists(second) and len(db._exports) == 0)
+
+        db.exporters = {"npz.all": ["x", "metric"]} # Other keys, the export is written again
+        third = db.export_shared("npz.all")
+        with np.load(third) as exported:
+            assert(third != second and {"x", "metric"} <= set(exported.keys()))
+        db.exporters = {"npz.all": ["x"]}
+        db.release_export(third)
+        assert(not exists(third))
+        fourth = db.export_shared("npz.all")
+        db.release_export(fourth)
+        del db
+        gc.collect()
+        assert(not exists(fourth)) # Removed with the Database
+
+    def test_shared_changed(self):
+        import os
+        import pickle
+        from os.path import exists
+        from keever.database import Database
+        db = Database("changed", {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 2}]}, ["metric"])
+        db.populate("LHS", 10)
+        db.exporters = {"npz.all": ["x"], "npy.all": ["x"]}
+        for exporter in db.exporters:
+            first = db.export_shared(exporter)
+            db.release_export(first)
+            if os.path.isdir(first):
+                os.remove(os.path.join(first, "x.npy")) # Edited by a script
+            else:
+                os.remove(first)
+            second = db.export_shared(exporter)
+            x = np.load(os.path.join(second, "x.npy")) if os.path.isdir(second) else np.load(second)["x"]
+            assert(second != first and np.array_equal(x, db.column("x")))
+            db.release_export(second)
+        copied = pickle.loads(pickle.dumps(db))
+        assert(len(copied._exports) == 0 and len(db._exports) == 2)
+        db.clear_exports()
+        assert(not exists(second))
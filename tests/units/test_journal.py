@@ -0,0 +1,40 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from keever.algorithm import ModelManager
+import yaml
+from os.path import join, getsize
+from tempfile import TemporaryDirectory
+import numpy as np
+
+class JournalCheckpoint(unittest.TestCase):
+    def load(self):
+        with open("tests/units/resources/exporttest.yml", "r") as file:
+            config = yaml.safe_load(file)
+        mm = ModelManager()
+        mm.load_state_dict(config)
+        return mm
+
+    def test_replay(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = join(tmp.name, "journaled")
+        mm = self.load()
+        mm.snapshot_every = 3
+        mm.save(path, "journal")
+        pop = mm.get("pop")
+        pop.update_entries(pop.entries[:5], {"metric": np.arange(5.0)})
+        ids = pop.add_entries({"x": np.zeros((2, 10))})
+        mm.save(path, "journal")
+        assert(getsize(path + ".journal") < 2000)
+
+        mm2 = ModelManager().load(path)
+        assert(mm2.get("pop").entries == pop.entries)
+        assert(mm2.get("pop")[pop.entries[4]]["metric"] == 4.0)
+
+        pop.clear()
+        pop.add_entry("last", {"x": np.ones(10)})
+        mm.save(path, "journal")
+        mm.save(path, "journal") # Snapshot, the journal starts over
+        mm3 = ModelManager().load(path)
+        assert(mm3.get("pop").entries == ["last"])
@@ -0,0 +1,68 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from keever.database import Database
+import numpy as np
+
+variables = {"params": [
+    {"name": "x", "type": "vreal", "lower": -10.0, "upper": 10.0, "size": 3},
+    {"name": "c", "type": "categ", "count": 3},
+]}
+
+class Neighbors(unittest.TestCase):
+    def test_near_duplicates(self):
+        for backend in ["dict", "columnar"]:
+            db = Database("doe", variables, ["metric"], backend=backend)
+            db.populate("uniform", 500, seed=0)
+            existing = db.column("variables")[:20]
+            candidates = db.space.from_unit(np.random.default_rng(1).random((50, 4)))
+            candidates[:10] = existing[:10]
+            candidates[:10, :3] += 0.01 # 5e-4 in normalized units
+            candidates[10:20] = existing[10:20]
+            candidates[10:20, 3] = (candidates[10:20, 3] + 1) % 3 # Other category
+            mask = db.near_duplicates(candidates, tolerance=1e-3)
+            assert(mask[:10].all() and not mask[10:20].any())
+            assert(not db.near_duplicates(candidates[:10], tolerance=1e-4).any())
+
+            db.add_entries({"x": candidates[20:25, :3], "c": candidates[20:25, 3:].astype(int)})
+            other = Database("selected", variables, ["metric"], backend=backend)
+            other.add_entries({"variables": candidates[25:30]})
+            db.merge(other)
+            mask = db.near_duplicates({"x": candidates[:, :3], "c": candidates[:, 3]}, tolerance=1e-3)
+            assert(mask[:10].all() and not mask[10:20].any() and mask[20:30].all() and not mask[30:].any())
+            reloaded = Database.from_json(db.binary_state_dict)
+            assert(np.array_equal(reloaded.near_duplicates(candidates, tolerance=1e-3), mask))
+            db.clear()
+            assert(not db.near_duplicates(candidates, tolerance=1e-3).any())
+
+    def test_filter(self):
+        db = Database("doe", variables, ["metric"])
+        db.populate("LHS", 100, seed=0)
+        candidates = np.vstack([db.column("variables")[:5], [[1.0, 2.0, 3.0, 1]] * 3, [[-1.0, 2.0, 3.0, 2]]])
+        kept = db.filter_duplicates(candidates, tolerance=1e-3)
+        assert(np.array_equal(kept, candidates[[5, 8]]))
+        assert(len(db.filter_duplicates(candidates, tolerance=1e-3, within=False)) == 4)
+
+    def test_replaced_designs(self):
+        for backend in ["dict", "columnar"]:
+            db = Database("doe", variables, ["metric", "variables"], backend=backend)
+            ids = db.add_entries({"variables": db.space.from_unit(np.random.default_rng(0).random((20, 4)))})
+            old = db.column("variables")[:4].copy()
+            assert(db.near_duplicates(old).all())
+            moved = db.space.from_unit(np.random.default_rng(1).random((4, 4)))
+            db.update_entry(ids[0], {"variables": moved[0]})
+            db.update_entries(ids[1:3], {"variables": moved[1:3]})
+            db.add_entries({"variables": moved[3:]}, ids=ids[3:4])
+            assert(not db.near_duplicates(old).any() and db.near_duplicates(moved).all())
+
+    def test_partial_designs(self):
+        for backend in ["dict", "columnar"]:
+            db = Database("doe", variables, ["metric"], backend=backend)
+            designs = db.space.from_unit(np.random.default_rng(0).random((3, 4)))
+            db.add_entries({"x": designs[:2, :3]}, ids=["a", "b"])
+            db.add_entries({"c": designs[1:, 3].astype(int)}, ids=["b", "c"]) # Same count, other entries
+            assert(np.array_equal(db.column("variables"), designs[1:2]))
+            assert(np.array_equal(np.vstack(list(db.column_chunks("variables", 1))), designs[1:2]))
+            assert(db.column_layout("variables") is None)
+            mask = db.near_duplicates(designs)
+            assert(mask.tolist() == [False, True, False])
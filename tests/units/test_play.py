@@ -0,0 +1,43 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+import os
+import shutil
+import subprocess
+import yaml
+from os.path import join
+from tempfile import mkdtemp
+from keever.playbook import load_checkpoint
+
+class PlayResume(unittest.TestCase):
+    def setUp(self):
+        self.tmp = mkdtemp()
+        with open("tests/units/resources/resume.yml", "r") as file:
+            config = yaml.safe_load(file)
+        config["workdir"] = self.tmp
+        with open(join(self.tmp, "resume.yml"), "w") as file:
+            yaml.safe_dump(config, file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def play(self, *options):
+        env = {**os.environ, "PYTHONPATH": "tests/units", "KEEVER_TMP": self.tmp}
+        subprocess.run([sys.executable, "keever/play.py", "--project", join(self.tmp, "resume.yml"),
+                        "--logfile", join(self.tmp, "play.log"), *options], check=True, env=env)
+
+    def test_resume(self):
+        checkpoints = join(self.tmp, "checkpoints")
+        self.play()
+        mm, variables, position = load_checkpoint(join(checkpoints, "loop"))
+        assert(position == {"phase": "loop", "index": 2, "iterations": 2})
+        assert(len(mm.get("pop")) == 9 and variables["count"] == 9) # 5 populated, 1 in init, 3 in loops
+
+        # Resumed items are not populated again, and completed steps are skipped
+        self.play("--resume", join(checkpoints, "init"))
+        mm, variables, position = load_checkpoint(join(checkpoints, "loop"))
+        assert(len(mm.get("pop")) == 9 and variables["count"] == 9)
+
+        self.play("--resume", join(checkpoints, "loop"), "--concurrency", "2")
+        mm, variables, position = load_checkpoint(join(checkpoints, "loop"))
+        assert(position["iterations"] == 3 and len(mm.get("pop")) == 10)
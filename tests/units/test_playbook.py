@@ -0,0 +1,74 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from time import sleep, monotonic
+from keever.playbook import PlaybookStep, dependencies, run_steps
+
+playbook = [
+    {"type": "action", "item": "unet", "action": "train", "args": {"dataset": "@main"}, "output": "model"},
+    {"type": "action", "item": "fom", "action": "evaluate", "args": {"population": "@selected"}, "output": "eval"},
+    {"type": "update-entries", "item": "selected", "tags": "#eval.individual_tag", "values": {"metric": "#eval.metric"}},
+    {"type": "merge", "item": "main", "target": "selected"},
+    {"type": "log-info", "msg": "{} {}", "args": ["#model", "#eval"]},
+    {"type": "action", "item": "unet", "action": "train", "args": {"dataset": "@main"}, "output": "model"},
+]
+
+class Scheduling(unittest.TestCase):
+    def test_dependencies(self):
+        steps = [ PlaybookStep(i, action) for i, action in enumerate(playbook) ]
+        deps = dependencies(steps)
+        assert(deps[1] == set())          # Evaluation does not wait for the training
+        assert(deps[2] == {1})            # Reads #eval and mutates @selected
+        assert(deps[3] == {0, 1, 2})      # Mutates @main passed to the training, reads @selected passed to the evaluation
+        assert(deps[4] == {0, 1})
+        assert(deps[5] == {0, 3, 4})      # Same item, reads @main, rewrites #model
+        barrier = PlaybookStep(6, {"type": "checkpoint", "name": "post-init"})
+        assert(all(barrier.conflicts(step) for step in steps))
+
+    def test_concurrent(self):
+        started, finished = dict(), dict()
+        def play(action):
+            started[action["name"]] = monotonic()
+            sleep(action["duration"])
+            finished[action["name"]] = monotonic()
+        actions = [
+            {"type": "action", "item": "a", "name": "a", "duration": 0.3, "output": "x"},
+            {"type": "action", "item": "b", "name": "b", "duration": 0.3, "output": "y"},
+            {"type": "action", "item": "a", "name": "c", "duration": 0.0, "args": {"y": "#y"}},
+        ]
+        start = monotonic()
+        run_steps(actions, play, concurrency=2)
+        assert(monotonic() - start < 0.5)
+        assert(started["c"] >= max(finished["a"], finished["b"]))
+
+        started.clear()
+        run_steps(actions, play, concurrency=2, running=lambda: "a" not in started)
+        assert(set(started) == {"a", "b"})
+
+    def test_mutated_arguments(self):
+        actions = [
+            {"type": "action", "item": "fom", "action": "append", "args": {"db": "@pop"}},
+            {"type": "action", "item": "fom2", "action": "append", "args": {"db": "@pop"}},
+            {"type": "serialize", "item": "pop"},
+        ]
+        deps = dependencies([ PlaybookStep(i, action) for i, action in enumerate(actions) ])
+        assert(deps == [set(), {0}, {0, 1}])
+
+        from keever.database import Database
+        from keever.runners import ModuleRunner
+        db = Database("pop", {"params": [{"name": "x", "type": "vreal", "lower": 0.0, "upper": 1.0, "size": 2}]}, [])
+        runner = ModuleRunner("append", "tests.units.resources.append_mod")
+        lengths = list()
+        def play(action):
+            if action["type"] == "action":
+                runner.run_with_dict({"db": db})
+            else:
+                lengths.append(len(db))
+        run_steps(actions * 4, play, concurrency=4)
+        assert(lengths == [2, 4, 6, 8])
+
+    def test_failure(self):
+        def play(action):
+            if action["item"] == "a":
+                raise ValueError("failed step")
+        self.assertRaises(ValueError, run_steps, [{"type": "clear", "item": "a"}, {"type": "clear", "item": "b"}], play, 2)
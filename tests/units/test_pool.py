@@ -0,0 +1,30 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+import numpy as np
+from keever.algorithm import Algorithm
+from keever.runners import ModuleRunner, concatenate_results
+
+class BatchedModule(unittest.TestCase):
+    def test_batch(self):
+        algo = Algorithm("fom")
+        algo.actions["evaluate"] = ModuleRunner("batch_mod", "resources.batch_mod", workdir=".", workers=3, batch="x")
+        x = np.random.rand(10, 4)
+        for i in range(2):
+            result = algo.action("evaluate", args={"x": x, "power": 2})
+            assert(np.allclose(result["y"], np.sum(x**2, axis=-1)))
+            assert(len(result["pid"]) == 10)
+        executor = algo.executor
+        algo.action("evaluate", args={"x": x.tolist(), "power": 1})
+        assert(algo.executor is executor)
+        algo.shutdown()
+
+    def test_tuple(self):
+        algo = Algorithm("fom")
+        algo.actions["evaluate"] = ModuleRunner("tuple_mod", "resources.tuple_mod", workdir=".", workers=3, batch="x")
+        x = np.random.rand(10, 4)
+        y, top = algo.action("evaluate", args={"x": x})
+        assert(np.allclose(y, np.sum(x**2, axis=-1)) and np.allclose(top, np.max(x, axis=-1)))
+        algo.shutdown()
+        self.assertRaises(TypeError, concatenate_results, [1.0, 2.0])
+        self.assertRaises(ValueError, concatenate_results, [(np.ones(2),), (np.ones(2), np.ones(2))])
@@ -0,0 +1,48 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from keever.database import Database
+import numpy as np
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 2}]}
+
+def best(db, k, largest=False):
+    metric = { entry: value["metric"] for entry, value in db if "metric" in value and not np.isnan(value["metric"]) }
+    return sorted(metric, key=metric.get, reverse=largest)[:k]
+
+class Query(unittest.TestCase):
+    def test_top_k(self):
+        for backend in ["dict", "columnar"]:
+            db = Database("query", variables, ["metric"], backend=backend)
+            ids = db.populate("uniform", 200, seed=0)
+            db.update_entries(ids[::-1], {"metric": np.random.rand(200)})
+            assert(db.top_k("metric", 5) == best(db, 5))
+            db.update_entries(ids[:3], {"metric": [-1.0, 5.0, np.nan]})
+            db.update_entry(ids[3], {"metric": 0.5})
+            db.add_entry("new", {"x": np.zeros(2), "metric": 0.5})
+            other = Database("other", variables, ["metric"], backend=backend)
+            other.add_entries({"x": np.zeros((4, 2)), "metric": [-3.0, 9.0, 0.5, 0.5]})
+            db.merge(other)
+            assert(db.top_k("metric", 5) == best(db, 5))
+            assert(db.top_k("metric", 3, largest=True) == best(db, 3, largest=True))
+            assert(len(db.index("metric")) == 204)
+            assert(sorted(db.where("metric", 0.5, 0.5)) == sorted(e for e, v in db if v.get("metric") == 0.5))
+            db.clear()
+            assert(db.top_k("metric", 5) == [])
+
+    def test_mask_subset(self):
+        for backend in ["dict", "columnar"]:
+            db = Database("query", variables, ["metric"], backend=backend)
+            ids = db.populate("uniform", 100, seed=1)
+            db.update_entries(ids[50:0:-1], {"metric": np.arange(50.0)})
+            x = db.column("x")
+            mask = db.mask("x", upper=0.0) & db.mask("metric", 10, 30)
+            expected = [ e for e, v in db if (v["x"] <= 0).all() and 10 <= v.get("metric", -1) <= 30 ]
+            assert(np.asarray(db.entries)[mask].tolist() == expected)
+            sub = db.subset(mask)
+            assert(sub.entries == expected and sub.backend == backend and sub.variables_descr == db.variables_descr)
+            assert(np.array_equal(sub.column("x"), x[mask]))
+            sub.update_entry(expected[0], {"metric": 100.0})
+            assert(db[expected[0]]["metric"] != 100.0)
+            with self.assertRaises(ValueError):
+                db.top_k("x", 3)
@@ -0,0 +1,31 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from keever.database import Database
+from keever.sampling import samplers
+import numpy as np
+
+variables = {"params": [
+    {"name": "x", "type": "vreal", "lower": -1.0, "upper": 2.0, "size": 3},
+    {"name": "c", "type": "categ", "count": 3},
+    {"name": "v", "type": "vcateg", "count": 4, "size": 2},
+]}
+
+class Sampling(unittest.TestCase):
+    def test_samplers(self):
+        for algo in samplers:
+            for backend in ["dict", "columnar"]:
+                db = Database("doe", variables, ["metric"], backend=backend)
+                db.populate(algo, 64, seed=3)
+                x, c, v = db.column("x"), db.column("c"), db.column("v")
+                assert(len(db) == 64 and x.shape == (64, 3) and v.shape == (64, 2))
+                assert(x.min() >= -1.0 and x.max() <= 2.0)
+                assert(set(c.ravel().tolist()) == {0, 1, 2})
+                assert(v.min() >= 0 and v.max() <= 3 and v.dtype.kind == "i")
+
+    def test_seed(self):
+        config = {"name": "doe", "variables": variables["params"], "populate-on-creation": {"algo": "Sobol", "count": 16, "seed": 7}}
+        a, b = Database.from_json(config), Database.from_json(config)
+        assert(np.array_equal(a.column("x"), b.column("x")) and np.array_equal(a.column("v"), b.column("v")))
+        with self.assertRaises(AssertionError):
+            Database("doe", variables).populate("grid", 10)
@@ -1,7 +1,12 @@
 import unittest
 import sys
 sys.path.append("./tests/units/")
-from keever.runners import ScriptRunner, ModuleRunner
+import os
+import asyncio
+from keever.runners import ScriptRunner, ModuleRunner, complete_job
+from keever.template import Template
+from keever import TMPDIR
+from time import monotonic
 
 class ScriptRunnerBasic(unittest.TestCase):
     def test_launch(self):
@@ -18,3 +23,33 @@ class ScriptRunnerBasic(unittest.TestCase):
             assert(False)
         except:
             assert(len(runner.variables) == 0)
+
+    def test_config_copied(self):
+        from keever.algorithm import Algorithm
+        algo = Algorithm("algo")
+        algo.actions["history"] = ModuleRunner("history_mod", "resources.history_mod", workdir=".")
+        algo.config = {"history": {"values": [0]}, "value": 1}
+        assert(algo.action("history") == 2 and algo.action("history", args={"value": 2}) == 2)
+        assert(algo.config == {"history": {"values": [0]}, "value": 1})
+
+    def test_array_parallel(self):
+        runner = ScriptRunner("array", "tests/units/resources/array.proto.sh", shell="bash", workdir=".", max_parallel=4)
+        start = monotonic()
+        runner.run_with_dict({"value": [1, 2, 3, 4]})
+        assert(monotonic() - start < 1.0)
+
+    def test_template(self):
+        prototype = "f() { echo {{a}}; }\n{{b:npz.all}} {{a}} ${x} {{missing}}\n"
+        template = Template(prototype)
+        assert(template.statements == ["a", "b:npz.all", "missing"])
+        values = {"a": 1.5, "b:npz.all": "db.npz"}
+        assert(template.render(values) == "f() { echo 1.5; }\ndb.npz 1.5 ${x} {{missing}}\n")
+        assert(complete_job(prototype, values) == template.render(values))
+
+    def test_pipe(self):
+        runner = ScriptRunner("array", "tests/units/resources/array.proto.sh", shell="bash", workdir=".", max_parallel=4, pipe=True)
+        before = set(os.listdir(TMPDIR))
+        runner.run_with_dict({"value": [1, 2, 3, 4]})
+        asyncio.run(runner.run_with_dict_async({"value": [1, 2]}))
+        assert(not any(file.startswith("array.") for file in set(os.listdir(TMPDIR)) - before))
+        assert(ScriptRunner.from_json(runner.state_dict).pipe)
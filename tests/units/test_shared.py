@@ -0,0 +1,57 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+import pickle
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+from keever.algorithm import Algorithm
+from keever.database import Database
+from keever.runners import ModuleRunner
+from keever.shared import SharedDatabase
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 3}]}
+
+class SharedColumns(unittest.TestCase):
+    def test_handle(self):
+        for backend in ["dict", "columnar"]:
+            db = Database("shared", variables, ["metric"], backend=backend)
+            db.populate("LHS", 5000)
+            db.update_entries(db.entries[:10], {"metric": np.arange(10.0)})
+            with SharedDatabase.publish(db) as owner:
+                handle = pickle.loads(pickle.dumps(owner))
+                assert(len(pickle.dumps(owner)) < 2000)
+                assert(handle.entries == db.entries and len(handle) == 5000)
+                assert(np.array_equal(handle.column("variables"), db.column("variables")))
+                assert(not handle.column("x").flags.writeable)
+                entry = db.entries[3]
+                assert(handle[entry]["metric"] == 3.0 and np.array_equal(handle[entry]["x"], db[entry]["x"]))
+                assert("metric" not in handle[db.entries[20]])
+                handle.close()
+                names = [ layout[0] for layout in owner._layout.values() ]
+            for name in names:
+                self.assertRaises(FileNotFoundError, SharedMemory, name=name)
+
+    def test_escaped(self):
+        db = Database("shared", variables, ["metric"])
+        db.populate("LHS", 10)
+        with SharedDatabase.publish(db) as owner:
+            handle = pickle.loads(pickle.dumps(owner)) # Worker side
+            kept = handle.column("x")[2:]
+            block = handle._blocks["x"]
+            handle.close()
+            assert(block.buf is not None and np.array_equal(kept, db.column("x")[2:]))
+            del kept
+            assert(block.buf is None) # Unmapped with the array
+
+    def test_pool(self):
+        db = Database("shared", variables, ["metric"], backend="columnar")
+        db.populate("LHS", 200)
+        x = np.random.rand(8, 3)
+        expected = np.min(np.linalg.norm(x[:, None, :] - db.column("x")[None], axis=-1), axis=1)
+        algo = Algorithm("fom")
+        algo.actions["evaluate"] = ModuleRunner("shared_mod", "resources.shared_mod", workdir=".", workers=2, batch="x", shared=True)
+        result = algo.action("evaluate", args={"x": x, "db": db})
+        assert(np.allclose(result["nearest"], expected))
+        assert(set(result["handle"]) == {"SharedDatabase"})
+        assert(ModuleRunner.from_json({**algo.actions["evaluate"].state_dict, "workdir": "."}).shared)
+        algo.shutdown()
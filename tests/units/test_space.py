@@ -0,0 +1,43 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from keever.database import Database, count_continuous_variables, countinuous_variables_boundaries, categorical_variables_num_values
+from keever.space import variable_space
+import numpy as np
+
+variables = {"params": [
+    {"name": "x", "type": "vreal", "lower": -1.0, "upper": 2.0, "size": 3},
+    {"name": "c", "type": "categ", "count": 3},
+    {"name": "y", "type": "real", "lower": 0.0, "upper": 1.0},
+    {"name": "v", "type": "vcateg", "count": 4, "size": 2},
+]}
+
+class Space(unittest.TestCase):
+    def test_layout(self):
+        db = Database("space", variables, ["metric"])
+        space = db.space
+        assert(space is variable_space([ dict(var) for var in variables["params"] ]))
+        assert(space.size == 7 and list(space.offsets) == [0, 3, 4, 5, 7])
+        assert(count_continuous_variables(db.variables_descr) == 4)
+        assert(np.array_equal(countinuous_variables_boundaries(db.variables_descr), [[-1, -1, -1, 0], [2, 2, 2, 1]]))
+        assert(list(categorical_variables_num_values(db.variables_descr)) == [3, 4, 4])
+        assert(db.continuous_variables_names == ["x", "y"] and db.continuous_variables_sizes == [3, 1])
+
+    def test_encode_decode(self):
+        db = Database("space", variables, ["metric"], backend="columnar")
+        db.populate("uniform", 50, seed=1)
+        matrix = db.space.encode({ name: db.column(name) for name in db.space.names })
+        assert(np.array_equal(matrix, db.column("variables")))
+        columns = db.space.decode(matrix)
+        assert(np.array_equal(columns["v"], db.column("v")) and columns["v"].dtype.kind == "i")
+        assert(db.space.contains(matrix).all())
+
+    def test_repair(self):
+        space = variable_space(variables["params"])
+        candidates = np.array([[-3.0, 0.5, 2.5, 3.4, 1.25, -1.0, 1.6]])
+        assert(not space.contains(candidates).any())
+        clipped = space.repair(candidates)
+        assert(np.allclose(clipped, [[-1.0, 0.5, 2.0, 2.0, 1.0, 0.0, 2.0]]))
+        reflected = space.repair(candidates, mode="reflect")
+        assert(np.allclose(reflected[0, :3], [1.0, 0.5, 1.5]) and np.isclose(reflected[0, 4], 0.75))
+        assert(space.contains(clipped).all() and space.contains(reflected).all())
@@ -0,0 +1,23 @@
+import sys
+sys.path.append("./tests/units/")
+import os
+import json
+import unittest
+import subprocess
+from tempfile import mkdtemp
+
+probe = '''
+import sys, json
+import keever.algorithm
+print(json.dumps({"modules": [ m for m in ["scipy", "yaml"] if m in sys.modules ], "path": sys.path}))
+'''
+
+class TestStartup(unittest.TestCase):
+    def test_import_side_effects(self):
+        tmp = os.path.join(mkdtemp(), "keever_tmp")
+        env = {**os.environ, "KEEVER_TMP": tmp, "PYTHONPATH": os.path.abspath(".")}
+        out = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out)
+        assert(result["modules"] == [])
+        assert("./user/" not in result["path"])
+        assert(not os.path.exists(tmp))
@@ -0,0 +1,106 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+from keever.database import Database
+from keever.algorithm import Algorithm
+from keever.surrogate import GaussianProcess, SurrogateRunner
+import numpy as np
+
+variables = {"params": [
+    {"name": "x", "type": "vreal", "lower": -2.0, "upper": 2.0, "size": 2},
+    {"name": "c", "type": "categ", "count": 2},
+]}
+
+def sphere(designs):
+    return (designs[:, :2] ** 2).sum(axis=1) + designs[:, 2]
+
+def evaluated(count, seed=0, backend="dict"):
+    db = Database("main", variables, ["metric"], backend=backend)
+    ids = db.populate("LHS", count, seed=seed)
+    db.update_entries(ids, {"metric": sphere(db.column("variables"))})
+    return db
+
+class Surrogate(unittest.TestCase):
+    def test_append(self):
+        X = np.random.default_rng(0).random((60, 3))
+        y = np.sin(3 * X).sum(axis=1)
+        full = GaussianProcess(length_scale=0.5, noise=1e-8).fit(X, y)
+        incremental = GaussianProcess(length_scale=0.5, noise=1e-8).fit(X[:40], y[:40])
+        incremental.y_mean, incremental.y_std = full.y_mean, full.y_std
+        incremental.append(X[40:50], y[40:50]).append(X[50:], y[50:])
+        assert(np.allclose(incremental.L, full.L))
+        candidates = np.random.default_rng(1).random((10, 3))
+        assert(np.allclose(incremental.predict(candidates)[0], full.predict(candidates)[0]))
+        mean, std = full.predict(X)
+        assert(np.allclose(mean, y, atol=1e-4) and np.all(std < 1e-2))
+        assert(np.allclose(full.predict(candidates, return_std=False), full.predict(candidates)[0]))
+
+    def test_action(self):
+        for backend in ["dict", "columnar"]:
+            db = evaluated(200, backend=backend)
+            algo = Algorithm.from_json({"name": "sur", "actions": [{"name": "fit", "type": "surrogate", "kernel": "matern52"}]})
+            assert(algo.action("fit", args={"dataset": db})["count"] == 200)
+            candidates = db.space.from_unit(np.random.default_rng(1).random((500, 3)))
+            result = algo.action("fit", args={"x": candidates})
+            assert(np.abs(result["mean"] - sphere(candidates)).mean() < 0.1)
+            assert(result["std"].shape == (500,) and np.all(result["std"] >= 0))
+            result = algo.action("fit", args={"x": db.space.decode(candidates), "std": False})
+            assert("std" not in result and np.abs(result["mean"] - sphere(candidates)).mean() < 0.1)
+
+            action = algo.actions["fit"]
+            scale = action.model.scale
+            ids = db.add_entries(db.space.decode(candidates[:20]))
+            db.update_entries(ids, {"metric": sphere(candidates[:20])})
+            db.add_entries(db.space.decode(candidates[20:30])) # Not evaluated, skipped
+            assert(algo.action("fit", args={"dataset": db})["count"] == 220)
+            assert(action.model.scale == scale and action._fitted_count == 200)
+            assert(np.allclose(algo.action("fit", args={"x": candidates[:20]})["mean"], sphere(candidates[:20]), atol=1e-3))
+
+            reloaded = Algorithm.from_json(algo.state_dict)
+            assert(np.allclose(reloaded.action("fit", args={"x": candidates})["mean"], algo.action("fit", args={"x": candidates})["mean"]))
+            assert(reloaded.action("fit", args={"dataset": db})["count"] == 220)
+
+            db.clear()
+            assert(algo.action("fit", args={"dataset": db})["count"] == 0 and len(action.model) == 0)
+            db.merge(evaluated(10, seed=2, backend=backend))
+            assert(algo.action("fit", args={"dataset": db})["count"] == 10 and action._fitted_count == 10)
+
+    def test_changed_targets(self):
+        for backend in ["dict", "columnar"]:
+            db = evaluated(30, backend=backend)
+            ids = db.entries
+            db.update_entries(ids, {"metric": np.zeros(len(ids))})
+            runner = SurrogateRunner("fit")
+            runner.update(db)
+            db.update_entries(ids[:10], {"metric": np.full(10, 5.0)})
+            runner.update(db)
+            designs = db.column("variables")
+            assert(np.allclose(runner.predict(designs[:10], return_std=False), 5.0, atol=1e-2))
+            assert(runner._fitted_count == 30)
+
+    def test_near_duplicates(self):
+        X = np.random.default_rng(0).random((20, 3))
+        y = X.sum(axis=1)
+        model = GaussianProcess(length_scale=1.0, noise=0.0).fit(X, y)
+        model.append(X[:2], y[:2]) # Singular block update, fitted again with jitter
+        assert(len(model) == 22 and np.allclose(model.predict(X, return_std=False), y, atol=1e-3))
+
+    def test_nan_targets(self):
+        db = evaluated(20)
+        runner = SurrogateRunner("fit")
+        runner.update(db)
+        pending = db.populate("LHS", 50, seed=1)
+        db.update_entries(pending, {"metric": np.full(50, np.nan)})
+        for i in range(3):
+            ids = db.populate("LHS", 1, seed=2 + i)
+            db.update_entries(ids, {"metric": sphere(db.subset(ids).column("variables"))})
+            runner.update(db)
+        assert(runner._fitted_count == 20 and len(runner.model) == 23)
+
+    def test_refit_growth(self):
+        db = evaluated(20)
+        runner = SurrogateRunner("fit", refit_growth=2.0)
+        runner.update(db)
+        db.merge(evaluated(30, seed=1))
+        runner.update(db)
+        assert(runner._fitted_count == 50 and len(runner.model) == 50)
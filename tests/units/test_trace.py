@@ -0,0 +1,56 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+import json
+import asyncio
+from os.path import join
+from keever.algorithm import Algorithm
+from keever.runners import ScriptRunner, ModuleRunner
+from keever.database import Database
+from keever.export import remove_export
+from keever.trace import tracer
+from tempfile import TemporaryDirectory
+
+variables = {"params": [{"name": "x", "type": "vreal", "lower": -1.0, "upper": 1.0, "size": 2}]}
+
+class Tracing(unittest.TestCase):
+    def tearDown(self):
+        tracer.disable()
+        tracer.clear()
+
+    def test_disabled(self):
+        algo = Algorithm("algo")
+        algo.actions["run"] = ModuleRunner("sleep_mod", "resources.sleep_mod", workdir=".")
+        algo.action("run", args={"duration": 0.0})
+        assert(len(tracer.events) == 0)
+
+    def test_spans(self):
+        tmp = TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        tracer.enable()
+        algo = Algorithm("algo")
+        algo.actions["script"] = ScriptRunner("array", "tests/units/resources/array.proto.sh", shell="bash", workdir=".")
+        algo.actions["module"] = ModuleRunner("sleep_mod", "resources.sleep_mod", workdir=".")
+        algo.action("script", args={"value": [1, 2]})
+        asyncio.run(algo.action_async("module", args={"duration": 0.0}))
+        db = Database("traced", variables, ["metric"])
+        db.populate("LHS", 10)
+        db.exporters = {"npz.all": ["x"]}
+        remove_export(db.export("npz.all"))
+        db.save(join(tmp.name, "traced"), "npy")
+
+        rows = { row["name"]: row for row in tracer.summary() }
+        assert(rows["Algorithm.action algo.script"]["calls"] == 1)
+        assert(rows["run_with_dict array"]["calls"] == 1)
+        assert(rows["write_job"]["calls"] == 2)
+        assert(rows["wait_files"]["calls"] == 1)
+        assert(rows["run_with_dict_async sleep_mod"]["calls"] == 1)
+        assert(rows["Database.export traced.npz.all"]["bytes"] > 0)
+        assert(rows["serialize_npy"]["bytes"] > 0)
+        assert(rows["Algorithm.action algo.script"]["total"] >= rows["wait_files"]["total"])
+        assert("wait_files" in tracer.summary_table())
+
+        tracer.dump(join(tmp.name, "trace.json"))
+        with open(join(tmp.name, "trace.json")) as f:
+            events = json.load(f)["traceEvents"]
+        assert(all(event["ph"] == "X" and event["dur"] >= 0 for event in events))
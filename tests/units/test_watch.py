@@ -0,0 +1,34 @@
+import unittest
+import sys
+sys.path.append("./tests/units/")
+import threading
+from time import monotonic
+from os.path import join, isfile
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from keever.watch import CompletionWatcher, JobFailedError
+from keever.runners import ScriptRunner
+
+class CompletionWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_wakeup(self):
+        for use_inotify in [True, False]:
+            file = join(self.tmp.name, f"watch.{use_inotify}.ended")
+            timer = threading.Timer(0.2, Path(file).touch)
+            timer.start()
+            start = monotonic()
+            CompletionWatcher([file], timeout=5, max_interval=10, use_inotify=use_inotify).wait()
+            assert(monotonic() - start < 1.0)
+            Path(file).unlink()
+
+    def test_timeout(self):
+        with self.assertRaises(TimeoutError):
+            CompletionWatcher([join(self.tmp.name, "never.ended")], timeout=0.2).wait()
+
+    def test_failure(self):
+        runner = ScriptRunner("failing", "tests/units/resources/failing.proto.sh", shell="bash", workdir=".", timeout=5)
+        with self.assertRaises(JobFailedError):
+            runner.run_with_dict({})